@@ -14,11 +14,11 @@ from src.database.queries.diet_cycles_queries import (
     query_insert_diet_cycle,
     query_update_diet_cycle_end_date
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import sessionmaker
 from src.database.connection import engine
 
-# Initialize the database session
-db = Session(bind=engine)
+# Sessions are opened per query (with SessionLocal() as db: ...), so no connection holds a read snapshot open
+SessionLocal = sessionmaker(bind=engine)
 
 def display_all_workouts(start_date=None, end_date=None):
     workouts = query_get_all_workouts(start_date, end_date)
@@ -42,7 +42,7 @@ def display_unique_exercise_names(start_date=None, end_date=None):
 
 def display_exercise_counts(start_date=None, end_date=None):
     counts = query_get_exercise_counts(start_date, end_date)
-    for count in counts:
+    for count in counts.itertuples(index=False):
         print(f"{count.exercise_name}: {count.occurrence_count}")
 
 def display_sleep_data(start_date=None, end_date=None):
@@ -20,10 +20,12 @@ from src.database.queries.hevy_sql_queries import (
     query_get_exercises_in_workout,
     query_get_sets_for_exercise_in_workout,
     query_get_all_unique_exercise_names,
-    query_get_exercise_counts
+    query_get_exercise_counts,
+    query_get_daily_training
 )
-from src.database.queries.sleep_queries import query_get_sleep_data
-from src.database.queries.nutrition_queries import query_get_nutrition_data
+from src.database.queries.sleep_queries import query_get_sleep_data, query_get_daily_sleep
+from src.database.queries.nutrition_queries import query_get_daily_nutrition
+from src.database.queries.analytics_queries import query_get_weekly_training_volume
 from src.database.queries.health_markers_queries import *
 from src.database.queries.diet_cycles_queries import (
     query_get_current_diet_cycle,
@@ -31,12 +33,20 @@ from src.database.queries.diet_cycles_queries import (
     query_insert_diet_cycle,
     query_insert_diet_week
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
 from src.database.connection import engine
+from src.database.migrations import migrate
 
-# Create a database session
-db = Session(bind=engine)
+# Sessions are opened per query, so no connection holds a read snapshot open between reruns
+SessionLocal = sessionmaker(bind=engine)
+
+@st.cache_resource
+def ensure_schema():
+    """Applies any pending migrations once per dashboard process rather than on every rerun."""
+    return migrate(engine)
+
+ensure_schema()
 
 def set_query_params(**params):
     """Helper function to set query parameters."""
@@ -70,11 +80,21 @@ if page == "Workouts":
     else:
         st.info("No workouts found for the selected date range.")
 
+    daily_training = query_get_daily_training(start_date=start_date, end_date=end_date)
+    if daily_training:
+        df_training = pd.DataFrame(daily_training, columns=["Date", "Workouts", "Duration (min)", "Sets", "Reps", "Volume (kg)"])
+        st.bar_chart(df_training.set_index("Date")["Volume (kg)"])
+
+    st.header("Weekly Volume")
+    df_weekly = query_get_weekly_training_volume(start_date=start_date, end_date=end_date)
+    if not df_weekly.empty:
+        st.line_chart(df_weekly.set_index("Week")["Volume (kg)"])
+
 elif page == "Nutrition":
     st.title("Protein Per Day")
     start_date = st.sidebar.date_input("Start Date", value=date(2025, 1, 1))
     end_date = st.sidebar.date_input("End Date", value=date.today())
-    nutrition_data = query_get_nutrition_data(start_date=start_date, end_date=end_date)
+    nutrition_data = query_get_daily_nutrition(start_date=start_date, end_date=end_date)
 
     if nutrition_data:
         column_names = ["Date", "Protein (g)", "Calories", "Carbohydrates (g)", "Fat (g)"]
@@ -88,6 +108,13 @@ elif page == "Sleep":
     st.title("Sleep Analysis")
     start_date = st.sidebar.date_input("Start Date", value=date(2025, 1, 1))
     end_date = st.sidebar.date_input("End Date", value=date.today())
+    daily_sleep = query_get_daily_sleep(start_date=start_date, end_date=end_date)
+    if daily_sleep:
+        df_daily_sleep = pd.DataFrame(daily_sleep, columns=[
+            "Date", "Sessions", "In Bed Duration (hrs)", "Sleep Duration (hrs)", "Awake Duration (hrs)",
+            "REM Sleep (hrs)", "Deep Sleep (hrs)", "Core Sleep (hrs)"])
+        st.line_chart(df_daily_sleep.set_index("Date")["Sleep Duration (hrs)"])
+
     sleep_data = query_get_sleep_data(start_date=start_date, end_date=end_date)
 
     if sleep_data:
@@ -198,10 +225,11 @@ elif page == "Data Input":
                 cycle_id = current_cycle.cycle_id
 
                 # Check if the common_data entry already exists
-                existing_common_data = db.execute(
-                    text("SELECT common_data_id FROM common_data WHERE date = :date AND source = :source"),
-                    {"date": week_start_date.strftime("%Y-%m-%d %H:%M:%S"), "source": source}
-                ).fetchone()
+                with SessionLocal() as db:
+                    existing_common_data = db.execute(
+                        text("SELECT common_data_id FROM common_data WHERE date = :date AND source = :source"),
+                        {"date": week_start_date.strftime("%Y-%m-%d %H:%M:%S"), "source": source}
+                    ).fetchone()
 
                 if existing_common_data:
                     st.error("A diet week with the same date and source already exists.")
@@ -216,5 +244,3 @@ elif page == "Data Input":
                     set_query_params(page="Data Input")  # Use helper function
             else:
                 st.error("No ongoing diet cycle found. Please start a new cycle first.")
-
-db.close()
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import pandas as pd
+from src.database.connection import DATABASE_NAME, connect
+
+try:
+    import duckdb  # Optional: pip install duckdb
+except ImportError:
+    duckdb = None
+
+'''
+Optional DuckDB engine for long-range aggregations.
+DuckDB either attaches the SQLite database read-only through its sqlite extension, or reads the Parquet
+mirror written by sync_parquet_mirror(). Either way the query runs vectorized over columns and the result
+comes back as a pandas DataFrame or pyarrow Table without passing through SQLAlchemy rows.
+Without DuckDB the same queries run on SQLite, so callers never depend on it being installed.
+The Parquet mirror is only rewritten by sync_parquet_mirror(), which run_refresh --parquet calls after
+each refresh. Until then it is older than the database and queries go to SQLite rather than read it.
+'''
+
+# "duckdb" attaches the SQLite file, "parquet" reads the Parquet mirror, "sqlite" skips DuckDB entirely
+ANALYTICS_BACKENDS = ("duckdb", "parquet", "sqlite")
+# Set HEVY_ANALYTICS to one of ANALYTICS_BACKENDS; DuckDB backends fall back to SQLite when it is missing.
+# Attaching costs the sqlite extension load on every query, so "parquet" is the one to pick for speed.
+ANALYTICS_BACKEND = os.getenv("HEVY_ANALYTICS", "sqlite")
+PARQUET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/parquet"))
+
+# Tables the analytics queries read, and so the ones mirrored to Parquet. The raw data table is left
+# out: its data_json blobs dwarf everything else and the analytics work from the typed tables.
+ANALYTICS_TABLES = [
+    "common_data", "workouts", "exercises", "workout_exercises", "sets",
+    "health_markers", "nutrition_data", "sleep_data",
+    "daily_health", "daily_nutrition", "daily_sleep", "daily_training"]
+
+# SQL for a day_key column as a DATE (text 'YYYY-MM-DD' on SQLite), per dialect
+DAY_KEY_DATE = {
+    "sqlite": "date(printf('%04d-%02d-%02d', {day_key} / 10000, {day_key} / 100 % 100, {day_key} % 100))",
+    "duckdb": "make_date(({day_key} // 10000)::INTEGER, ({day_key} // 100 % 100)::INTEGER, ({day_key} % 100)::INTEGER)",
+}
+
+# SQL for the Monday starting the ISO week of a day_key column, per dialect
+DAY_KEY_WEEK = {
+    "sqlite": "date(printf('%04d-%02d-%02d', {day_key} / 10000, {day_key} / 100 % 100, {day_key} % 100), "
+              "'weekday 0', '-6 days')",
+    "duckdb": "date_trunc('week', " + DAY_KEY_DATE["duckdb"] + ")::DATE",
+}
+
+
+def _quote(path):
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _last_write(database_name):
+    """Modification time of the last write to database_name, including writes still in its WAL."""
+    last_write = os.path.getmtime(database_name)
+    wal = f"{database_name}-wal"
+    # A WAL without frames is recreated by any new connection, reads included, so it says nothing
+    if os.path.exists(wal) and os.path.getsize(wal) > 0:
+        last_write = max(last_write, os.path.getmtime(wal))
+    return last_write
+
+
+def parquet_mirror_is_current(database_name=DATABASE_NAME, parquet_dir=PARQUET_DIR):
+    """True if every ANALYTICS_TABLES file exists in parquet_dir and was written after the last write to database_name."""
+    try:
+        last_write = _last_write(database_name)
+        return all(os.path.getmtime(os.path.join(parquet_dir, f"{table}.parquet")) >= last_write
+                   for table in ANALYTICS_TABLES)
+    except OSError:
+        return False
+
+
+def analytics_backend(backend=None):
+    """Resolves the backend a query runs on: backend, else ANALYTICS_BACKEND, and 'sqlite' without DuckDB."""
+    backend = backend or ANALYTICS_BACKEND
+    if backend not in ANALYTICS_BACKENDS:
+        raise ValueError(f"Unknown analytics backend {backend!r}, expected one of {ANALYTICS_BACKENDS}.")
+    if backend != "sqlite" and duckdb is None:
+        return "sqlite"
+    return backend
+
+
+def duckdb_connection(backend="duckdb", database_name=DATABASE_NAME, parquet_dir=PARQUET_DIR):
+    """
+    Opens an in-memory DuckDB connection whose default schema exposes ANALYTICS_TABLES.
+    A fresh connection per query always sees the current database file, including after a shadow swap.
+    :param backend: 'duckdb' to attach database_name read-only, 'parquet' to read the mirror in parquet_dir.
+    """
+    conn = duckdb.connect()
+    try:
+        if backend == "parquet":
+            for table in ANALYTICS_TABLES:
+                path = os.path.join(parquet_dir, f"{table}.parquet")
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Parquet mirror is missing {path}; run sync_parquet_mirror() first.")
+                conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet({_quote(path)})")
+        else:
+            conn.execute(f"ATTACH {_quote(database_name)} AS hevy (TYPE SQLITE, READ_ONLY)")
+            conn.execute("USE hevy")
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def run_analytics_query(sql, params=(), backend=None, as_arrow=False, date_columns=(),
+                        database_name=DATABASE_NAME, parquet_dir=PARQUET_DIR):
+    """
+    Runs an aggregate query on the analytics backend.
+    The query falls back to SQLite whenever DuckDB cannot answer it: DuckDB is not installed, its sqlite
+    extension cannot be loaded (e.g. offline), the Parquet mirror is missing or older than the database
+    (see sync_parquet_mirror), or a module the result needs cannot be imported.
+    :param sql: Dialect ('sqlite' or 'duckdb') -> SQL text with ? parameters.
+    :param backend: Optional. One of ANALYTICS_BACKENDS, defaults to ANALYTICS_BACKEND.
+    :param as_arrow: Optional. Return a pyarrow Table instead of a pandas DataFrame.
+    :param date_columns: Optional. Columns converted to datetimes in a DataFrame result.
+    """
+    backend = analytics_backend(backend)
+    if backend == "parquet" and not parquet_mirror_is_current(database_name, parquet_dir):
+        print(f"The Parquet mirror in {parquet_dir} is missing or older than {database_name}, running on SQLite "
+              f"instead; rewrite it with run_refresh --parquet.")
+        backend = "sqlite"
+    if backend != "sqlite":
+        try:
+            with duckdb_connection(backend, database_name, parquet_dir) as conn:
+                result = conn.execute(sql["duckdb"], list(params))
+                if as_arrow:
+                    return result.fetch_arrow_table()
+                frame = result.df()
+        except (duckdb.Error, OSError, ImportError) as e:
+            print(f"DuckDB could not run the query on the {backend} backend, running on SQLite instead: {e}")
+        else:
+            for column in date_columns:
+                frame[column] = pd.to_datetime(frame[column])
+            return frame
+
+    conn = connect(database_name, "read")
+    try:
+        frame = pd.read_sql_query(sql["sqlite"], conn, params=list(params))
+    finally:
+        conn.close()
+    for column in date_columns:
+        frame[column] = pd.to_datetime(frame[column])
+    if as_arrow:
+        import pyarrow  # Only needed for Arrow results without DuckDB
+        return pyarrow.Table.from_pandas(frame, preserve_index=False)
+    return frame
+
+
+def sync_parquet_mirror(database_name=DATABASE_NAME, parquet_dir=PARQUET_DIR):
+    """
+    Writes every table in ANALYTICS_TABLES to parquet_dir/<table>.parquet for the 'parquet' backend.
+    Run it after every import (run_refresh --parquet does): the backend ignores a mirror older than the database.
+    Tables are read through SQLite, so DuckDB's sqlite extension is not needed, and each file is written
+    next to its target and renamed over it so readers never see a partial file.
+    :return: Table name -> rows written.
+    """
+    if duckdb is None:
+        raise RuntimeError("The Parquet mirror needs DuckDB: pip install duckdb")
+    os.makedirs(parquet_dir, exist_ok=True)
+    conn = connect(database_name, "read")
+    # Fold pending WAL frames into the file first, so a later checkpoint does not make the mirror look stale
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    rows = {}
+    try:
+        with duckdb.connect() as mirror:
+            for table in ANALYTICS_TABLES:
+                frame = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+                path = os.path.join(parquet_dir, f"{table}.parquet")
+                mirror.register("mirror_table", frame)
+                mirror.execute(f"COPY mirror_table TO {_quote(path + '.tmp')} (FORMAT PARQUET)")
+                mirror.unregister("mirror_table")
+                os.replace(path + ".tmp", path)
+                rows[table] = len(frame)
+    finally:
+        conn.close()
+    return rows
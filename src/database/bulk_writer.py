@@ -0,0 +1,258 @@
+from datetime import datetime
+from src.database.database_utils import ensure_indexes
+from src.database.rollups import date_day_key, day_keys_for_common_data, refresh_daily_rollups
+from src.utils.timestamps import utc_epoch_and_day_key
+
+# Number of queued fact rows that triggers a flush
+WRITE_BATCH_SIZE = 5000
+
+NUTRITION_COLUMNS = [
+    "calories", "protein_g", "carbohydrates_g", "fat_g", "water_floz", "caffeine_mg",
+    "potassium_mg", "fiber_g", "sodium_mg", "sugar_g"]
+
+MARKER_COLUMNS = [
+    "time_in_daylight_min", "vo2_max", "heart_rate_min", "heart_rate_max", "heart_rate_avg",
+    "heart_rate_variability", "resting_heart_rate", "respiratory_rate", "blood_oxygen_saturation",
+    "body_mass_index", "body_weight_lbs"]
+
+SLEEP_COLUMNS = [
+    "common_data_id", "start_time", "end_time", "in_bed_duration_hours", "sleep_duration_hours",
+    "awake_duration_hours", "rem_sleep_duration_hours", "deep_sleep_duration_hours",
+    "core_sleep_duration_hours", "in_bed_start", "in_bed_end", "created_at", "updated_at"]
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def common_data_key(timestamp, source):
+    """Returns the (formatted date, source, utc_epoch, day_key) key a common_data row is identified and written by."""
+    return (timestamp.strftime("%Y-%m-%d %H:%M:%S"), source, *utc_epoch_and_day_key(timestamp))
+
+
+class HealthBulkWriter:
+    """
+    Batches health ingest writes against a raw sqlite3 connection.
+    Preloads (date, source) -> common_data_id and metric_name -> metric_id once, assigns new
+    common_data ids in memory, and flushes queued rows with executemany in one transaction per batch.
+    The daily rollups of every day a flush wrote sleep, nutrition or marker rows for are recomputed
+    in the same transaction.
+    Assumes it is the only writer to the database while it is alive.
+    """
+
+    def __init__(self, conn, batch_size=WRITE_BATCH_SIZE):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+
+        ensure_indexes(self.cursor)
+        self.conn.commit()
+
+        self._common_data_ids = {
+            (date, source): common_data_id
+            for common_data_id, date, source in self.cursor.execute(
+                "SELECT common_data_id, date, source FROM common_data")
+        }
+        self._next_common_data_id = (self.cursor.execute(
+            "SELECT MAX(common_data_id) FROM common_data").fetchone()[0] or 0) + 1
+        self._metric_ids = dict(self.cursor.execute("SELECT metric_name, metric_id FROM metrics"))
+
+        # Keys of fact rows that already exist, so duplicates are skipped without a query per entry
+        self._sleep_keys = set(self.cursor.execute("SELECT common_data_id, start_time, end_time FROM sleep_data"))
+        self._nutrition_ids = {row[0] for row in self.cursor.execute("SELECT common_data_id FROM nutrition_data")}
+        self._marker_ids = {row[0] for row in self.cursor.execute("SELECT common_data_id FROM health_markers")}
+
+        self._pending_common_data = []
+        self._pending_raw = []
+        self._pending_sleep = []
+        self._pending_nutrition_inserts = []
+        self._pending_nutrition_updates = []
+        self._pending_marker_inserts = []
+        self._pending_marker_updates = []
+        # Rollup table -> common_data ids written since the last flush
+        self._touched = {"daily_nutrition": set(), "daily_health": set()}
+        # Wake days of the sleep sessions written since the last flush, which daily_sleep is keyed by
+        self._touched_sleep_days = set()
+
+    def metric_id(self, metric_name, units, category="general"):
+        """Get or create a metric_id for a given metric name."""
+        metric_id = self._metric_ids.get(metric_name)
+        if metric_id is None:
+            self.cursor.execute("""
+                INSERT INTO metrics (metric_name, units, category)
+                VALUES (?, ?, ?)
+            """, (metric_name, units, category))
+            metric_id = self.cursor.lastrowid
+            self._metric_ids[metric_name] = metric_id
+        return metric_id
+
+    def common_data_id(self, timestamp, source):
+        """
+        Get or assign a common_data_id for a given timestamp and source.
+        New rows are queued and written on the next flush.
+        """
+        return self.common_data_id_for_key(common_data_key(timestamp, source))
+
+    def common_data_id_for_key(self, key):
+        """Same as common_data_id, for a common_data_key() tuple."""
+        date, source, utc_epoch, day_key = key
+        common_data_id = self._common_data_ids.get((date, source))
+        if common_data_id is None:
+            common_data_id = self._next_common_data_id
+            self._next_common_data_id += 1
+            self._common_data_ids[(date, source)] = common_data_id
+            self._pending_common_data.append((common_data_id, date, source, utc_epoch, day_key))
+        return common_data_id
+
+    def add_raw(self, metric_id, common_data_id, qty, data_json):
+        """Queue a raw data row. Existing (metric_id, common_data_id) rows are updated on flush if changed."""
+        now = _now()
+        self._pending_raw.append((common_data_id, metric_id, qty, data_json, now, now))
+        self._maybe_flush()
+
+    def add_sleep(self, row):
+        """Queue a sleep_data row given as a dict keyed by SLEEP_COLUMNS (timestamps omitted)."""
+        key = (row["common_data_id"], row["start_time"], row["end_time"])
+        if key in self._sleep_keys:
+            return False
+        self._sleep_keys.add(key)
+        self._touched_sleep_days.add(date_day_key(row["end_time"]))
+        now = _now()
+        row = dict(row, created_at=now, updated_at=now)
+        self._pending_sleep.append(tuple(row.get(column) for column in SLEEP_COLUMNS))
+        self._maybe_flush()
+        return True
+
+    def upsert_nutrition(self, common_data_id, values):
+        """Queue a nutrition_data insert, or a COALESCE update if the row already exists."""
+        self._touched["daily_nutrition"].add(common_data_id)
+        self._queue_upsert(common_data_id, values, NUTRITION_COLUMNS, self._nutrition_ids,
+                           self._pending_nutrition_inserts, self._pending_nutrition_updates)
+
+    def upsert_markers(self, common_data_id, values):
+        """Queue a health_markers insert, or a COALESCE update if the row already exists."""
+        self._touched["daily_health"].add(common_data_id)
+        self._queue_upsert(common_data_id, values, MARKER_COLUMNS, self._marker_ids,
+                           self._pending_marker_inserts, self._pending_marker_updates)
+
+    def _queue_upsert(self, common_data_id, values, columns, existing_ids, inserts, updates):
+        now = _now()
+        row = [values.get(column) for column in columns]
+        if common_data_id in existing_ids:
+            updates.append((*row, now, common_data_id))
+        else:
+            existing_ids.add(common_data_id)
+            inserts.append((common_data_id, *row, now, now))
+        self._maybe_flush()
+
+    def _pending_count(self):
+        return (len(self._pending_raw) + len(self._pending_sleep)
+                + len(self._pending_nutrition_inserts) + len(self._pending_nutrition_updates)
+                + len(self._pending_marker_inserts) + len(self._pending_marker_updates))
+
+    def _maybe_flush(self):
+        if self._pending_count() >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every queued row with executemany and commit them as one transaction."""
+        cursor = self.cursor
+        # Inserts run before updates so a row queued twice in one batch is merged in order
+        cursor.executemany(
+            "INSERT INTO common_data (common_data_id, date, source, utc_epoch, day_key) VALUES (?, ?, ?, ?, ?)",
+            self._pending_common_data)
+        # Dedupe is an index probe on uq_data_metric_common_data rather than a lookup per entry
+        cursor.executemany("""
+            INSERT INTO data (common_data_id, metric_id, qty, data_json, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (metric_id, common_data_id) DO UPDATE SET
+                qty = excluded.qty,
+                data_json = excluded.data_json,
+                updated_at = excluded.updated_at
+            WHERE data.data_json IS NOT excluded.data_json
+        """, self._pending_raw)
+        cursor.executemany(
+            f"INSERT INTO sleep_data ({', '.join(SLEEP_COLUMNS)}) VALUES ({', '.join('?' * len(SLEEP_COLUMNS))})",
+            self._pending_sleep)
+        _write_upserts(cursor, "nutrition_data", NUTRITION_COLUMNS,
+                       self._pending_nutrition_inserts, self._pending_nutrition_updates)
+        _write_upserts(cursor, "health_markers", MARKER_COLUMNS,
+                       self._pending_marker_inserts, self._pending_marker_updates)
+        for table, common_data_ids in self._touched.items():
+            if common_data_ids:
+                refresh_daily_rollups(cursor, table, day_keys_for_common_data(cursor, common_data_ids))
+                common_data_ids.clear()
+        refresh_daily_rollups(cursor, "daily_sleep", self._touched_sleep_days)
+        self._touched_sleep_days.clear()
+        self.conn.commit()
+
+        self._pending_common_data = []
+        self._pending_raw = []
+        self._pending_sleep = []
+        self._pending_nutrition_inserts = []
+        self._pending_nutrition_updates = []
+        self._pending_marker_inserts = []
+        self._pending_marker_updates = []
+
+
+class RowCollector:
+    """
+    Stand-in for HealthBulkWriter that records rows instead of writing them.
+    Used by parse workers that cannot share the SQLite connection: ids are replaced by their
+    natural keys, and apply() resolves them against the real writer in the owning process.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.raw = []
+        self.sleep = []
+        self.nutrition = []
+        self.markers = []
+
+    def metric_id(self, metric_name, units, category="general"):
+        self.metrics.setdefault(metric_name, (units, category))
+        return metric_name
+
+    def common_data_id(self, timestamp, source):
+        return common_data_key(timestamp, source)
+
+    def add_raw(self, metric_id, common_data_id, qty, data_json):
+        self.raw.append((metric_id, common_data_id, qty, data_json))
+
+    def add_sleep(self, row):
+        self.sleep.append(row)
+
+    def upsert_nutrition(self, common_data_id, values):
+        self.nutrition.append((common_data_id, values))
+
+    def upsert_markers(self, common_data_id, values):
+        self.markers.append((common_data_id, values))
+
+    def __len__(self):
+        return len(self.raw) + len(self.sleep) + len(self.nutrition) + len(self.markers)
+
+    def apply(self, writer):
+        """Replays the recorded rows onto a HealthBulkWriter."""
+        metric_ids = {
+            metric_name: writer.metric_id(metric_name, units, category)
+            for metric_name, (units, category) in self.metrics.items()
+        }
+        for metric_name, key, qty, data_json in self.raw:
+            writer.add_raw(metric_ids[metric_name], writer.common_data_id_for_key(key), qty, data_json)
+        for row in self.sleep:
+            writer.add_sleep(dict(row, common_data_id=writer.common_data_id_for_key(row["common_data_id"])))
+        for key, values in self.nutrition:
+            writer.upsert_nutrition(writer.common_data_id_for_key(key), values)
+        for key, values in self.markers:
+            writer.upsert_markers(writer.common_data_id_for_key(key), values)
+
+
+def _write_upserts(cursor, table, columns, inserts, updates):
+    insert_columns = ["common_data_id", *columns, "created_at", "updated_at"]
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(insert_columns)}) VALUES ({', '.join('?' * len(insert_columns))})",
+        inserts)
+    assignments = ", ".join(f"{column} = COALESCE(?, {column})" for column in columns)
+    cursor.executemany(
+        f"UPDATE {table} SET {assignments}, updated_at = ? WHERE common_data_id = ?",
+        updates)
@@ -1,6 +1,65 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 import os
+import sqlite3
 
 # Database connection setup
 DATABASE_NAME = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/hevy_metal.db"))
-engine = create_engine(f'sqlite:///{DATABASE_NAME}')
+
+# WAL lets dashboard reads proceed while an ingest is writing, and synchronous=NORMAL is durable
+# across application crashes in WAL mode, only a power loss can drop the last commits.
+# Negative cache_size values are KiB.
+BULK_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -256 * 1024,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,
+}
+
+READ_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64 * 1024,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+PRAGMA_PROFILES = {"bulk": BULK_PRAGMAS, "read": READ_PRAGMAS}
+
+
+def apply_pragmas(conn, profile="read"):
+    """Applies a pragma profile ('bulk' or 'read') to a DB-API sqlite3 connection."""
+    cursor = conn.cursor()
+    for name, value in PRAGMA_PROFILES[profile].items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def connect(database_name=DATABASE_NAME, profile="bulk"):
+    """
+    Opens a raw sqlite3 connection with a pragma profile applied.
+    :param profile: Optional. 'bulk' for ingest (the default) or 'read' for queries.
+    """
+    conn = sqlite3.connect(database_name)
+    apply_pragmas(conn, profile)
+    return conn
+
+
+def create_sqlite_engine(database_name=DATABASE_NAME, profile="read", **kwargs):
+    """
+    Creates a SQLAlchemy engine whose every new connection gets the pragma profile applied.
+    Callers should use short-lived sessions: a session left open keeps its connection's read snapshot,
+    so it neither sees later imports nor lets SQLite checkpoint the WAL past it.
+    """
+    sqlite_engine = create_engine(f'sqlite:///{database_name}', **kwargs)
+
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, profile)
+
+    event.listen(sqlite_engine, "connect", on_connect)
+    return sqlite_engine
+
+
+engine = create_sqlite_engine()
@@ -7,14 +7,18 @@ project_root = os.path.abspath(os.path.join(current_dir, "../../"))
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-from sqlalchemy import create_engine, MetaData, select
+from sqlalchemy import MetaData, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex
 from datetime import datetime
 from sqlalchemy.orm import sessionmaker
-from src.database.schema import common_data
+from src.database.schema import common_data, metadata as schema_metadata
+from src.database.connection import create_sqlite_engine
+from src.utils.timestamps import utc_epoch_and_day_key
 
 # Database connection setup
 DATABASE_NAME = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/hevy_metal.db"))
-engine = create_engine(f'sqlite:///{DATABASE_NAME}')
+engine = create_sqlite_engine(DATABASE_NAME)
 metadata = MetaData()  # Metadata for schema
 
 # Session factory
@@ -32,6 +36,7 @@ def get_or_create_common_data_id(cursor, timestamp, source):
     """
     Get or create a common_data_id for a given timestamp and source.
     """
+    utc_epoch, day_key = utc_epoch_and_day_key(timestamp)
     # Check if the entry already exists
     cursor.execute("""
         SELECT common_data_id FROM common_data WHERE date = ? AND source = ?
@@ -43,13 +48,50 @@ def get_or_create_common_data_id(cursor, timestamp, source):
 
     # Insert a new entry
     cursor.execute("""
-        INSERT INTO common_data (date, source)
-        VALUES (?, ?)
+        INSERT INTO common_data (date, source, utc_epoch, day_key)
+        VALUES (?, ?, ?, ?)
     """, (
         timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-        source
+        source,
+        utc_epoch,
+        day_key
     ))
     return cursor.lastrowid
-# filepath: /Users/eliphillips/Documents/Coding Projects/Hevy_Metal/src/utils/historical_health.py
-#from src.database.database_utils import get_or_create_common_data_id
-###GOES IN OTHER FILES###
\ No newline at end of file
+
+def ensure_data_unique_index(cursor):
+    """
+    Makes sure the raw data table has its (metric_id, common_data_id) unique index.
+    Databases created before the index existed may hold duplicates, so those are collapsed
+    to the most recently inserted row first.
+    """
+    cursor.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_data_metric_common_data'
+    """)
+    if cursor.fetchone():
+        return
+
+    cursor.execute("""
+        DELETE FROM data WHERE data_id NOT IN (
+            SELECT MAX(data_id) FROM data GROUP BY metric_id, common_data_id
+        )
+    """)
+    if cursor.rowcount:
+        print(f"Removed {cursor.rowcount} duplicate rows from data before adding its unique index.")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_data_metric_common_data ON data (metric_id, common_data_id)
+    """)
+
+def ensure_indexes(cursor):
+    """
+    Creates every index declared in schema.py that the database is missing.
+    create_all only adds indexes along with new tables, so databases created before an index was
+    declared get it here. Indexes on columns a pending migration has yet to add are left to that
+    migration. Safe to run on every start.
+    """
+    ensure_data_unique_index(cursor)
+    for table in schema_metadata.sorted_tables:
+        columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table.name})")}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if not {column.name for column in index.columns} <= columns:
+                continue
+            cursor.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=sqlite.dialect())))
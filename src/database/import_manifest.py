@@ -0,0 +1,40 @@
+from datetime import datetime
+
+
+class ImportManifest:
+    """
+    Records every export file that has been fully ingested (size, mtime, content hash and the
+    local days it covers) in the import_manifest table, so directory ingest can skip known files
+    and only read the days a new file adds.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def is_ingested(self, file_path, size_bytes, mtime):
+        """Cheap check by path, size and mtime, so unchanged files are skipped without hashing."""
+        row = self.conn.execute("""
+            SELECT 1 FROM import_manifest WHERE file_path = ? AND size_bytes = ? AND mtime = ?
+        """, (file_path, size_bytes, mtime)).fetchone()
+        return row is not None
+
+    def has_hash(self, sha256):
+        row = self.conn.execute("SELECT 1 FROM import_manifest WHERE sha256 = ?", (sha256,)).fetchone()
+        return row is not None
+
+    def covered_through(self):
+        """Latest local day key covered by any ingested file, or None if nothing has been ingested."""
+        return self.conn.execute("SELECT MAX(last_day) FROM import_manifest").fetchone()[0]
+
+    def record(self, sha256, file_path, size_bytes, mtime, first_day, last_day):
+        """Marks a file as fully ingested and commits."""
+        self.conn.execute("""
+            INSERT INTO import_manifest (sha256, file_path, size_bytes, mtime, first_day, last_day, imported_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (sha256) DO UPDATE SET
+                file_path = excluded.file_path,
+                size_bytes = excluded.size_bytes,
+                mtime = excluded.mtime
+        """, (sha256, file_path, size_bytes, mtime, first_day, last_day,
+              datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        self.conn.commit()
@@ -0,0 +1,147 @@
+from datetime import datetime
+from sqlalchemy import inspect, select, func
+from src.database.schema import metadata, schema_version_table, workout_exercises_table, sets_table
+from src.database.database_utils import ensure_indexes
+from src.database.rollups import ROLLUP_QUERIES, rebuild_daily_rollups
+from src.database.workout_writer import HEVY_SOURCE, hevy_utc_epoch_and_day_key
+from src.utils.timestamps import utc_epoch_and_day_key
+
+'''
+Versioned, in-place schema migrations.
+Each step brings an existing database forward by one change to schema.py and is recorded in
+schema_version once applied. Steps must be idempotent: SQLite commits some DDL outside the
+surrounding transaction, so a step interrupted halfway is simply run again.
+New steps are appended to MIGRATIONS with the next version number, never reordered or edited.
+'''
+
+# Suffix of the copies key_sets_to_workout_exercises keeps of the tables it rebuilds
+LEGACY_BACKUP_SUFFIX = "_before_v2"
+
+
+def _column_names(connection, table_name):
+    return {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def create_missing_tables(connection):
+    """Creates every schema.py table the database does not have yet, with its indexes."""
+    metadata.create_all(bind=connection)
+
+
+def key_sets_to_workout_exercises(connection):
+    """
+    Rebuilds workout_exercises and sets from before workout_exercise_id existed.
+    The new primary key and NOT NULL foreign key cannot be added with ALTER TABLE, and the old
+    workout_exercises.workout_id held the Hevy string id, so the rows cannot be converted in place.
+    They are copied to <table>_before_v2 first, then the tables are recreated empty and the Hevy sync
+    state is cleared so the next sync refetches the full history. The copies are left for the user
+    to drop once the sync has run.
+    """
+    if ("workout_exercise_id" in _column_names(connection, "workout_exercises")
+            and "workout_exercise_id" in _column_names(connection, "sets")):
+        return
+    existing = set(inspect(connection).get_table_names())
+    for table in (workout_exercises_table, sets_table):
+        if table.name in existing:
+            # IF NOT EXISTS keeps the first copy when a step interrupted after dropping a table is run again
+            connection.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {table.name}{LEGACY_BACKUP_SUFFIX} AS SELECT * FROM {table.name}")
+    sets_table.drop(connection, checkfirst=True)
+    workout_exercises_table.drop(connection, checkfirst=True)
+    workout_exercises_table.create(connection)
+    sets_table.create(connection)
+    # Watermark and checkpoint keys of historical_hevy.sync_hevy_workouts
+    connection.exec_driver_sql("DELETE FROM sync_state WHERE name LIKE 'hevy_workouts_%'")
+    print(f"Warning: rebuilt workout_exercises and sets empty; their old rows are kept in workout_exercises"
+          f"{LEGACY_BACKUP_SUFFIX} and sets{LEGACY_BACKUP_SUFFIX}, and the next Hevy sync refetches every workout.")
+
+
+def add_foreign_key_indexes(connection):
+    """Creates the common_data_id and hot lookup indexes on databases that predate them."""
+    ensure_indexes(connection.connection.cursor())
+
+
+def add_daily_rollups(connection):
+    """
+    Creates the daily_* rollup tables and fills them from the data already stored.
+    The rollups group by common_data.day_key, so databases that predate it are filled by
+    add_canonical_timestamps instead.
+    """
+    for table_name in ROLLUP_QUERIES:
+        metadata.tables[table_name].create(connection, checkfirst=True)
+    if "day_key" in _column_names(connection, "common_data"):
+        rebuild_daily_rollups(connection.connection.cursor())
+
+
+def add_canonical_timestamps(connection):
+    """
+    Adds common_data.utc_epoch and common_data.day_key, fills them from the stored date strings
+    and rebuilds the daily rollups on the new day keys.
+    Health rows stored their local wall-clock time without its offset, so their epoch is recovered in
+    this machine's time zone; their day key is exact either way.
+    """
+    columns = _column_names(connection, "common_data")
+    for column in ("utc_epoch", "day_key"):
+        if column not in columns:
+            connection.exec_driver_sql(f"ALTER TABLE common_data ADD COLUMN {column} INTEGER")
+
+    cursor = connection.connection.cursor()
+    rows = cursor.execute(
+        "SELECT common_data_id, date, source FROM common_data WHERE utc_epoch IS NULL OR day_key IS NULL").fetchall()
+    updates = []
+    for common_data_id, date, source in rows:
+        if source == HEVY_SOURCE:
+            updates.append((*hevy_utc_epoch_and_day_key(date), common_data_id))
+        else:
+            updates.append((*utc_epoch_and_day_key(date), common_data_id))
+    cursor.executemany("UPDATE common_data SET utc_epoch = ?, day_key = ? WHERE common_data_id = ?", updates)
+    if updates:
+        print(f"Filled utc_epoch and day_key for {len(updates)} common_data rows.")
+    ensure_indexes(cursor)
+    rebuild_daily_rollups(cursor)
+
+
+def key_sleep_rollups_by_wake_day(connection):
+    """
+    Rebuilds daily_sleep on the day each session ends rather than the day it starts, which counted a
+    night that began before midnight on the same day as the previous night, and adds the index its
+    day refreshes search.
+    """
+    cursor = connection.connection.cursor()
+    ensure_indexes(cursor)
+    rebuild_daily_rollups(cursor, ("daily_sleep",))
+
+
+# (version, name, step) in the order they are applied
+MIGRATIONS = [
+    (1, "create missing tables", create_missing_tables),
+    (2, "key sets to workout_exercises", key_sets_to_workout_exercises),
+    (3, "index foreign keys and hot lookup columns", add_foreign_key_indexes),
+    (4, "daily rollup tables", add_daily_rollups),
+    (5, "canonical utc_epoch and day_key on common_data", add_canonical_timestamps),
+    (6, "daily_sleep keyed by wake day", key_sleep_rollups_by_wake_day),
+]
+
+
+def schema_version(connection):
+    """Returns the version of the last applied migration, 0 for a database that has none."""
+    schema_version_table.create(connection, checkfirst=True)
+    return connection.execute(select(func.coalesce(func.max(schema_version_table.c.version), 0))).scalar()
+
+
+def migrate(engine):
+    """
+    Applies every pending migration in order, each in its own transaction.
+    :return: The schema version the database is at afterwards.
+    """
+    with engine.begin() as connection:
+        version = schema_version(connection)
+    for step_version, name, step in MIGRATIONS:
+        if step_version <= version:
+            continue
+        with engine.begin() as connection:
+            step(connection)
+            connection.execute(schema_version_table.insert().values(
+                version=step_version, name=name, applied_at=datetime.now()))
+        print(f"Applied migration {step_version}: {name}")
+        version = step_version
+    return version
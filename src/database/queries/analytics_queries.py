@@ -0,0 +1,80 @@
+from src.database.analytics import DAY_KEY_DATE, DAY_KEY_WEEK, run_analytics_query
+from src.database.rollups import date_day_key
+
+# Day key bounds used when a range end is left open, so every query keeps a fixed parameter list
+FIRST_DAY_KEY = 0
+LAST_DAY_KEY = 99991231
+
+WEEKLY_TRAINING_VOLUME = """
+    SELECT {week} AS "Week",
+           COUNT(DISTINCT workouts.workout_id) AS "Workouts",
+           COUNT(sets.set_id) AS "Sets",
+           SUM(sets.reps) AS "Reps",
+           SUM(sets.weight_kg * sets.reps) AS "Volume (kg)"
+    FROM common_data
+    JOIN workouts ON workouts.common_data_id = common_data.common_data_id
+    JOIN workout_exercises ON workout_exercises.workout_id = workouts.workout_id
+    JOIN sets ON sets.workout_exercise_id = workout_exercises.workout_exercise_id
+    WHERE common_data.day_key >= ? AND common_data.day_key <= ?
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+# One row per day with any rollup, for correlating training with recovery, nutrition and sleep
+DAILY_METRICS = """
+    SELECT {date} AS "Date",
+           daily_health.resting_heart_rate AS "Resting Heart Rate",
+           daily_health.heart_rate_variability AS "Heart Rate Variability",
+           daily_health.body_weight_lbs AS "Body Weight (lbs)",
+           daily_nutrition.calories AS "Calories",
+           daily_nutrition.protein_g AS "Protein (g)",
+           daily_sleep.sleep_duration_hours AS "Sleep Duration (hrs)",
+           daily_sleep.deep_sleep_duration_hours AS "Deep Sleep (hrs)",
+           daily_training.sets AS "Sets",
+           daily_training.volume_kg AS "Volume (kg)"
+    FROM (
+        SELECT day_key FROM daily_health UNION SELECT day_key FROM daily_nutrition
+        UNION SELECT day_key FROM daily_sleep UNION SELECT day_key FROM daily_training
+    ) AS days
+    LEFT JOIN daily_health ON daily_health.day_key = days.day_key
+    LEFT JOIN daily_nutrition ON daily_nutrition.day_key = days.day_key
+    LEFT JOIN daily_sleep ON daily_sleep.day_key = days.day_key
+    LEFT JOIN daily_training ON daily_training.day_key = days.day_key
+    WHERE days.day_key >= ? AND days.day_key <= ?
+    ORDER BY days.day_key
+"""
+
+
+def day_key_range(start_date, end_date):
+    """Returns the inclusive (first, last) day keys of a date range, open ends widened to every day."""
+    return (date_day_key(start_date) if start_date else FIRST_DAY_KEY,
+            date_day_key(end_date) if end_date else LAST_DAY_KEY)
+
+
+def query_get_weekly_training_volume(start_date=None, end_date=None, backend=None, as_arrow=False):
+    """
+    Returns workouts, sets, reps and volume per ISO week (starting Monday) from the individual sets.
+    :param backend: Optional. Analytics backend, see analytics.ANALYTICS_BACKENDS.
+    :param as_arrow: Optional. Return a pyarrow Table instead of a pandas DataFrame.
+    """
+    sql = {dialect: WEEKLY_TRAINING_VOLUME.format(week=week.format(day_key="common_data.day_key"))
+           for dialect, week in DAY_KEY_WEEK.items()}
+    return run_analytics_query(sql, day_key_range(start_date, end_date), backend, as_arrow, date_columns=["Week"])
+
+
+def query_get_daily_metrics(start_date=None, end_date=None, backend=None, as_arrow=False):
+    """
+    Returns one row per day joining the health, nutrition, sleep and training rollups, e.g. for
+    DataFrame.corr(). Days without a given rollup have NULLs in its columns.
+    :param backend: Optional. Analytics backend, see analytics.ANALYTICS_BACKENDS.
+    :param as_arrow: Optional. Return a pyarrow Table instead of a pandas DataFrame.
+    """
+    sql = {dialect: DAILY_METRICS.format(date=day.format(day_key="days.day_key"))
+           for dialect, day in DAY_KEY_DATE.items()}
+    return run_analytics_query(sql, day_key_range(start_date, end_date), backend, as_arrow, date_columns=["Date"])
+
+
+__all__ = [
+    "query_get_weekly_training_volume",
+    "query_get_daily_metrics",
+]
@@ -1,10 +1,11 @@
 from sqlalchemy import select, and_, func
-from sqlalchemy.orm import Session
-from src.database.schema import health_markers_table, common_data
+from sqlalchemy.orm import sessionmaker
+from src.database.schema import health_markers_table, common_data, daily_health_table
+from src.database.rollups import day_key_as_date, day_key_conditions
 from src.database.connection import engine  # Assuming `engine` is defined in a connection module
 
-# Initialize the database session
-db = Session(bind=engine)
+# Each query opens its own session, so no connection holds a read snapshot open between queries
+SessionLocal = sessionmaker(bind=engine)
 
 def query_get_health_markers(start_date=None, end_date=None):
     # Join health_markers_table with common_data to filter by date
@@ -22,50 +23,42 @@ def query_get_health_markers(start_date=None, end_date=None):
     ).join(
         common_data, health_markers_table.c.common_data_id == common_data.c.common_data_id
     ).order_by(
-        common_data.c.date
+        common_data.c.day_key, common_data.c.utc_epoch
     )
 
-    if start_date or end_date:
-        conditions = []
-        if start_date:
-            conditions.append(common_data.c.date >= start_date)
-        if end_date:
-            conditions.append(common_data.c.date <= end_date)
+    conditions = day_key_conditions(common_data.c.day_key, start_date, end_date)
+    if conditions:
         query = query.where(and_(*conditions))
 
-    return db.execute(query).fetchall()
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
 
 def query_get_aggregated_health_markers(start_date=None, end_date=None):
     """
-    Aggregates health marker data by date, combining data from multiple sources.
+    Returns daily health markers, combining data from multiple sources, from the daily_health rollup.
     """
     query = select(
-        func.date(common_data.c.date).label("Date"),
-        func.avg(health_markers_table.c.heart_rate_avg).label("Heart Rate Avg"),
-        func.min(health_markers_table.c.heart_rate_min).label("Heart Rate Min"),
-        func.max(health_markers_table.c.heart_rate_max).label("Heart Rate Max"),
-        func.avg(health_markers_table.c.vo2_max).label("VO2 Max"),
-        func.avg(health_markers_table.c.body_weight_lbs).label("Body Weight (lbs)"),
-        func.avg(health_markers_table.c.body_mass_index).label("BMI"),
-        func.avg(health_markers_table.c.respiratory_rate).label("Respiratory Rate"),
-        func.avg(health_markers_table.c.blood_oxygen_saturation).label("Blood Oxygen Saturation"),
-        func.sum(health_markers_table.c.time_in_daylight_min).label("Time in Daylight (min)")
-    ).join(
-        common_data, health_markers_table.c.common_data_id == common_data.c.common_data_id
-    ).group_by(
-        func.date(common_data.c.date)
+        day_key_as_date(daily_health_table.c.day_key).label("Date"),
+        daily_health_table.c.heart_rate_avg.label("Heart Rate Avg"),
+        daily_health_table.c.heart_rate_min.label("Heart Rate Min"),
+        daily_health_table.c.heart_rate_max.label("Heart Rate Max"),
+        daily_health_table.c.vo2_max.label("VO2 Max"),
+        daily_health_table.c.body_weight_lbs.label("Body Weight (lbs)"),
+        daily_health_table.c.body_mass_index.label("BMI"),
+        daily_health_table.c.respiratory_rate.label("Respiratory Rate"),
+        daily_health_table.c.blood_oxygen_saturation.label("Blood Oxygen Saturation"),
+        daily_health_table.c.time_in_daylight_min.label("Time in Daylight (min)")
     ).order_by(
-        func.date(common_data.c.date)
+        daily_health_table.c.day_key
     )
 
-    if start_date or end_date:
-        conditions = []
-        if start_date:
-            conditions.append(common_data.c.date >= start_date)
-        if end_date:
-            conditions.append(common_data.c.date <= end_date)
+    conditions = day_key_conditions(daily_health_table.c.day_key, start_date, end_date)
+    if conditions:
         query = query.where(and_(*conditions))
 
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
+
 def query_get_body_weight_over_time(start_date=None, end_date=None):
     """
     Retrieves body weight data over time, optionally filtered by date range.
@@ -76,17 +69,14 @@ def query_get_body_weight_over_time(start_date=None, end_date=None):
     ).join(
         common_data, health_markers_table.c.common_data_id == common_data.c.common_data_id
     ).order_by(
-        common_data.c.date
+        common_data.c.day_key, common_data.c.utc_epoch
     ).where(
         health_markers_table.c.body_weight_lbs.isnot(None)  # Ensure body weight is not null
     )
-    if start_date or end_date:
-        conditions = []
-        if start_date:
-            conditions.append(common_data.c.date >= start_date)
-        if end_date:
-            conditions.append(common_data.c.date <= end_date)
+    conditions = day_key_conditions(common_data.c.day_key, start_date, end_date)
+    if conditions:
         query = query.where(and_(*conditions))
 
 
-    return db.execute(query).fetchall()
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
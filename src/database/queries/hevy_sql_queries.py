@@ -2,28 +2,37 @@
 from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey, select, func
 from sqlalchemy.types import DateTime, Date  # Correct import for DateTime and Date
 import datetime
-from src.database.schema import metadata, exercises_table, workouts_table, workout_exercises_table, sets_table, sleep_data_table, nutrition_data_table, diet_cycles_table
+from src.database.schema import metadata, common_data, exercises_table, workouts_table, workout_exercises_table, sets_table, sleep_data_table, nutrition_data_table, diet_cycles_table, daily_training_table
+from src.database.rollups import day_key_as_date, day_key_conditions
+from src.database.analytics import run_analytics_query
+from src.database.queries.analytics_queries import day_key_range
 from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import sessionmaker
 from src.database.connection import engine  # Assuming `engine` is defined in a connection module
 
-# Initialize the database session
-db = Session(bind=engine)
-
-def query_apply_date_filter(query, table, start_date=None, end_date=None, date_column='start_time'):  # Updated default to `start_time`
-    """Applies a date range filter to a SQLAlchemy query on a specified date column."""
-    conditions = []
-    if start_date:
-        conditions.append(table.c[date_column] >= start_date)
-    if end_date:
-        conditions.append(table.c[date_column] <= end_date)
-
+# Each query opens its own session, so no connection holds a read snapshot open between queries
+SessionLocal = sessionmaker(bind=engine)
+
+# Same SQL on every analytics backend, see analytics.run_analytics_query
+EXERCISE_COUNTS = """
+    SELECT exercises.exercise_name AS exercise_name,
+           COUNT(workout_exercises.exercise_id) AS occurrence_count
+    FROM common_data
+    JOIN workouts ON workouts.common_data_id = common_data.common_data_id
+    JOIN workout_exercises ON workout_exercises.workout_id = workouts.workout_id
+    JOIN exercises ON exercises.exercise_id = workout_exercises.exercise_id
+    WHERE common_data.day_key >= ? AND common_data.day_key <= ?
+    GROUP BY exercises.exercise_name
+    ORDER BY occurrence_count DESC, exercises.exercise_name
+"""
+
+def query_apply_date_filter(query, table, start_date=None, end_date=None, date_column='day_key'):
+    """Applies an inclusive date range filter to a SQLAlchemy query on a specified YYYYMMDD day key column."""
+    conditions = day_key_conditions(table.c[date_column], start_date, end_date)
     if conditions:
         return query.where(and_(*conditions))
     return query
 
-print("Debug: Columns in workouts_table:", workouts_table.columns.keys())  # Confirm available columns
-
 def query_get_all_workouts(start_date=None, end_date=None):
     """Returns a query for all workouts, ordered by start time."""
     query = select(
@@ -31,18 +40,13 @@ def query_get_all_workouts(start_date=None, end_date=None):
         workouts_table.c.workout_name,  # Correct column name
         workouts_table.c.start_time,
         workouts_table.c.end_time
-    ).order_by(workouts_table.c.start_time.desc())  # Ensure `start_time` is used for ordering
+    ).join(
+        common_data, workouts_table.c.common_data_id == common_data.c.common_data_id
+    ).order_by(common_data.c.day_key.desc(), common_data.c.utc_epoch.desc())
 
-    if start_date or end_date:
-        conditions = []
-        if start_date:
-            conditions.append(workouts_table.c.start_time >= start_date)  # Use `start_time` for filtering
-        if end_date:
-            conditions.append(workouts_table.c.start_time <= end_date)  # Use `start_time` for filtering
-        query = query.where(and_(*conditions))
-
-    print("Debug: Generated Query:", query)  # Log the generated query
-    return db.execute(query).fetchall()
+    query = query_apply_date_filter(query, common_data, start_date, end_date)
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
 
 def query_get_exercises_in_workout(workout_id):
     query = select(
@@ -51,7 +55,8 @@ def query_get_exercises_in_workout(workout_id):
         join(workout_exercises_table, exercises_table.c.exercise_id == workout_exercises_table.c.exercise_id).\
         where(workout_exercises_table.c.workout_id == workout_id)
     
-    return db.execute(query).fetchall()
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
 
 def query_get_sets_for_exercise_in_workout(workout_id, exercise_name):
     query = select(
@@ -65,23 +70,73 @@ def query_get_sets_for_exercise_in_workout(workout_id, exercise_name):
         where(and_(workout_exercises_table.c.workout_id == workout_id, exercises_table.c.exercise_name == exercise_name)).\
         order_by(sets_table.c.set_index)
     
-    return db.execute(query).fetchall()
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
+
+def query_get_workout_detail(workout_id):
+    """
+    Returns every exercise and set of one workout in a single query, ordered by exercise then set.
+    Exercises without sets come back once with NULL set columns.
+    """
+    query = select(
+        workout_exercises_table.c.workout_exercise_id,
+        workout_exercises_table.c.exercise_index,
+        exercises_table.c.exercise_name,
+        workout_exercises_table.c.exercise_notes,
+        workout_exercises_table.c.superset_id,
+        sets_table.c.set_index,
+        sets_table.c.set_type,
+        sets_table.c.weight_kg,
+        sets_table.c.reps,
+        sets_table.c.duration_seconds,
+        sets_table.c.rpe
+    ).\
+        join(exercises_table, workout_exercises_table.c.exercise_id == exercises_table.c.exercise_id).\
+        outerjoin(sets_table, sets_table.c.workout_exercise_id == workout_exercises_table.c.workout_exercise_id).\
+        where(workout_exercises_table.c.workout_id == workout_id).\
+        order_by(workout_exercises_table.c.exercise_index, sets_table.c.set_index)
+
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
+
+def query_get_daily_training(start_date=None, end_date=None):
+    """Returns workouts, duration, sets, reps and volume per day from the daily_training rollup."""
+    query = select(
+        day_key_as_date(daily_training_table.c.day_key).label("Date"),
+        daily_training_table.c.workouts,
+        daily_training_table.c.duration_minutes,
+        daily_training_table.c.sets,
+        daily_training_table.c.reps,
+        daily_training_table.c.volume_kg
+    ).order_by(daily_training_table.c.day_key)
+
+    conditions = day_key_conditions(daily_training_table.c.day_key, start_date, end_date)
+    if conditions:
+        query = query.where(and_(*conditions))
+
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
 
 def query_get_all_unique_exercise_names(start_date=None, end_date=None):
     """Returns a query for all unique exercise names."""
     query = select(exercises_table.c.exercise_name).distinct()
-    
-    return query_apply_date_filter(query, workout_exercises_table, start_date, end_date)
-
-def query_get_exercise_counts(start_date=None, end_date=None):
-    """Returns a query for counting the occurrences of each exercise."""
-    query = select(exercises_table.c.exercise_name, func.count(workout_exercises_table.c.exercise_id).label('occurrence_count')).\
-        join(workout_exercises_table, exercises_table.c.exercise_id == workout_exercises_table.c.exercise_id).\
-        join(workouts_table, workout_exercises_table.c.workout_id == workouts_table.c.workout_id).\
-        group_by(exercises_table.c.exercise_name).\
-        order_by(func.count(workout_exercises_table.c.exercise_id).desc())
-    
-    return query_apply_date_filter(query, workouts_table, start_date, end_date)
+    if start_date or end_date:
+        query = query.\
+            join(workout_exercises_table, exercises_table.c.exercise_id == workout_exercises_table.c.exercise_id).\
+            join(workouts_table, workout_exercises_table.c.workout_id == workouts_table.c.workout_id).\
+            join(common_data, workouts_table.c.common_data_id == common_data.c.common_data_id)
+
+    return query_apply_date_filter(query, common_data, start_date, end_date)
+
+def query_get_exercise_counts(start_date=None, end_date=None, backend=None, as_arrow=False):
+    """
+    Returns exercise_name and occurrence_count per exercise, most performed first, as a DataFrame.
+    Runs on the analytics backend, so long ranges aggregate in DuckDB when it is available.
+    :param backend: Optional. Analytics backend, see analytics.ANALYTICS_BACKENDS.
+    :param as_arrow: Optional. Return a pyarrow Table instead of a pandas DataFrame.
+    """
+    sql = {"sqlite": EXERCISE_COUNTS, "duckdb": EXERCISE_COUNTS}
+    return run_analytics_query(sql, day_key_range(start_date, end_date), backend, as_arrow)
 # More query functions using SQLAlchemy Core
 
 def query_insert_diet_cycle(start_date, cycle_type, end_date=None, notes=None):
@@ -122,6 +177,8 @@ __all__ = [
     "query_get_all_workouts",
     "query_get_exercises_in_workout",
     "query_get_sets_for_exercise_in_workout",
+    "query_get_workout_detail",
+    "query_get_daily_training",
     "query_get_all_unique_exercise_names",
     "query_get_exercise_counts",
     "query_insert_diet_cycle",
@@ -1,10 +1,11 @@
 from sqlalchemy import select, and_
-from sqlalchemy.orm import Session
-from src.database.schema import nutrition_data_table, common_data
+from sqlalchemy.orm import sessionmaker
+from src.database.schema import nutrition_data_table, common_data, daily_nutrition_table
+from src.database.rollups import day_key_as_date, day_key_conditions
 from src.database.connection import engine  # Assuming `engine` is defined in a connection module
 
-# Initialize the database session
-db = Session(bind=engine)
+# Each query opens its own session, so no connection holds a read snapshot open between queries
+SessionLocal = sessionmaker(bind=engine)
 
 def query_get_nutrition_data(start_date=None, end_date=None):
     # Join nutrition_data_table with common_data to filter by date
@@ -16,14 +17,28 @@ def query_get_nutrition_data(start_date=None, end_date=None):
         nutrition_data_table.c.fat_g.label("Fat (g)")
     ).join(
         common_data, nutrition_data_table.c.common_data_id == common_data.c.common_data_id
-    ).order_by(common_data.c.date)
+    ).order_by(common_data.c.day_key, common_data.c.utc_epoch)
 
-    if start_date or end_date:
-        conditions = []
-        if start_date:
-            conditions.append(common_data.c.date >= start_date)
-        if end_date:
-            conditions.append(common_data.c.date <= end_date)
+    conditions = day_key_conditions(common_data.c.day_key, start_date, end_date)
+    if conditions:
         query = query.where(and_(*conditions))
 
-    return db.execute(query).fetchall()
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
+
+def query_get_daily_nutrition(start_date=None, end_date=None):
+    """Returns one nutrition row per day from the daily_nutrition rollup."""
+    query = select(
+        day_key_as_date(daily_nutrition_table.c.day_key).label("Date"),
+        daily_nutrition_table.c.protein_g.label("Protein (g)"),
+        daily_nutrition_table.c.calories.label("Calories"),
+        daily_nutrition_table.c.carbohydrates_g.label("Carbohydrates (g)"),
+        daily_nutrition_table.c.fat_g.label("Fat (g)")
+    ).order_by(daily_nutrition_table.c.day_key)
+
+    conditions = day_key_conditions(daily_nutrition_table.c.day_key, start_date, end_date)
+    if conditions:
+        query = query.where(and_(*conditions))
+
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
@@ -1,15 +1,13 @@
 from sqlalchemy import select, and_
-from sqlalchemy.orm import Session
-from src.database.schema import sleep_data_table, common_data
+from sqlalchemy.orm import sessionmaker
+from src.database.schema import sleep_data_table, common_data, daily_sleep_table
+from src.database.rollups import day_key_as_date, day_key_conditions
 from src.database.connection import engine  # Assuming `engine` is defined in a connection module
 
-# Initialize the database session
-db = Session(bind=engine)
+# Each query opens its own session, so no connection holds a read snapshot open between queries
+SessionLocal = sessionmaker(bind=engine)
 
 def query_get_sleep_data(start_date=None, end_date=None):
-    # Debugging: Log the input parameters
-    print(f"query_get_sleep_data called with start_date={start_date}, end_date={end_date}")
-
     # Join sleep_data_table with common_data to include the source column
     query = select(
         common_data.c.date.label("Date"),
@@ -27,19 +25,33 @@ def query_get_sleep_data(start_date=None, end_date=None):
     ).join(
         common_data, sleep_data_table.c.common_data_id == common_data.c.common_data_id
     ).order_by(
-        common_data.c.date, common_data.c.source
+        common_data.c.day_key, common_data.c.utc_epoch, common_data.c.source
     )
 
-    if start_date or end_date:
-        conditions = []
-        if start_date:
-            conditions.append(common_data.c.date >= start_date)
-        if end_date:
-            conditions.append(common_data.c.date <= end_date)
+    conditions = day_key_conditions(common_data.c.day_key, start_date, end_date)
+    if conditions:
         query = query.where(and_(*conditions))
 
-    # Debugging: Log the generated query
-    print("Generated Sleep Data Query:")
-    print(query)
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
+
+
+def query_get_daily_sleep(start_date=None, end_date=None):
+    """Returns one sleep summary row per day from the daily_sleep rollup."""
+    query = select(
+        day_key_as_date(daily_sleep_table.c.day_key).label("Date"),
+        daily_sleep_table.c.sessions.label("Sessions"),
+        daily_sleep_table.c.in_bed_duration_hours.label("In Bed Duration (hrs)"),
+        daily_sleep_table.c.sleep_duration_hours.label("Sleep Duration (hrs)"),
+        daily_sleep_table.c.awake_duration_hours.label("Awake Duration (hrs)"),
+        daily_sleep_table.c.rem_sleep_duration_hours.label("REM Sleep (hrs)"),
+        daily_sleep_table.c.deep_sleep_duration_hours.label("Deep Sleep (hrs)"),
+        daily_sleep_table.c.core_sleep_duration_hours.label("Core Sleep (hrs)")
+    ).order_by(daily_sleep_table.c.day_key)
+
+    conditions = day_key_conditions(daily_sleep_table.c.day_key, start_date, end_date)
+    if conditions:
+        query = query.where(and_(*conditions))
 
-    return db.execute(query).fetchall()
+    with SessionLocal() as db:
+        return db.execute(query).fetchall()
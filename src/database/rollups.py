@@ -0,0 +1,140 @@
+from sqlalchemy import func
+
+'''
+Maintains the daily_* rollup tables from the fact tables.
+A day's rollup row is always recomputed whole from its source rows rather than adjusted by deltas,
+so updates and deletes need no special handling: writers only report which days they touched.
+'''
+
+# Local day key (YYYYMMDD) of a common_data row, as written by every ingester
+COMMON_DATA_DAY_KEY = "common_data.day_key"
+# Local day key of the day a sleep session ends on, from the 'YYYY-MM-DD HH:MM:SS +ZZZZ' end_time in the
+# session's own offset, so a night counts once, towards the morning it ends on, wherever midnight falls.
+# Written exactly as schema.py's ix_sleep_data_wake_day_key so day refreshes can search that index.
+SLEEP_WAKE_DAY_KEY = "CAST(REPLACE(SUBSTR(sleep_data.end_time, 1, 10), '-', '') AS INTEGER)"
+
+# Rollup table -> SELECT producing its rows in the table's column order, with a {where} slot
+# restricting the source rows read.
+# Health markers keep the dashboard's averaging across sources. Nutrition and sleep are summed within
+# each source and the largest source wins, so a day synced from two apps is not counted twice.
+ROLLUP_QUERIES = {
+    "daily_health": f"""
+        SELECT {COMMON_DATA_DAY_KEY} AS day_key,
+               MIN(heart_rate_min), MAX(heart_rate_max), AVG(heart_rate_avg), AVG(heart_rate_variability),
+               AVG(resting_heart_rate), AVG(respiratory_rate), AVG(blood_oxygen_saturation), AVG(vo2_max),
+               AVG(body_weight_lbs), AVG(body_mass_index), SUM(time_in_daylight_min)
+        FROM health_markers
+        JOIN common_data ON health_markers.common_data_id = common_data.common_data_id
+        {{where}}
+        GROUP BY day_key
+    """,
+    "daily_nutrition": f"""
+        SELECT day_key, MAX(calories), MAX(protein_g), MAX(carbohydrates_g), MAX(fat_g), MAX(caffeine_mg),
+               MAX(water_floz), MAX(fiber_g), MAX(potassium_mg), MAX(sodium_mg), MAX(sugar_g)
+        FROM (
+            SELECT {COMMON_DATA_DAY_KEY} AS day_key, SUM(calories) AS calories, SUM(protein_g) AS protein_g,
+                   SUM(carbohydrates_g) AS carbohydrates_g, SUM(fat_g) AS fat_g, SUM(caffeine_mg) AS caffeine_mg,
+                   SUM(water_floz) AS water_floz, SUM(fiber_g) AS fiber_g, SUM(potassium_mg) AS potassium_mg,
+                   SUM(sodium_mg) AS sodium_mg, SUM(sugar_g) AS sugar_g
+            FROM nutrition_data
+            JOIN common_data ON nutrition_data.common_data_id = common_data.common_data_id
+            {{where}}
+            GROUP BY day_key, common_data.source
+        )
+        GROUP BY day_key
+    """,
+    "daily_sleep": f"""
+        SELECT day_key, MAX(sessions), MAX(in_bed), MAX(asleep), MAX(awake), MAX(rem), MAX(deep), MAX(core)
+        FROM (
+            SELECT {SLEEP_WAKE_DAY_KEY} AS day_key, COUNT(*) AS sessions,
+                   SUM(in_bed_duration_hours) AS in_bed, SUM(sleep_duration_hours) AS asleep,
+                   SUM(awake_duration_hours) AS awake, SUM(rem_sleep_duration_hours) AS rem,
+                   SUM(deep_sleep_duration_hours) AS deep, SUM(core_sleep_duration_hours) AS core
+            FROM sleep_data
+            JOIN common_data ON sleep_data.common_data_id = common_data.common_data_id
+            {{where}}
+            GROUP BY {SLEEP_WAKE_DAY_KEY}, common_data.source
+        )
+        GROUP BY day_key
+    """,
+    "daily_training": f"""
+        SELECT day_key, COUNT(*), SUM(duration_minutes), SUM(sets), SUM(reps), SUM(volume_kg)
+        FROM (
+            SELECT {COMMON_DATA_DAY_KEY} AS day_key,
+                   (strftime('%s', workouts.end_time) - strftime('%s', workouts.start_time)) / 60.0 AS duration_minutes,
+                   COUNT(sets.set_id) AS sets, SUM(sets.reps) AS reps, SUM(sets.weight_kg * sets.reps) AS volume_kg
+            -- CROSS JOIN pins the join order, so a day refresh starts from the common_data rows of that day
+            -- rather than walking workouts in workout_id order for the GROUP BY
+            FROM common_data
+            CROSS JOIN workouts ON workouts.common_data_id = common_data.common_data_id
+            LEFT JOIN workout_exercises ON workout_exercises.workout_id = workouts.workout_id
+            LEFT JOIN sets ON sets.workout_exercise_id = workout_exercises.workout_exercise_id
+            {{where}}
+            GROUP BY workouts.workout_id
+        )
+        GROUP BY day_key
+    """,
+}
+
+# A single day's source rows, found through ix_common_data_day_key
+DAY_WHERE = "WHERE common_data.day_key = ?"
+# Rollups whose day is not the common_data day, with the clause selecting one day of their source rows
+ROLLUP_DAY_WHERE = {"daily_sleep": f"WHERE {SLEEP_WAKE_DAY_KEY} = ?"}
+
+# Largest IN list sent in one statement, below SQLite's default bound parameter limit
+ID_CHUNK_SIZE = 500
+
+
+def date_day_key(value):
+    """Returns the YYYYMMDD key of a date, datetime or 'YYYY-MM-DD...' string."""
+    if isinstance(value, str):
+        return int(value[:10].replace("-", ""))
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def day_key_as_date(day_key_column):
+    """SQLAlchemy expression rendering a day_key column as a 'YYYY-MM-DD' string."""
+    return func.printf("%04d-%02d-%02d", day_key_column // 10000, day_key_column // 100 % 100, day_key_column % 100)
+
+
+def day_key_conditions(day_key_column, start_date=None, end_date=None):
+    """Returns the conditions restricting a day_key column to an inclusive date range."""
+    conditions = []
+    if start_date:
+        conditions.append(day_key_column >= date_day_key(start_date))
+    if end_date:
+        conditions.append(day_key_column <= date_day_key(end_date))
+    return conditions
+
+
+def day_keys_for_common_data(cursor, common_data_ids):
+    """Returns the set of day keys of the given common_data rows."""
+    common_data_ids = list(common_data_ids)
+    day_keys = set()
+    for start in range(0, len(common_data_ids), ID_CHUNK_SIZE):
+        chunk = common_data_ids[start:start + ID_CHUNK_SIZE]
+        day_keys.update(row[0] for row in cursor.execute(
+            f"SELECT DISTINCT {COMMON_DATA_DAY_KEY} FROM common_data "
+            f"WHERE common_data_id IN ({', '.join('?' * len(chunk))})", chunk))
+    return day_keys
+
+
+def refresh_daily_rollups(cursor, table, day_keys):
+    """
+    Recomputes one rollup table's rows for the given days. Days left without source rows lose their row.
+    Does not commit, so the rollup lands in the same transaction as the rows it summarizes.
+    """
+    # Rows stored before the day_key column was backfilled have no day to refresh
+    days = [(day_key,) for day_key in sorted(set(day_keys) - {None})]
+    if not days:
+        return
+    cursor.executemany(f"DELETE FROM {table} WHERE day_key = ?", days)
+    day_where = ROLLUP_DAY_WHERE.get(table, DAY_WHERE)
+    cursor.executemany(f"INSERT INTO {table} {ROLLUP_QUERIES[table].format(where=day_where)}", days)
+
+
+def rebuild_daily_rollups(cursor, tables=tuple(ROLLUP_QUERIES)):
+    """Recomputes the given rollup tables from scratch. Does not commit."""
+    for table in tables:
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"INSERT INTO {table} {ROLLUP_QUERIES[table].format(where='')}")
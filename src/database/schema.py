@@ -1,6 +1,5 @@
 # workout-analytics/database_schema.py
-from sqlalchemy import MetaData, Table, Column, Integer, String, Float, DateTime, Date, ForeignKey, UniqueConstraint
-from src.database.connection import engine
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float, DateTime, Date, ForeignKey, UniqueConstraint, Index, cast, func
 
 metadata = MetaData()
 
@@ -8,7 +7,15 @@ common_data = Table('common_data', metadata,
     Column('common_data_id', Integer, primary_key=True),
     Column('date', DateTime, nullable=False),
     Column('source', String),
-    UniqueConstraint('date', 'source', name='uq_date_source')
+    # Canonical forms of date written by every ingester: UTC epoch seconds for exact ordering and ranges,
+    # and the YYYYMMDD local calendar day for day-granular filters and the daily_* rollups
+    Column('utc_epoch', Integer),
+    Column('day_key', Integer),
+    # date keeps its per-source formatting and only serves the (date, source) dedupe lookup
+    UniqueConstraint('date', 'source', name='uq_date_source'),
+    # utc_epoch second, so a day range comes back in time order straight from the index
+    Index('ix_common_data_day_key', 'day_key', 'utc_epoch'),
+    Index('ix_common_data_utc_epoch', 'utc_epoch')
 )
 
 workouts_table = Table('workouts', metadata,
@@ -21,6 +28,8 @@ workouts_table = Table('workouts', metadata,
     Column('end_time', DateTime),
     Column('created_at', DateTime),
     Column('updated_at', DateTime),
+    Index('ix_workouts_common_data_id', 'common_data_id'),
+    Index('ix_workouts_start_time', 'start_time'),
 )
 
 exercises_table = Table('exercises', metadata,
@@ -30,15 +39,19 @@ exercises_table = Table('exercises', metadata,
 )
 
 workout_exercises_table = Table('workout_exercises', metadata,
+    Column('workout_exercise_id', Integer, primary_key=True, autoincrement=True),
     Column('workout_id', Integer, ForeignKey('workouts.workout_id'), nullable=False),
     Column('exercise_id', Integer, ForeignKey('exercises.exercise_id'), nullable=False),
     Column('exercise_index', Integer, nullable=False),
     Column('exercise_notes', String),
     Column('superset_id', Integer),
+    Index('ix_workout_exercises_workout_id_exercise_index', 'workout_id', 'exercise_index'),
+    Index('ix_workout_exercises_exercise_id', 'exercise_id'),
 )
 
 sets_table = Table('sets', metadata,
     Column('set_id', Integer, primary_key=True),
+    Column('workout_exercise_id', Integer, ForeignKey('workout_exercises.workout_exercise_id'), nullable=False),
     Column('exercise_id', Integer, ForeignKey('exercises.exercise_id'), nullable=False),
     Column('set_index', Integer, nullable=False),
     Column('set_type', String),
@@ -47,6 +60,8 @@ sets_table = Table('sets', metadata,
     Column('duration_seconds', Float),
     Column('rpe', Float),
     Column('custom_metric', String),
+    Index('ix_sets_workout_exercise_id_set_index', 'workout_exercise_id', 'set_index'),
+    Index('ix_sets_exercise_id', 'exercise_id'),
 )
 
 metrics = Table('metrics', metadata,
@@ -72,8 +87,12 @@ sleep_data_table = Table(
     Column('in_bed_start', DateTime),  # Ensure this field exists
     Column('in_bed_end', DateTime),  # Ensure this field exists
     Column('created_at', DateTime),
-    Column('updated_at', DateTime)
+    Column('updated_at', DateTime),
+    Index('ix_sleep_data_common_data_id', 'common_data_id')
 )
+# Day each session ends on, the day daily_sleep counts it towards; must match rollups.SLEEP_WAKE_DAY_KEY
+Index('ix_sleep_data_wake_day_key',
+      cast(func.replace(func.substr(sleep_data_table.c.end_time, 1, 10), '-', ''), Integer))
 
 nutrition_data_table = Table(
     'nutrition_data', metadata,
@@ -91,7 +110,8 @@ nutrition_data_table = Table(
     Column('sugar_g', Float),
     Column('timestamp', DateTime),
     Column('created_at', DateTime),
-    Column('updated_at', DateTime)
+    Column('updated_at', DateTime),
+    Index('ix_nutrition_data_common_data_id', 'common_data_id')
 )
 
 diet_cycles_table = Table(
@@ -106,7 +126,8 @@ diet_cycles_table = Table(
     Column('source', String),
     Column('notes', String),
     Column('created_at', DateTime),
-    Column('updated_at', DateTime)
+    Column('updated_at', DateTime),
+    Index('ix_diet_cycles_common_data_id', 'common_data_id')
 )
 
 diet_weeks_table = Table(
@@ -118,7 +139,9 @@ diet_weeks_table = Table(
     Column('calorie_target', Float),
     Column('source', String),
     Column('created_at', DateTime),
-    Column('updated_at', DateTime)
+    Column('updated_at', DateTime),
+    Index('ix_diet_weeks_cycle_id', 'cycle_id'),
+    Index('ix_diet_weeks_common_data_id', 'common_data_id')
 )
 
 health_markers_table = Table(
@@ -137,7 +160,8 @@ health_markers_table = Table(
     Column('body_weight_lbs', Float),
     Column('body_mass_index', Float),
     Column('created_at', DateTime),
-    Column('updated_at', DateTime)
+    Column('updated_at', DateTime),
+    Index('ix_health_markers_common_data_id', 'common_data_id')
 )
 
 data_table = Table(
@@ -148,8 +172,95 @@ data_table = Table(
     Column('qty', Float, nullable=True),
     Column('data_json', String), # to store the raw data
     Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    # One raw value per metric per (date, source); ingest upserts against this key
+    Index('uq_data_metric_common_data', 'metric_id', 'common_data_id', unique=True),
+    Index('ix_data_common_data_id', 'common_data_id')
+)
+
+import_watermarks_table = Table(
+    'import_watermarks', metadata,
+    Column('metric_name', String, primary_key=True),
+    Column('source', String, primary_key=True),
+    Column('last_timestamp', DateTime, nullable=False),  # Latest imported entry, stored in UTC
     Column('updated_at', DateTime)
 )
 
-# Recreate the database schema
-metadata.create_all(engine)
\ No newline at end of file
+import_manifest_table = Table(
+    'import_manifest', metadata,
+    Column('sha256', String, primary_key=True),
+    Column('file_path', String, nullable=False),
+    Column('size_bytes', Integer, nullable=False),
+    Column('mtime', Float, nullable=False),
+    Column('first_day', Integer),  # Local day keys (YYYYMMDD) covered by the file
+    Column('last_day', Integer),
+    Column('imported_at', DateTime)
+)
+
+sync_state_table = Table(
+    'sync_state', metadata,
+    Column('name', String, primary_key=True),
+    Column('value', String),
+    Column('updated_at', DateTime)
+)
+
+# Daily rollups, one row per local day (YYYYMMDD day_key) that has data, maintained by rollups.py
+daily_health_table = Table(
+    'daily_health', metadata,
+    Column('day_key', Integer, primary_key=True),
+    Column('heart_rate_min', Float),
+    Column('heart_rate_max', Float),
+    Column('heart_rate_avg', Float),
+    Column('heart_rate_variability', Float),
+    Column('resting_heart_rate', Float),
+    Column('respiratory_rate', Float),
+    Column('blood_oxygen_saturation', Float),
+    Column('vo2_max', Float),
+    Column('body_weight_lbs', Float),
+    Column('body_mass_index', Float),
+    Column('time_in_daylight_min', Float)
+)
+
+daily_nutrition_table = Table(
+    'daily_nutrition', metadata,
+    Column('day_key', Integer, primary_key=True),
+    Column('calories', Float),
+    Column('protein_g', Float),
+    Column('carbohydrates_g', Float),
+    Column('fat_g', Float),
+    Column('caffeine_mg', Float),
+    Column('water_floz', Float),
+    Column('fiber_g', Float),
+    Column('potassium_mg', Float),
+    Column('sodium_mg', Float),
+    Column('sugar_g', Float)
+)
+
+daily_sleep_table = Table(
+    'daily_sleep', metadata,
+    Column('day_key', Integer, primary_key=True),
+    Column('sessions', Integer),
+    Column('in_bed_duration_hours', Float),
+    Column('sleep_duration_hours', Float),
+    Column('awake_duration_hours', Float),
+    Column('rem_sleep_duration_hours', Float),
+    Column('deep_sleep_duration_hours', Float),
+    Column('core_sleep_duration_hours', Float)
+)
+
+daily_training_table = Table(
+    'daily_training', metadata,
+    Column('day_key', Integer, primary_key=True),
+    Column('workouts', Integer),
+    Column('duration_minutes', Float),
+    Column('sets', Integer),
+    Column('reps', Integer),
+    Column('volume_kg', Float)  # Sum of weight_kg * reps
+)
+
+schema_version_table = Table(
+    'schema_version', metadata,
+    Column('version', Integer, primary_key=True),  # One row per applied migration, see migrations.py
+    Column('name', String, nullable=False),
+    Column('applied_at', DateTime)
+)
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+
+def get_sync_state(cursor, name):
+    """Returns the stored value for a sync bookkeeping key, or None if it has never been set."""
+    cursor.execute("SELECT value FROM sync_state WHERE name = ?", (name,))
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+
+def set_sync_state(cursor, name, value):
+    """Stores a sync bookkeeping value without committing, so it lands with the data it describes."""
+    cursor.execute("""
+        INSERT INTO sync_state (name, value, updated_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+    """, (name, value, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def clear_sync_state(cursor, name):
+    cursor.execute("DELETE FROM sync_state WHERE name = ?", (name,))
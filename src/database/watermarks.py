@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from src.utils.timestamps import normalize_export_timestamp
+
+WATERMARK_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ImportWatermarks:
+    """
+    Tracks the latest imported timestamp per (metric_name, source) in the import_watermarks table.
+    Entries at or before a mark are skipped on later runs, minus an optional overlap window
+    so late-arriving edits to recent days are picked up again.
+    Full imports run with skip_seen off: every entry is imported but the marks still advance, so the
+    next incremental run starts from where the full import ended.
+    """
+
+    def __init__(self, conn, overlap=timedelta(0), skip_seen=True):
+        self.conn = conn
+        self.overlap = overlap
+        self.skip_seen = skip_seen
+        self._marks = {
+            (metric_name, source): datetime.strptime(last_timestamp, WATERMARK_FORMAT).replace(tzinfo=timezone.utc)
+            for metric_name, source, last_timestamp in conn.execute(
+                "SELECT metric_name, source, last_timestamp FROM import_watermarks")
+        }
+        self._dirty = set()
+
+    def filter_new(self, metric_name, metric_data):
+        """
+        Returns the entries newer than the (metric_name, source) mark, or every entry if skip_seen is off,
+        and advances the marks.
+        :param metric_name: Translated metric name, as stored in the metrics table.
+        :param metric_data: List of raw export entries.
+        """
+        new_entries = []
+        for entry in metric_data:
+            source = entry.get("source", "Unknown")
+            try:
+                timestamp = normalize_export_timestamp(entry.get("date"))[0]
+            except (TypeError, ValueError):
+                # Let the import stages report unparseable entries
+                new_entries.append(entry)
+                continue
+
+            key = (metric_name, source)
+            mark = self._marks.get(key)
+            if self.skip_seen and mark is not None and timestamp <= mark - self.overlap:
+                continue
+            new_entries.append(entry)
+            if mark is None or timestamp > mark:
+                self._marks[key] = timestamp
+                self._dirty.add(key)
+        return new_entries
+
+    def save(self):
+        """
+        Writes advanced marks without committing, so they land in the same transaction as the data.
+        """
+        now = datetime.now().strftime(WATERMARK_FORMAT)
+        self.conn.executemany("""
+            INSERT INTO import_watermarks (metric_name, source, last_timestamp, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (metric_name, source) DO UPDATE SET
+                last_timestamp = excluded.last_timestamp,
+                updated_at = excluded.updated_at
+            WHERE excluded.last_timestamp > import_watermarks.last_timestamp
+        """, [
+            (metric_name, source, self._marks[(metric_name, source)].strftime(WATERMARK_FORMAT), now)
+            for metric_name, source in self._dirty
+        ])
+        self._dirty = set()
@@ -0,0 +1,187 @@
+import sqlite3
+from datetime import datetime
+from src.database.rollups import refresh_daily_rollups
+from src.utils.timestamps import utc_epoch_and_day_key
+
+# common_data.source of every Hevy workout
+HEVY_SOURCE = "Hevy API"
+
+# Hevy set field -> sets column
+SET_FIELDS = {
+    "index": "set_index", "type": "set_type", "weight_kg": "weight_kg", "reps": "reps",
+    "duration_seconds": "duration_seconds", "rpe": "rpe", "custom_metric": "custom_metric"}
+
+WORKOUT_LOOKUP = """
+    SELECT workouts.workout_id, workouts.common_data_id, common_data.day_key
+    FROM workouts JOIN common_data ON workouts.common_data_id = common_data.common_data_id
+    WHERE workouts.hevy_workout_id = ?
+"""
+
+
+def parse_hevy_timestamp(value):
+    """Parses a Hevy ISO 8601 timestamp (with a trailing Z) into an aware datetime, or None."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+def hevy_utc_epoch_and_day_key(value):
+    """
+    Returns (UTC epoch seconds, local day key) of a Hevy timestamp, or (None, None).
+    Hevy reports UTC only, so the day is taken in this machine's time zone, the same way naive
+    timestamps are, rather than as the UTC calendar day.
+    """
+    if not value:
+        return None, None
+    return utc_epoch_and_day_key(parse_hevy_timestamp(value).astimezone())
+
+
+class HevyWorkoutWriter:
+    """
+    Writes Hevy workouts against a raw sqlite3 cursor.
+    Preloads hevy_exercise_template_id -> exercise_id once, inserts only unseen templates, and writes
+    each workout's workout_exercises and sets with one executemany apiece. workout_exercise ids are
+    assigned in memory so sets can reference them without a round trip per row.
+    Does not commit, and assumes it is the only writer to these tables while it is alive.
+    Days of every workout stored, moved or deleted are tracked so refresh_rollups() can recompute
+    their daily_training rows before the caller commits.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.rows = 0
+        self.touched_days = set()
+        self._exercise_ids = dict(cursor.execute(
+            "SELECT hevy_exercise_template_id, exercise_id FROM exercises"))
+        self._next_workout_exercise_id = cursor.execute(
+            "SELECT COALESCE(MAX(workout_exercise_id), 0) + 1 FROM workout_exercises").fetchone()[0]
+
+    def exercise_ids(self, exercises):
+        """
+        Returns hevy_exercise_template_id -> exercise_id for a workout's exercises,
+        inserting any templates not seen before in one batch.
+        """
+        unseen = {}
+        for exercise_data in exercises:
+            template_id = exercise_data.get("exercise_template_id")
+            if template_id not in self._exercise_ids:
+                unseen.setdefault(template_id, exercise_data.get("title"))
+        if unseen:
+            self.cursor.executemany("""
+                INSERT OR IGNORE INTO exercises (hevy_exercise_template_id, exercise_name)
+                VALUES (?, ?)
+            """, list(unseen.items()))
+            placeholders = ", ".join("?" * len(unseen))
+            self._exercise_ids.update(self.cursor.execute(
+                f"SELECT hevy_exercise_template_id, exercise_id FROM exercises WHERE hevy_exercise_template_id IN ({placeholders})",
+                list(unseen)))
+            self.rows += len(unseen)
+        return self._exercise_ids
+
+    def store(self, workout):
+        """
+        Inserts a workout with its exercises and sets, or updates it in place if its hevy_workout_id
+        is already stored.
+        :return: True if the workout was written.
+        """
+        cursor = self.cursor
+        hevy_workout_id = workout.get("id")
+        start_time = datetime.fromisoformat(workout.get("start_time")) if workout.get("start_time") else None
+        end_time = datetime.fromisoformat(workout.get("end_time")) if workout.get("end_time") else None
+        utc_epoch, day_key = hevy_utc_epoch_and_day_key(workout.get("start_time"))
+        values = (workout.get("title"), workout.get("description"), start_time, end_time,
+                  parse_hevy_timestamp(workout.get("created_at")), parse_hevy_timestamp(workout.get("updated_at")))
+
+        cursor.execute(WORKOUT_LOOKUP, (hevy_workout_id,))
+        existing = cursor.fetchone()
+
+        try:
+            if existing:
+                workout_id, common_data_id, previous_day_key = existing
+                self.touched_days.add(previous_day_key)
+                cursor.execute("UPDATE common_data SET date = ?, utc_epoch = ?, day_key = ? WHERE common_data_id = ?",
+                               (workout.get("start_time"), utc_epoch, day_key, common_data_id))
+                cursor.execute("""
+                    UPDATE workouts
+                    SET workout_name = ?, workout_description = ?, start_time = ?, end_time = ?, created_at = ?, updated_at = ?
+                    WHERE workout_id = ?
+                """, (*values, workout_id))
+                self._delete_exercises(workout_id)
+            else:
+                cursor.execute("""
+                    INSERT INTO common_data (date, source, utc_epoch, day_key)
+                    VALUES (?, ?, ?, ?)
+                """, (workout.get("start_time"), HEVY_SOURCE, utc_epoch, day_key))
+                cursor.execute("""
+                    INSERT INTO workouts (common_data_id, hevy_workout_id, workout_name, workout_description, start_time, end_time, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (cursor.lastrowid, hevy_workout_id, *values))
+                workout_id = cursor.lastrowid
+        except sqlite3.IntegrityError as e:
+            print(f"Error inserting workout {hevy_workout_id}: {e}")
+            return False
+        except sqlite3.OperationalError as e:
+            print(f"Operational error inserting workout {hevy_workout_id}: {e}")
+            return False
+        self.rows += 1 if existing else 2
+        if day_key is not None:
+            self.touched_days.add(day_key)
+
+        exercises = workout.get("exercises", [])
+        exercise_ids = self.exercise_ids(exercises)
+        workout_exercise_rows = []
+        set_rows = []
+        for exercise_data in exercises:
+            exercise_id = exercise_ids.get(exercise_data.get("exercise_template_id"))
+            if exercise_id is None:
+                print(f"Error inserting exercise {exercise_data.get('title')}.")
+                continue
+            # Rows the NOT NULL index columns would reject are skipped up front so one bad row
+            # cannot abort the whole executemany
+            if exercise_data.get("index") is None:
+                print(f"Error inserting workout_exercise for workout {hevy_workout_id}.")
+                continue
+            workout_exercise_id = self._next_workout_exercise_id
+            self._next_workout_exercise_id += 1
+            workout_exercise_rows.append((workout_exercise_id, workout_id, exercise_id, exercise_data.get("index"),
+                                          exercise_data.get("notes"), exercise_data.get("superset_id")))
+            for set_data in exercise_data.get("sets", []):
+                if set_data.get("index") is None:
+                    print(f"Error inserting set for exercise {exercise_data.get('title')}.")
+                    continue
+                set_rows.append((workout_exercise_id, exercise_id, *(set_data.get(field) for field in SET_FIELDS)))
+
+        cursor.executemany("""
+            INSERT INTO workout_exercises (workout_exercise_id, workout_id, exercise_id, exercise_index, exercise_notes, superset_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, workout_exercise_rows)
+        cursor.executemany(f"""
+            INSERT INTO sets (workout_exercise_id, exercise_id, {", ".join(SET_FIELDS.values())})
+            VALUES (?, ?, {", ".join("?" * len(SET_FIELDS))})
+        """, set_rows)
+        self.rows += len(workout_exercise_rows) + len(set_rows)
+        return True
+
+    def refresh_rollups(self):
+        """Recomputes daily_training for the days touched since the last call. Does not commit."""
+        refresh_daily_rollups(self.cursor, "daily_training", self.touched_days)
+        self.touched_days.clear()
+
+    def _delete_exercises(self, workout_id):
+        self.cursor.execute("""
+            DELETE FROM sets WHERE workout_exercise_id IN (
+                SELECT workout_exercise_id FROM workout_exercises WHERE workout_id = ?)
+        """, (workout_id,))
+        self.cursor.execute("DELETE FROM workout_exercises WHERE workout_id = ?", (workout_id,))
+
+    def delete(self, hevy_workout_id):
+        """Removes a workout, its workout_exercises and sets, and its common_data row."""
+        cursor = self.cursor
+        cursor.execute(WORKOUT_LOOKUP, (hevy_workout_id,))
+        existing = cursor.fetchone()
+        if not existing:
+            return False
+        workout_id, common_data_id, previous_day_key = existing
+        self.touched_days.add(previous_day_key)
+        self._delete_exercises(workout_id)
+        cursor.execute("DELETE FROM workouts WHERE workout_id = ?", (workout_id,))
+        cursor.execute("DELETE FROM common_data WHERE common_data_id = ?", (common_data_id,))
+        return True
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+# Dynamically add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.database.migrations import migrate
+from src.database.connection import create_sqlite_engine, connect
+from src.utils.historical_health import (
+    JSON_FILE_PATH, PARALLEL_MIN_ENTRIES, PARALLEL_MIN_WORKERS, _parse_metric_chunk, import_daily_data,
+    import_daily_data_parallel, metric_chunks, parallel_workers,
+)
+
+'''Compare the serial health import against the process-pool import on throwaway databases.'''
+
+
+def scale_health_data(data, scale):
+    """Repeats every metric's entries `scale` times under distinct sources so no copies collapse together."""
+    if scale == 1:
+        return data
+    metrics = []
+    for metric in data["metrics"]:
+        entries = [
+            dict(entry, source=f"{entry.get('source', 'Unknown')} #{copy}")
+            for copy in range(scale)
+            for entry in metric["data"]
+        ]
+        metrics.append(dict(metric, data=entries))
+    return {"metrics": metrics}
+
+
+def time_import(data, workers):
+    """Imports `data` into a fresh temporary database and returns (seconds, rows written to `data`)."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database_path = os.path.join(temp_dir, "benchmark.db")
+        # Migrations and the import stages are chatty, keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = create_sqlite_engine(database_path, "bulk")
+            migrate(engine)
+            engine.dispose()
+
+            conn = connect(database_path)
+            started = time.perf_counter()
+            if workers == 1:
+                import_daily_data(data, conn)
+            else:
+                import_daily_data_parallel(data, conn, workers)
+        elapsed = time.perf_counter() - started
+        rows = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+        conn.close()
+    return elapsed, rows
+
+
+def time_pool_costs(data, repeats=3):
+    """
+    Times the parse stage in-process and through a one-process pool, best of `repeats`.
+    Returns (entries, parse seconds, pool startup seconds, pool seconds); the pool's extra time over
+    parsing is what pickling each chunk there and its rows back costs on top of startup.
+    """
+    tasks = metric_chunks(data)
+    entries = sum(len(task[2]) for task in tasks)
+    parse_seconds = startup_seconds = pool_seconds = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for task in tasks:
+                _parse_metric_chunk(*task)
+            parse_seconds = min(parse_seconds, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                list(executor.map(abs, [0]))
+            startup_seconds = min(startup_seconds, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                list(executor.map(_parse_metric_chunk, *zip(*tasks)))
+            pool_seconds = min(pool_seconds, time.perf_counter() - started)
+    return entries, parse_seconds, startup_seconds, pool_seconds
+
+
+def break_even_entries(entries, parse_seconds, startup_seconds, pool_seconds, workers=2):
+    """
+    Entry count above which `workers` processes beat the serial parse, or None if they never do.
+    Serial parsing costs N * parse; the pool costs startup + N * transfer in this process plus
+    N * parse / workers spread over the workers.
+    """
+    parse = parse_seconds / entries
+    transfer = max(pool_seconds - parse_seconds - startup_seconds, 0) / entries
+    saved = parse * (1 - 1 / workers) - transfer
+    if saved <= 0:
+        return None
+    return startup_seconds / saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel health import.")
+    parser.add_argument("--file", default=JSON_FILE_PATH, help="HealthAutoExport JSON file to import.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1],
+                        help="Worker counts to compare against the serial path.")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat the export this many times for a larger load.")
+    args = parser.parse_args()
+
+    with open(args.file, "r") as file:
+        data = scale_health_data(json.load(file)["data"], args.scale)
+    entries = sum(len(metric.get("data", [])) for metric in data["metrics"])
+
+    serial_seconds, rows = time_import(data, 1)
+    print(f"serial     : {serial_seconds:6.2f}s  {rows / serial_seconds:10,.0f} rows/sec")
+    for workers in sorted(set(args.workers)):
+        seconds, parallel_rows = time_import(data, workers)
+        used = parallel_workers(workers, entries)
+        note = f"  (ran with {used})" if used != workers else ""
+        print(f"{workers:2d} workers : {seconds:6.2f}s  {parallel_rows / seconds:10,.0f} rows/sec  "
+              f"speedup {serial_seconds / seconds:4.2f}x{note}")
+        if parallel_rows != rows:
+            print(f"Warning: parallel import wrote {parallel_rows} rows, serial wrote {rows}.")
+
+    # The comparison above is serial on a single CPU, so also report what the pool itself costs
+    entries, parse_seconds, startup_seconds, pool_seconds = time_pool_costs(data)
+    print(f"{entries:,} entries: parse {parse_seconds * 1e6 / entries:.1f}us/entry, pool startup "
+          f"{startup_seconds * 1000:.1f}ms, transfer {(pool_seconds - parse_seconds - startup_seconds) * 1e6 / entries:.1f}us/entry")
+    for workers in (2, 3, 4):
+        threshold = break_even_entries(entries, parse_seconds, startup_seconds, pool_seconds, workers)
+        verdict = f"{threshold:,.0f} entries" if threshold is not None else "never"
+        print(f"{workers} workers break even at {verdict} "
+              f"(pool used from {PARALLEL_MIN_WORKERS} workers and {PARALLEL_MIN_ENTRIES:,} entries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import subprocess
+import tempfile
+import contextlib
+import io
+
+# Dynamically add the project root and src to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+for path in (project_root, os.path.join(project_root, "src")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from utils.fake_hevy_server import FakeHevyServer
+from utils.hevy_api import HevyClient
+from utils.ingest_stats import peak_rss_mb
+import utils.historical_hevy as historical_hevy
+from src.database.connection import create_sqlite_engine
+from src.database.migrations import migrate
+
+'''Benchmark the full and incremental Hevy sync end to end against the local fake Hevy API.'''
+
+
+def time_sync(base_url, database_path, incremental, concurrency):
+    """Runs one sync against the API at base_url and returns its seconds."""
+    # The response cache is off so every run hits the server
+    client = HevyClient("benchmark", base_url, historical_hevy.create_hevy_scheduler(concurrency, cache=False),
+                        validate=False)
+    started = time.perf_counter()
+    # The sync is chatty, keep the benchmark output readable
+    with client, contextlib.redirect_stdout(io.StringIO()):
+        historical_hevy.sync_hevy_workouts(full=not incremental, concurrency=concurrency,
+                                           database_name=database_path, client=client)
+    return time.perf_counter() - started
+
+
+def run_phase(server, database_path, incremental, concurrency):
+    """
+    Runs one sync in a fresh process, so its peak RSS covers that phase alone rather than the fake
+    server or an earlier phase. Returns (seconds, requests served, peak RSS in MB, peak RSS in MB
+    before the sync started), with None for both where the platform can't report RSS.
+    """
+    requests_before = server.requests
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--phase", "incremental" if incremental else "full",
+         "--base-url", server.base_url, "--database", database_path, "--concurrency", str(concurrency)],
+        check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.splitlines()[-1])
+    return result["seconds"], server.requests - requests_before, result["peak_rss_mb"], result["startup_rss_mb"]
+
+
+def report(label, seconds, workouts, requests, peak, startup):
+    peak_text = f"{peak:.1f} MB (+{peak - startup:.1f} MB over imports)" if peak is not None else "unavailable"
+    print(f"{label:11s}: {seconds:6.2f}s  {workouts / seconds:8,.0f} workouts/sec  "
+          f"{requests:5d} requests ({requests / seconds:6,.1f}/sec)  peak RSS {peak_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full and incremental Hevy sync against a fake API.")
+    parser.add_argument("--workouts", type=int, default=1000)
+    parser.add_argument("--exercises", type=int, default=5, help="Exercises per workout.")
+    parser.add_argument("--sets", type=int, default=4, help="Sets per exercise.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of simulated API latency per request.")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second the fake API allows before 429s.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered 429.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered 503.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages fetched in parallel.")
+    parser.add_argument("--changes", type=int, default=20, help="Workouts edited before the incremental sync.")
+    # Used by run_phase to run a single sync in a child process
+    parser.add_argument("--phase", choices=["full", "incremental"], help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        startup = peak_rss_mb()
+        seconds = time_sync(args.base_url, args.database, args.phase == "incremental", args.concurrency)
+        print(json.dumps({"seconds": seconds, "peak_rss_mb": peak_rss_mb(), "startup_rss_mb": startup}))
+        return
+
+    server = FakeHevyServer(args.workouts, args.exercises, args.sets, args.latency, args.rate_limit,
+                            args.throttle_rate, args.failure_rate)
+    with server, tempfile.TemporaryDirectory() as temp_dir:
+        database_path = os.path.join(temp_dir, "benchmark.db")
+        engine = create_sqlite_engine(database_path, "bulk")
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate(engine)
+        engine.dispose()
+
+        seconds, requests, peak, startup = run_phase(server, database_path, False, args.concurrency)
+        report("full", seconds, args.workouts, requests, peak, startup)
+
+        server.mutate(updates=args.changes, deletes=args.changes // 10, inserts=args.changes // 4)
+        changed = args.changes + args.changes // 10 + args.changes // 4
+        seconds, requests, peak, startup = run_phase(server, database_path, True, args.concurrency)
+        report("incremental", seconds, changed, requests, peak, startup)
+
+        conn = sqlite3.connect(database_path)
+        stored = conn.execute("SELECT COUNT(*) FROM workouts").fetchone()[0]
+        conn.close()
+        expected = args.workouts - args.changes // 10 + args.changes // 4
+        if stored != expected:
+            print(f"Warning: database holds {stored} workouts, the fake API {expected}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-from sqlalchemy import create_engine
 import sys
 import os
 
@@ -8,16 +7,17 @@ project_root = os.path.abspath(os.path.join(current_dir, "../../"))
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-from src.database.schema import metadata
+from src.database.connection import create_sqlite_engine
+from src.database.migrations import migrate
 
 # Dynamically construct the database path
 DATABASE_NAME = os.path.join(project_root, "data", "hevy_metal.db")
 
 '''Create a SQLite database with the schema defined in the schema.py file.'''
 def initialize_database():
-    engine = create_engine(f"sqlite:///{DATABASE_NAME}")
-    metadata.create_all(engine)
-    print(f"Database initialized with schema at {DATABASE_NAME}")
+    engine = create_sqlite_engine(DATABASE_NAME, "bulk")
+    version = migrate(engine)
+    print(f"Database initialized with schema version {version} at {DATABASE_NAME}")
 
 if __name__ == "__main__":
     initialize_database()
\ No newline at end of file
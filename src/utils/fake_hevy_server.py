@@ -0,0 +1,265 @@
+import json
+import time
+import hashlib
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+'''
+Local stand-in for the Hevy API, for exercising the sync without the real service or an API key.
+Serves synthetic /v1/workouts and /v1/workouts/events pages with ETags (answering 304 to a matching
+If-None-Match), with optional latency, rate limiting and injected failures. Run it directly, or start it in-process with FakeHevyServer(...).start().
+'''
+
+FAKE_HEVY_EPOCH = datetime(2023, 1, 2, 7, 0, tzinfo=timezone.utc)
+FAKE_HEVY_TEMPLATES = 200
+# pageSize limit the real /v1/workouts and /v1/workouts/events endpoints document; larger pages get a 400
+FAKE_HEVY_MAX_PAGE_SIZE = 10
+
+
+def _iso(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class FakeHevyServer:
+    """
+    Synthetic Hevy API.
+    :param workouts: Number of workouts in the generated history (one per day, newest first on page 1).
+    :param exercises: Exercises per workout.
+    :param sets: Sets per exercise.
+    :param latency: Seconds added to every response.
+    :param jitter: Up to this many extra random seconds per response, so concurrent pages finish out of order.
+    :param rate_limit: Optional. Requests per second allowed before answering 429 with Retry-After.
+    :param throttle_rate: Fraction of requests answered with 429 regardless of rate.
+    :param failure_rate: Fraction of requests answered with 503.
+    """
+
+    def __init__(self, workouts=500, exercises=5, sets=4, latency=0.0, rate_limit=None,
+                 throttle_rate=0.0, failure_rate=0.0, seed=0, host="127.0.0.1", port=0, jitter=0.0):
+        self.exercises = exercises
+        self.sets = sets
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.not_modified = 0
+        # Requests being answered right now, and the most there have been at once
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []
+        self._version = 0
+        self._workouts = {}
+        self._events = []
+        for index in range(workouts):
+            self._add_workout(index, FAKE_HEVY_EPOCH)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _build_workout(self, index, updated_at):
+        start = FAKE_HEVY_EPOCH + timedelta(days=index)
+        exercises = []
+        for exercise_index in range(self.exercises):
+            template = (index * self.exercises + exercise_index) % FAKE_HEVY_TEMPLATES
+            exercises.append({
+                "index": exercise_index,
+                "title": f"Exercise {template}",
+                "notes": "",
+                "exercise_template_id": f"T{template:04X}",
+                "superset_id": None,
+                "sets": [{
+                    "index": set_index,
+                    "type": "warmup" if set_index == 0 else "normal",
+                    "weight_kg": round(self._random.uniform(20, 140), 1),
+                    "reps": self._random.randint(3, 12),
+                    "distance_meters": None,
+                    "duration_seconds": None,
+                    "rpe": None,
+                    "custom_metric": None,
+                } for set_index in range(self.sets)],
+            })
+        return {
+            "id": f"fake-{index:06d}",
+            "title": f"Workout {index}",
+            "description": "",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "updated_at": _iso(updated_at),
+            "created_at": _iso(start + timedelta(hours=1)),
+            "exercises": exercises,
+        }
+
+    def _add_workout(self, index, updated_at):
+        self._workouts[f"fake-{index:06d}"] = self._build_workout(index, updated_at)
+
+    def mutate(self, updates=10, deletes=2, inserts=5):
+        """
+        Changes the history so the next incremental sync has something to do: edits existing workouts,
+        deletes some and appends new ones, recording a workout event for each change.
+        """
+        with self._lock:
+            self._version += 1
+            changed_at = datetime.now(timezone.utc) + timedelta(seconds=self._version)
+            existing = sorted(self._workouts)
+            picked = self._random.sample(existing, min(updates + deletes, len(existing)))
+            for workout_id in picked[:updates]:
+                workout = self._build_workout(int(workout_id.split("-")[1]), changed_at)
+                workout["title"] += f" (edit {self._version})"
+                self._workouts[workout_id] = workout
+                self._events.append({"type": "updated", "workout": workout})
+            for workout_id in picked[updates:]:
+                del self._workouts[workout_id]
+                self._events.append({"type": "deleted", "id": workout_id, "deleted_at": _iso(changed_at)})
+            next_index = max((int(workout_id.split("-")[1]) for workout_id in existing), default=-1) + 1
+            for index in range(next_index, next_index + inserts):
+                self._add_workout(index, changed_at)
+                self._events.append({"type": "updated", "workout": self._workouts[f"fake-{index:06d}"]})
+
+    def _rejection(self):
+        """Returns the status code to fail the current request with, or None to serve it."""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                self._window = [sent for sent in self._window if now - sent < 1.0]
+                if len(self._window) >= self.rate_limit:
+                    return 429
+                self._window.append(now)
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.failure_rate:
+            return 503
+        return None
+
+    def _page(self, items, query, items_key):
+        page = int(query.get("page", ["1"])[0])
+        page_size = int(query.get("pageSize", ["5"])[0])
+        if page < 1 or not 1 <= page_size <= FAKE_HEVY_MAX_PAGE_SIZE:
+            return 400, {"error": "Invalid page or pageSize"}
+        page_count = max(1, -(-len(items) // page_size))
+        return 200, {"page": page, "page_count": page_count,
+                     items_key: items[(page - 1) * page_size:page * page_size]}
+
+    def _respond(self, path, query):
+        if path == "/v1/workouts":
+            with self._lock:
+                workouts = sorted(self._workouts.values(), key=lambda workout: workout["start_time"], reverse=True)
+            return self._page(workouts, query, "workouts")
+        if path == "/v1/workouts/events":
+            since = query.get("since", ["1970-01-01T00:00:00Z"])[0]
+            since = datetime.fromisoformat(since.replace("Z", "+00:00"))
+            with self._lock:
+                events = [event for event in self._events
+                          if datetime.fromisoformat((event.get("deleted_at") or event["workout"]["updated_at"]).replace("Z", "+00:00")) > since]
+            return self._page(events[::-1], query, "events")
+        return 404, {"error": "Not found"}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None, headers=()):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    delay = server.latency + (server._random.uniform(0, server.jitter) if server.jitter else 0)
+                try:
+                    if delay:
+                        time.sleep(delay)
+                    self._answer()
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _answer(self):
+                if not self.headers.get("api-key"):
+                    return self._send(401, {"error": "Missing api-key"})
+                rejection = server._rejection()
+                if rejection == 429:
+                    return self._send(429, {"error": "Too many requests"}, [("Retry-After", "1")])
+                if rejection:
+                    return self._send(rejection, {"error": "Service unavailable"})
+                url = urlparse(self.path)
+                status, body = server._respond(url.path, parse_qs(url.query))
+                if status != 200:
+                    return self._send(status, body)
+                etag = '"' + hashlib.sha1(json.dumps(body).encode()).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified += 1
+                    return self._send(304, headers=[("ETag", etag)])
+                self._send(status, body, [("ETag", etag)])
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Hevy API for local testing.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workouts", type=int, default=500)
+    parser.add_argument("--exercises", type=int, default=5)
+    parser.add_argument("--sets", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds per response.")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second before answering 429.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered 429.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered 503.")
+    args = parser.parse_args()
+
+    server = FakeHevyServer(args.workouts, args.exercises, args.sets, args.latency, args.rate_limit,
+                            args.throttle_rate, args.failure_rate, port=args.port, jitter=args.jitter)
+    print(f"Fake Hevy API serving {args.workouts} workouts at {server.base_url} (any api-key is accepted)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
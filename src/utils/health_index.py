@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+from datetime import date
+from src.utils.health_stream import HealthExportStreamReader, STREAM_BATCH_SIZE
+
+'''
+Sidecar date index for HealthAutoExport files.
+Maps (metric, local day) to the byte ranges of its entries so single-day and date-range
+re-imports decode only the entries they need instead of loading the whole export.
+'''
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+
+def sidecar_path(json_file_path):
+    return json_file_path + INDEX_SUFFIX
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _day_key(entry_date):
+    """Integer YYYYMMDD key of an export timestamp's local day, or None if it has no usable date."""
+    if not isinstance(entry_date, str) or len(entry_date) < 10:
+        return None
+    try:
+        return int(entry_date[0:4] + entry_date[5:7] + entry_date[8:10])
+    except ValueError:
+        return None
+
+
+def build_index(json_file_path, sha256=None):
+    """
+    Walks the export once and returns the index as a dict:
+    {"sha256", "size", "mtime", "metrics": {name: {"units", "days": {day_key: [[offset, length], ...]}}}}
+    """
+    stat = os.stat(json_file_path)
+    metrics = {}
+    with open(json_file_path, "r", encoding="utf-8", newline="") as file:
+        for metric_name, metric_units, offsets in HealthExportStreamReader(file).iter_metric_offsets():
+            if metric_name is None:
+                continue
+            days = metrics.setdefault(metric_name, {"units": metric_units, "days": {}})["days"]
+            for entry_date, offset, length in offsets:
+                day_key = _day_key(entry_date)
+                if day_key is not None:
+                    days.setdefault(str(day_key), []).append([offset, length])
+
+    return {
+        "version": INDEX_VERSION,
+        "sha256": sha256 or file_sha256(json_file_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "metrics": metrics,
+    }
+
+
+def load_or_build_index(json_file_path):
+    """
+    Returns the sidecar index for an export, rebuilding it when the file has changed.
+    Size and mtime are checked first; the content hash is only recomputed when either differs.
+    """
+    index_path = sidecar_path(json_file_path)
+    index = None
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable health index {index_path}: {e}")
+
+    stat = os.stat(json_file_path)
+    if index is not None and index.get("version") == INDEX_VERSION:
+        if index.get("size") == stat.st_size and index.get("mtime") == stat.st_mtime:
+            return index
+        sha256 = file_sha256(json_file_path)
+        if index.get("sha256") == sha256:
+            # Touched but unchanged, so only the recorded mtime needs refreshing
+            index["mtime"] = stat.st_mtime
+            _write_index(index_path, index)
+            return index
+    else:
+        sha256 = None
+
+    print(f"Building health index for {json_file_path}...")
+    index = build_index(json_file_path, sha256)
+    _write_index(index_path, index)
+    return index
+
+
+def _write_index(index_path, index):
+    temp_path = index_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(index, file)
+    os.replace(temp_path, index_path)
+
+
+def index_day_span(index):
+    """Returns the (first, last) local day keys present in an index, or (None, None) if it is empty."""
+    day_keys = [int(day_key) for metric in index["metrics"].values() for day_key in metric["days"]]
+    if not day_keys:
+        return None, None
+    return min(day_keys), max(day_keys)
+
+
+def day_key_to_date(day_key):
+    return date(day_key // 10000, day_key // 100 % 100, day_key % 100)
+
+
+def iter_indexed_batches(json_file_path, start_date, end_date=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yields (metric_name, metric_units, entries) for entries whose local day falls in [start_date, end_date],
+    reading only their byte ranges from the export.
+    :param start_date: A datetime.date for the first day to import.
+    :param end_date: Optional. A datetime.date for the last day to import (defaults to start_date).
+    """
+    index = load_or_build_index(json_file_path)
+    first_day = int(start_date.strftime("%Y%m%d"))
+    last_day = int((end_date or start_date).strftime("%Y%m%d"))
+
+    with open(json_file_path, "rb") as file:
+        for metric_name, metric in index["metrics"].items():
+            ranges = sorted(
+                position
+                for day_key, positions in metric["days"].items()
+                if first_day <= int(day_key) <= last_day
+                for position in positions
+            )
+            for start in range(0, len(ranges), batch_size):
+                batch = []
+                for offset, length in ranges[start:start + batch_size]:
+                    file.seek(offset)
+                    batch.append(json.loads(file.read(length)))
+                yield metric_name, metric["units"], batch
@@ -0,0 +1,205 @@
+import json
+import tempfile
+
+# Read the export in fixed-size chunks so memory does not scale with the file size
+CHUNK_SIZE = 64 * 1024
+STREAM_BATCH_SIZE = 500
+
+WHITESPACE = " \t\r\n"
+
+
+class HealthExportStreamReader:
+    """
+    Incremental reader for HealthAutoExport JSON files.
+    Walks data.metrics[*].data[*] one entry at a time instead of calling json.load on the whole file.
+    """
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        # Byte offset in the file of self._buf[self._mark], for reporting entry positions
+        self._bytes = 0
+        self._mark = 0
+
+    def _fill(self):
+        """Append the next chunk of the file to the buffer, dropping what has been consumed."""
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._tell()
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        self._mark = 0
+        return True
+
+    def _tell(self):
+        """Byte offset of the cursor in the file (the file must be opened with newline="")."""
+        self._bytes += len(self._buf[self._mark:self._pos].encode("utf-8"))
+        self._mark = self._pos
+        return self._bytes
+
+    def _peek(self):
+        """Skip whitespace and return the next character ('' at end of file)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in health export but found '{found}' near offset {self._pos}")
+        self._pos += 1
+
+    def _value(self):
+        """Decode one complete JSON value at the cursor, reading more of the file if it is split."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A value ending exactly at the buffer edge may be a truncated number, so read on
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def _members(self):
+        """Yield each key of the object at the cursor. The caller must consume the value."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            yield key
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed object in health export near offset {self._pos}")
+
+    def _items(self):
+        """Yield once per element of the array at the cursor. The caller must consume the element."""
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            separator = self._peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed array in health export near offset {self._pos}")
+
+    def _entries(self):
+        for _ in self._items():
+            yield self._value()
+
+    def _metric_batches(self, batch_size):
+        name = units = None
+        spool = None
+        for key in self._members():
+            if key == "name":
+                name = self._value()
+            elif key == "units":
+                units = self._value()
+            elif key == "data":
+                if name is not None and units is not None:
+                    yield from _batched(name, units, self._entries(), batch_size)
+                else:
+                    # The export does not order keys, so park entries on disk until the name is known
+                    spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+                    for entry in self._entries():
+                        spool.write(json.dumps(entry))
+                        spool.write("\n")
+            else:
+                self._value()
+
+        if spool is not None:
+            with spool:
+                if name is None:
+                    print("Warning: Skipping metric without a name in health export.")
+                    return
+                spool.seek(0)
+                yield from _batched(name, units, (json.loads(line) for line in spool), batch_size)
+
+    def _metric_offsets(self):
+        name = units = None
+        offsets = []
+        for key in self._members():
+            if key == "name":
+                name = self._value()
+            elif key == "units":
+                units = self._value()
+            elif key == "data":
+                for _ in self._items():
+                    self._peek()
+                    start = self._tell()
+                    entry = self._value()
+                    offsets.append((entry.get("date"), start, self._tell() - start))
+            else:
+                self._value()
+        return name, units, offsets
+
+    def _metrics(self):
+        """Yield once per metric object in data.metrics. The caller must consume the metric."""
+        for key in self._members():
+            if key != "data":
+                self._value()
+                continue
+            for data_key in self._members():
+                if data_key != "metrics":
+                    self._value()
+                    continue
+                yield from self._items()
+
+    def iter_metric_offsets(self):
+        """
+        Yields (metric_name, metric_units, [(entry_date, byte_offset, byte_length), ...]) per metric.
+        Used to build the sidecar date index; entries can later be decoded straight from their offsets.
+        """
+        for _ in self._metrics():
+            yield self._metric_offsets()
+
+    def iter_metric_batches(self, batch_size=STREAM_BATCH_SIZE):
+        """
+        Yields (metric_name, metric_units, entries) with at most batch_size entries per batch.
+        """
+        for _ in self._metrics():
+            yield from self._metric_batches(batch_size)
+
+
+def _batched(name, units, entries, batch_size):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield name, units, batch
+            batch = []
+    if batch:
+        yield name, units, batch
+
+
+def iter_health_export(json_file_path, batch_size=STREAM_BATCH_SIZE):
+    """
+    Streams a HealthAutoExport JSON file as bounded batches of metric entries.
+    :param json_file_path: Path to the JSON export.
+    :param batch_size: Maximum number of entries per yielded batch.
+    """
+    with open(json_file_path, "r", encoding="utf-8", newline="") as file:
+        yield from HealthExportStreamReader(file).iter_metric_batches(batch_size)
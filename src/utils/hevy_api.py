@@ -1,86 +1,165 @@
 # scripts/hevy_api.py
-import requests
 import os
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()  # Load environment variables from .env file
+'''
+Hevy API client. Importing this module does no I/O: configuration is read, the HTTP transport is
+built and the API key is validated the first time a request is made.
+'''
 
-HEVY_API_KEY = os.getenv("HEVY_API_KEY")
-BASE_URL = os.getenv("HEVY_BASE_URL") # Replace with the actual base URL
+HEVY_API_VERSION_SUFFIX = "/v1"
 
-# Validate environment variables
-if not HEVY_API_KEY:
-    raise ValueError("Error: HEVY_API_KEY is not set in the environment variables.")
-if not BASE_URL:
-    raise ValueError("Error: HEVY_BASE_URL is not set in the environment variables.")
 
-# Fallback: Allow manual input of API key if not valid
-if not HEVY_API_KEY or len(HEVY_API_KEY) < 20:  # Assuming a valid key is at least 20 characters
-    print("The API key seems invalid or missing. Please input your API key manually:")
-    HEVY_API_KEY = input("Enter your HEVY_API_KEY: ").strip()
-    if not HEVY_API_KEY:
-        raise ValueError("No API key provided. Exiting.")
+class HevyClient:
+    """
+    Lazily configured Hevy API client.
+    :param api_key: Optional. Defaults to HEVY_API_KEY from the environment / .env file.
+    :param base_url: Optional. Defaults to HEVY_BASE_URL from the environment / .env file.
+    :param transport: Optional. Anything with a requests-style get(url, params=..., headers=...),
+        e.g. a requests.Session or HevyRequestScheduler. Defaults to a rate-limited HevyRequestScheduler.
+        Extra keyword arguments to get() are passed through to it, such as the scheduler's max_age.
+    :param validate: Optional. Check the API key with a test request before the first real one.
+    """
 
-# Ensure BASE_URL ends with the correct path
-if not BASE_URL.endswith("/v1"):
-    print("Warning: BASE_URL does not end with '/v1'. Please verify the API base URL.")
-    BASE_URL = input("Enter the correct BASE_URL (e.g., https://api.hevyapp.com/v1): ").strip()
-    if not BASE_URL:
-        raise ValueError("No BASE_URL provided. Exiting.")
+    def __init__(self, api_key=None, base_url=None, transport=None, validate=True):
+        self._api_key = api_key
+        self._base_url = base_url
+        self._transport = transport
+        self._validate = validate
+        self._validated = False
+        self._lock = threading.Lock()
 
-def validate_api_key():
-    """Validates the API key by making a test request to the Hevy API."""
-    test_endpoint = f"{BASE_URL}/workouts?page=1&pageSize=1"
-    headers = {
-        "api-key": HEVY_API_KEY
-    }
-    try:
-        response = requests.get(test_endpoint, headers=headers)
-        if response.status_code == 401:
-            print("Invalid API key: Unauthorized access.")
-            print("Please check your API key and update the HEVY_API_KEY environment variable.")
+    def _load_config(self):
+        if self._api_key is None or self._base_url is None:
+            from dotenv import load_dotenv
+            load_dotenv()  # Load environment variables from .env file
+            self._api_key = self._api_key or os.getenv("HEVY_API_KEY")
+            self._base_url = self._base_url or os.getenv("HEVY_BASE_URL")
+
+        if not self._api_key:
+            raise ValueError("Error: HEVY_API_KEY is not set in the environment variables.")
+        if not self._base_url:
+            raise ValueError("Error: HEVY_BASE_URL is not set in the environment variables.")
+
+    @property
+    def api_key(self):
+        self._load_config()
+        return self._api_key
+
+    @property
+    def base_url(self):
+        self._load_config()
+        return self._base_url.rstrip("/")
+
+    @property
+    def transport(self):
+        with self._lock:
+            if self._transport is None:
+                from utils.hevy_scheduler import HevyRequestScheduler
+                self._transport = HevyRequestScheduler()
+            return self._transport
+
+    def _request(self, path, params=None, **kwargs):
+        return self.transport.get(f"{self.base_url}/{path}", params=params, headers={"api-key": self.api_key}, **kwargs)
+
+    def close(self):
+        """Closes the transport, if it was created and can be closed."""
+        if self._transport is not None and hasattr(self._transport, "close"):
+            self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def validate_api_key(self):
+        """Validates the API key by making a test request to the Hevy API."""
+        import requests
+        if not self.base_url.endswith(HEVY_API_VERSION_SUFFIX):
+            print(f"Warning: BASE_URL does not end with '{HEVY_API_VERSION_SUFFIX}'. Please verify the API base URL.")
+        try:
+            response = self._request("workouts", {"page": 1, "pageSize": 1})
+            if response.status_code == 401:
+                print("Invalid API key: Unauthorized access.")
+                print("Please check your API key and update the HEVY_API_KEY environment variable.")
+                return False
+            response.raise_for_status()
+            print("API key validation successful.")
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"Error validating API key: {e}")
             return False
+
+    def _ensure_validated(self):
+        if not self._validate or self._validated:
+            return
+        if not self.validate_api_key():
+            raise ValueError("Hevy API key validation failed.")
+        self._validated = True
+
+    def get(self, path, params=None, **kwargs):
+        """
+        Sends a GET request to a Hevy endpoint and returns the decoded JSON body.
+        Raises ValueError for missing or invalid configuration and requests exceptions for HTTP errors.
+        """
+        self._ensure_validated()
+        response = self._request(path, params, **kwargs)
         response.raise_for_status()
-        print("API key validation successful.")
-        return True
-    except requests.exceptions.RequestException as e:
-        print(f"Error validating API key: {e}")
-        return False
+        return response.json()
+
+    def get_workouts(self, page_num=1, page_size=10):
+        """Retrieves workout data from the Hevy API, with optional limit and ordering."""
+        import requests
+        try:
+            return self.get("workouts", {"page": page_num, "pageSize": page_size})
+        except requests.exceptions.HTTPError as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            if http_err.response is not None and http_err.response.status_code == 401:
+                print("Check if the API key is valid and has the required permissions.")
+        except requests.exceptions.RequestException as req_err:
+            print(f"Request error occurred: {req_err}")
+        except ValueError as config_err:
+            print(config_err)
+        return None
+
+
+_default_client = None
+
+
+def get_client():
+    """Returns the process-wide HevyClient, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = HevyClient()
+    return _default_client
+
+
+def validate_api_key():
+    """Validates the API key by making a test request to the Hevy API."""
+    return get_client().validate_api_key()
 
-# Validate the API key at startup
-if not validate_api_key():
-    print("Exiting program due to invalid API key.")
-    exit(1)
 
 def get_workouts(page_num=1, page_size=10):
     """Retrieves workout data from the Hevy API, with optional limit and ordering."""
-    if not HEVY_API_KEY:
-        print("Error: HEVY_API_KEY not found in environment variables.")
-        return None
-
-    headers = {
-        "api-key": HEVY_API_KEY
-    }
+    return get_client().get_workouts(page_num, page_size)
 
-    endpoint = f"{BASE_URL}/workouts?page={page_num}&pageSize={page_size}"
 
+if __name__ == "__main__":
+    client = get_client()
     try:
-        response = requests.get(endpoint, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")
-        if response.status_code == 401:
-            print("Check if the API key is valid and has the required permissions.")
-    except requests.exceptions.RequestException as req_err:
-        print(f"Request error occurred: {req_err}")
-    return None
+        client.api_key
+    except ValueError:
+        # Fallback: Allow manual input of API key if not set
+        print("The API key seems invalid or missing. Please input your API key manually:")
+        api_key = input("Enter your HEVY_API_KEY: ").strip()
+        if not api_key:
+            raise ValueError("No API key provided. Exiting.")
+        client = _default_client = HevyClient(api_key=api_key)
 
-if __name__ == "__main__":
-    recent_workouts = get_workouts(page_num=1, page_size=5)
+    recent_workouts = client.get_workouts(page_num=1, page_size=5)
     if recent_workouts:
         print("Successfully retrieved recent workout data:")
         print(recent_workouts)
     else:
-        print("Failed to retrieve recent workout data.")
\ No newline at end of file
+        print("Failed to retrieve recent workout data.")
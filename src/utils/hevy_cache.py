@@ -0,0 +1,142 @@
+import time
+import zlib
+import json
+import sqlite3
+import threading
+from urllib.parse import urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+
+'''
+Persistent HTTP cache for Hevy API responses.
+Bodies are stored zlib-compressed in a small SQLite file. Entries younger than the TTL are served
+without touching the network; older ones are revalidated with ETag / Last-Modified when the API sent
+them, and the least recently used entries are evicted once the cache grows past its size limit.
+'''
+
+HEVY_CACHE_TTL = 60 * 60  # Seconds an entry is served without revalidation
+HEVY_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Compressed bytes kept before evicting the least recently used
+
+
+class HevyResponseCache:
+    """SQLite-backed response cache keyed on endpoint URL and query parameters. Safe to share between threads."""
+
+    def __init__(self, path, ttl=HEVY_CACHE_TTL, max_bytes=HEVY_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = self.revalidated = self.misses = 0
+        self._lock = threading.Lock()
+        # Shared by the fetch threads, every use is serialized by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                cache_key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                headers TEXT,
+                body BLOB,
+                size_bytes INTEGER,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_http_cache_accessed_at ON http_cache (accessed_at)")
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def cache_key(url, params=None):
+        """Endpoint URL plus its query parameters in a stable order."""
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(key), str(value)) for key, value in params.items()))}"
+
+    def lookup(self, key, max_age=None):
+        """
+        Returns (response, validators) for a cached entry:
+        a fresh entry gives (response, None), a stale one (None, conditional request headers),
+        and a missing one (None, None).
+        :param max_age: Optional. Seconds the entry may be served without revalidation (defaults to the TTL).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, headers, body, fetched_at FROM http_cache WHERE cache_key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None, None
+            etag, last_modified, headers, body, fetched_at = row
+            now = time.time()
+            if now - fetched_at < (self.ttl if max_age is None else max_age):
+                self._conn.execute("UPDATE http_cache SET accessed_at = ? WHERE cache_key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return _cached_response(key, headers, body), None
+
+        validators = {}
+        if etag:
+            validators["If-None-Match"] = etag
+        if last_modified:
+            validators["If-Modified-Since"] = last_modified
+        return None, validators or None
+
+    def revalidate(self, key):
+        """Marks a stale entry fresh again after a 304 and returns its cached response."""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("UPDATE http_cache SET fetched_at = ?, accessed_at = ? WHERE cache_key = ?",
+                               (now, now, key))
+            self._conn.commit()
+            row = self._conn.execute("SELECT headers, body FROM http_cache WHERE cache_key = ?", (key,)).fetchone()
+            self.revalidated += 1
+        return _cached_response(key, *row)
+
+    def store(self, key, response):
+        """Caches a successful response body and its validators, then evicts down to max_bytes."""
+        if response.status_code != 200:
+            return
+        body = zlib.compress(response.content)
+        headers = json.dumps({"Content-Type": response.headers.get("Content-Type", "application/json")})
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            self._conn.execute("""
+                INSERT INTO http_cache (cache_key, etag, last_modified, headers, body, size_bytes, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    etag = excluded.etag, last_modified = excluded.last_modified, headers = excluded.headers,
+                    body = excluded.body, size_bytes = excluded.size_bytes,
+                    fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at
+            """, (key, response.headers.get("ETag"), response.headers.get("Last-Modified"), headers,
+                  body, len(body), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM http_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT cache_key, size_bytes FROM http_cache ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM http_cache WHERE cache_key = ?", evicted)
+
+    def report(self):
+        print(f"Hevy cache: {self.hits} fresh hits, {self.revalidated} revalidated, {self.misses} fetched.")
+
+
+def _cached_response(url, headers, body):
+    """Rebuilds a requests.Response from a cache entry so callers cannot tell it apart."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(json.loads(headers))
+    response._content = zlib.decompress(body)
+    response.encoding = "utf-8"
+    return response
@@ -0,0 +1,222 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+import requests
+
+'''
+Client-side request scheduler for the Hevy API.
+Every request waits on a shared token bucket, so parallel backfills stay under the API's rate limit,
+and throttled or failed requests are retried with jittered exponential backoff.
+'''
+
+HEVY_RATE_LIMIT = 10.0  # Requests per second the bucket refills at
+HEVY_RATE_BURST = 10  # Requests that may go out back to back after an idle period
+HEVY_MIN_RATE = 0.5  # Floor the rate is never throttled below
+HEVY_THROTTLE_COOLDOWN = 1.0  # Seconds in which further 429s count as the same throttling event
+HEVY_MAX_RETRIES = 5
+HEVY_BACKOFF_BASE = 0.5  # Seconds; doubled on every retry before jitter
+HEVY_BACKOFF_CAP = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+HEVY_REQUEST_TIMEOUT = 30.0  # Seconds to connect, and to wait for each read, before retrying
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. The rate halves whenever the API throttles us and creeps back up
+    towards max_rate on every success, so it settles just below what the API tolerates.
+    """
+
+    def __init__(self, rate=HEVY_RATE_LIMIT, burst=HEVY_RATE_BURST, min_rate=HEVY_MIN_RATE):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._throttled_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Holds back every caller for `seconds`, e.g. for a Retry-After header."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            # Parallel requests from one burst all come back 429, only slow down once for them
+            if now < self._throttled_until:
+                return
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._throttled_until = now + HEVY_THROTTLE_COOLDOWN
+
+    def recover(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def retry_after_seconds(response):
+    """Returns the delay a Retry-After header asks for (delta-seconds or HTTP-date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class HevyRequestScheduler:
+    """
+    Sends GET requests through a shared token bucket with retries, and keeps per-endpoint
+    request, retry, failure and latency counters.
+    Retries 429/5xx responses, connection errors and timeouts; anything else is returned or raised at once.
+    Requests time out after HEVY_REQUEST_TIMEOUT unless the caller passes its own timeout.
+    With a HevyResponseCache, fresh cached responses skip the network and stale ones are revalidated.
+    """
+
+    def __init__(self, session=None, bucket=None, max_retries=HEVY_MAX_RETRIES,
+                 backoff_base=HEVY_BACKOFF_BASE, backoff_cap=HEVY_BACKOFF_CAP, cache=None, timeout=HEVY_REQUEST_TIMEOUT):
+        self.session = session or requests.Session()
+        self.bucket = bucket or TokenBucket()
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def _backoff(self, attempt):
+        # Full jitter keeps parallel workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _record(self, endpoint, latency=None, retried=False, throttled=False, failed=False, cached=False):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                "requests": 0, "retries": 0, "throttled": 0, "failures": 0, "cached": 0,
+                "latency_total": 0.0, "latency_max": 0.0,
+            })
+            if latency is not None:
+                stats["requests"] += 1
+                stats["latency_total"] += latency
+                stats["latency_max"] = max(stats["latency_max"], latency)
+            stats["retries"] += retried
+            stats["throttled"] += throttled
+            stats["failures"] += failed
+            stats["cached"] += cached
+
+    def get(self, url, endpoint=None, max_age=None, **kwargs):
+        """
+        Sends a GET request, retrying throttled and transient failures.
+        :param endpoint: Optional. Label the counters are kept under (defaults to the URL path).
+        :param max_age: Optional. Overrides the cache TTL for this request; 0 always revalidates.
+        :return: The final response. Callers still call raise_for_status on it.
+        """
+        endpoint = endpoint or urlparse(url).path
+        kwargs.setdefault("timeout", self.timeout)
+        validators = None
+        if self.cache is not None:
+            cache_key = self.cache.cache_key(url, kwargs.get("params"))
+            cached, validators = self.cache.lookup(cache_key, max_age)
+            if cached is not None:
+                self._record(endpoint, cached=True)
+                return cached
+            if validators:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), **validators}
+
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._record(endpoint, time.perf_counter() - started)
+                if attempt >= self.max_retries:
+                    self._record(endpoint, failed=True)
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                self._record(endpoint, time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.bucket.recover()
+                    if self.cache is not None:
+                        if response.status_code == 304 and validators:
+                            return self.cache.revalidate(cache_key)
+                        self.cache.store(cache_key, response)
+                    return response
+                if attempt >= self.max_retries:
+                    self._record(endpoint, failed=True)
+                    return response
+
+                delay = self._backoff(attempt)
+                retry_after = retry_after_seconds(response)
+                if response.status_code == 429:
+                    self._record(endpoint, throttled=True)
+                    self.bucket.throttle()
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                    self.bucket.pause(retry_after)
+                response.close()
+
+            self._record(endpoint, retried=True)
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self):
+        """Returns a copy of the counters per endpoint, with the mean latency in seconds."""
+        with self._lock:
+            return {
+                endpoint: dict(stats, latency_mean=stats["latency_total"] / stats["requests"] if stats["requests"] else 0.0)
+                for endpoint, stats in self._stats.items()
+            }
+
+    def report(self):
+        for endpoint, stats in sorted(self.stats().items()):
+            print(f"{endpoint}: {stats['requests']} requests, {stats['cached']} served from cache, {stats['retries']} retries "
+                  f"({stats['throttled']} throttled), {stats['failures']} failures, "
+                  f"latency mean {stats['latency_mean'] * 1000:.0f}ms max {stats['latency_max'] * 1000:.0f}ms")
+        if self.cache is not None:
+            self.cache.report()
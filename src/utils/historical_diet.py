@@ -1,17 +1,20 @@
 import pandas as pd
-import sqlite3
 from datetime import datetime
 import os
 import uuid  # Add this import for generating unique IDs
 from dateutil.parser import parse  # Add this import for flexible date parsing
 from src.database.database_utils import get_or_create_common_data_id
+from src.database.connection import connect
 
 # Path to your SQLite database
 DATABASE_NAME = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/hevy_metal.db"))
 
 # Function to import diet cycles from a CSV file
-def import_diet_cycles_from_csv(csv_file_path, source="diet_cycles"):
-    """Import diet cycles from a CSV file into the database."""
+def import_diet_cycles_from_csv(csv_file_path, source="diet_cycles", database_name=None):
+    """
+    Import diet cycles from a CSV file into the database.
+    :param database_name: Optional. Database file to write to instead of DATABASE_NAME.
+    """
     # Read the CSV file into a pandas DataFrame
     try:
         df = pd.read_csv(csv_file_path)
@@ -34,7 +37,7 @@ def import_diet_cycles_from_csv(csv_file_path, source="diet_cycles"):
     optional_columns = ["end_date", "gain_rate_lbs_per_week", "loss_rate_lbs_per_week", "notes"]
 
     # Connect to the SQLite database
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = connect(database_name or DATABASE_NAME)
     cursor = conn.cursor()
 
     # Iterate through the DataFrame and insert rows into the diet_cycles table
@@ -47,25 +50,36 @@ def import_diet_cycles_from_csv(csv_file_path, source="diet_cycles"):
             # Get or create common_data_id
             common_data_id = get_or_create_common_data_id(cursor, start_date, source)
 
-            # Prepare the SQL query
-            cursor.execute("""
-                INSERT INTO diet_cycles (
-                    common_data_id, start_date, end_date, cycle_type, gain_rate_lbs_per_week,
-                    loss_rate_lbs_per_week, notes, source, created_at, updated_at
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                common_data_id,
+            values = (
                 start_date,
                 end_date,
                 row["cycle_type"],
                 row.get("gain_rate_lbs_per_week"),
                 row.get("loss_rate_lbs_per_week"),
                 row.get("notes"),
-                source,  # Ensure source is populated
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ))
+                source  # Ensure source is populated
+            )
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            # Re-importing the CSV updates the cycle stored for this start date instead of duplicating it
+            cursor.execute("SELECT cycle_id FROM diet_cycles WHERE common_data_id = ?", (common_data_id,))
+            existing = cursor.fetchone()
+            if existing:
+                cursor.execute("""
+                    UPDATE diet_cycles
+                    SET start_date = ?, end_date = ?, cycle_type = ?, gain_rate_lbs_per_week = ?,
+                        loss_rate_lbs_per_week = ?, notes = ?, source = ?, updated_at = ?
+                    WHERE cycle_id = ?
+                """, (*values, now, existing[0]))
+            else:
+                # Prepare the SQL query
+                cursor.execute("""
+                    INSERT INTO diet_cycles (
+                        common_data_id, start_date, end_date, cycle_type, gain_rate_lbs_per_week,
+                        loss_rate_lbs_per_week, notes, source, created_at, updated_at
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (common_data_id, *values, now, now))
         except Exception as e:
             print(f"Error inserting row: {row.to_dict()}, Error: {e}")
 
@@ -74,15 +88,18 @@ def import_diet_cycles_from_csv(csv_file_path, source="diet_cycles"):
     conn.close()
     print("Diet cycles imported successfully.")
 
-def import_diet_weeks_from_csv(csv_file_path, source="diet_weeks_csv"):
-    """Import diet weeks from a CSV file into the database."""
+def import_diet_weeks_from_csv(csv_file_path, source="diet_weeks_csv", database_name=None):
+    """
+    Import diet weeks from a CSV file into the database.
+    :param database_name: Optional. Database file to write to instead of DATABASE_NAME.
+    """
     try:
         df = pd.read_csv(csv_file_path)
     except Exception as e:
         print(f"Error reading CSV file: {e}")
         return
 
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = connect(database_name or DATABASE_NAME)
     cursor = conn.cursor()
 
     for _, row in df.iterrows():
@@ -97,22 +114,35 @@ def import_diet_weeks_from_csv(csv_file_path, source="diet_weeks_csv"):
             # Get or create common_data_id
             common_data_id = get_or_create_common_data_id(cursor, week_start_date, source)
 
-            # Insert into diet_weeks table
-            cursor.execute("""
-                INSERT INTO diet_weeks (
-                    cycle_id, common_data_id, week_id, source, week_start_date, calorie_target, created_at, updated_at
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                cycle_id,
-                common_data_id,
-                week_id,
-                source,  # Ensure source is populated
-                week_start_date,
-                calorie_target,
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ))
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            # Re-importing the CSV updates the stored week of this cycle instead of duplicating it
+            cursor.execute("SELECT week_id FROM diet_weeks WHERE cycle_id = ? AND week_start_date = ?",
+                           (cycle_id, week_start_date))
+            existing = cursor.fetchone()
+            if existing:
+                cursor.execute("""
+                    UPDATE diet_weeks
+                    SET common_data_id = ?, source = ?, calorie_target = ?, updated_at = ?
+                    WHERE week_id = ?
+                """, (common_data_id, source, calorie_target, now, existing[0]))
+            else:
+                # Insert into diet_weeks table
+                cursor.execute("""
+                    INSERT INTO diet_weeks (
+                        cycle_id, common_data_id, week_id, source, week_start_date, calorie_target, created_at, updated_at
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    cycle_id,
+                    common_data_id,
+                    week_id,
+                    source,  # Ensure source is populated
+                    week_start_date,
+                    calorie_target,
+                    now,
+                    now
+                ))
         except Exception as e:
             print(f"Error inserting row: {row.to_dict()}, Error: {e}")
 
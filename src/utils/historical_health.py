@@ -1,16 +1,29 @@
 import os
 import json
-import sqlite3
+import time
+import glob
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from datetime import date
+from datetime import timedelta
 from sqlalchemy import func
 from src.database.schema import health_markers_table, common_data
 from sqlalchemy.orm import Session
-from src.database.database_utils import get_or_create_common_data_id
+from src.database.bulk_writer import HealthBulkWriter, RowCollector
+from src.database.connection import connect
+from src.database.watermarks import ImportWatermarks
+from src.database.import_manifest import ImportManifest
 from sqlalchemy.exc import IntegrityError
+from src.utils.health_stream import iter_health_export, STREAM_BATCH_SIZE
+from src.utils.health_index import (
+    iter_indexed_batches, load_or_build_index, index_day_span, day_key_to_date, INDEX_SUFFIX
+)
+from src.utils.ingest_stats import report_ingest_stats
+from src.utils.timestamps import parse_export_timestamp, normalize_export_timestamp, local_day_key, utc_epoch_and_day_key
 
 DATABASE_NAME = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/hevy_metal.db"))
 JSON_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/HealthAutoExport-2023-06-17-2025-04-26.json"))
+HEALTH_EXPORT_PATTERN = "HealthAutoExport-*.json"
 
 # Metric name mapping
 METRIC_NAME_MAPPING = {
@@ -34,6 +47,22 @@ METRIC_NAME_MAPPING = {
     "body_mass_index": "body_mass_index"
 }
 
+NUTRITION_METRICS = [
+    "calories", "protein", "carbohydrates_g", "fat_g", "water_floz", "caffeine_mg",
+    "potassium_mg", "fiber_g", "sodium_mg", "sugar_g"]
+
+MARKERS_METRICS = [
+    "time_in_daylight_min", "vo2_max", "heart_rate", "heart_rate_variability", "resting_heart_rate",
+    "respiratory_rate", "blood_oxygen_saturation", "body_weight_lbs", "body_mass_index"]
+
+# Entries per task handed to a parse worker, so one large metric still spreads across workers
+PARALLEL_CHUNK_SIZE = 2000
+# From benchmark_health_import.py: parsing costs ~11us per entry, shipping an entry to a worker and its rows back
+# ~5.4us and starting the pool ~12ms. Two workers save ~5.4us of parsing per entry, no more than the transfer,
+# so the pool needs at least three, and three to four break even at roughly 4,000-7,000 entries.
+PARALLEL_MIN_WORKERS = 3
+PARALLEL_MIN_ENTRIES = 10000
+
 def get_or_create_metric_id(cursor, metric_name, units, category="general"):
     """
     Get or create a metric_id for a given metric name.
@@ -52,8 +81,8 @@ def get_or_create_metric_id(cursor, metric_name, units, category="general"):
     """, (metric_name, units, category))
     return cursor.lastrowid
 
-def insert_raw_data(cursor, metric_name, metric_units, metric_data):
-    metric_id = get_or_create_metric_id(cursor, metric_name, metric_units)
+def insert_raw_data(writer, metric_name, metric_units, metric_data):
+    metric_id = writer.metric_id(metric_name, metric_units)
 
     for entry in metric_data:
         date = entry.get("date")
@@ -62,35 +91,18 @@ def insert_raw_data(cursor, metric_name, metric_units, metric_data):
 
         # Convert date to a datetime object
         try:
-            date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S %z")
+            date = parse_export_timestamp(date)
         except ValueError as e:
             print(f"Error parsing date '{date}': {e}")
             continue
 
-        # Check if an entry for this date and metric already exists
-        cursor.execute("""
-            SELECT 1 FROM data WHERE metric_id = ? AND common_data_id = (
-                SELECT common_data_id FROM common_data WHERE date = ? AND source = ?
-            )
-        """, (metric_id, date, source))
-        if cursor.fetchone():
-            continue  # Skip duplicate entry
-
         # Get or create the common_data_id
-        common_data_id = get_or_create_common_data_id(cursor, date, source)
+        common_data_id = writer.common_data_id(date, source)
 
-        # Insert into the data table
-        try:
-            cursor.execute("""
-                INSERT INTO data (common_data_id, metric_id, qty, data_json, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (common_data_id, metric_id, qty, json.dumps(entry), 
-                  datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
-                  datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        except sqlite3.IntegrityError as e:
-            print(f"Error inserting data for metric '{metric_name}': {e}")
+        # Queue the row for the data table; an entry already stored for this date and metric is updated in place
+        writer.add_raw(metric_id, common_data_id, qty, json.dumps(entry))
 
-def pull_sleep_from_json(metric_data, cursor):
+def pull_sleep_from_json(metric_data, writer):
 
     for sleep_entry in metric_data:
                 start_time = sleep_entry.get("sleepStart")
@@ -108,53 +120,37 @@ def pull_sleep_from_json(metric_data, cursor):
 
                 # Convert times to datetime objects
                 try:
-                    start_timestamp = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S %z")
-                    end_timestamp = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S %z")
-                    in_bed_start_timestamp = datetime.strptime(in_bed_start, "%Y-%m-%d %H:%M:%S %z") if in_bed_start else None
-                    in_bed_end_timestamp = datetime.strptime(in_bed_end, "%Y-%m-%d %H:%M:%S %z") if in_bed_end else None
+                    start_timestamp = parse_export_timestamp(start_time)
+                    end_timestamp = parse_export_timestamp(end_time)
+                    in_bed_start_timestamp = parse_export_timestamp(in_bed_start) if in_bed_start else None
+                    in_bed_end_timestamp = parse_export_timestamp(in_bed_end) if in_bed_end else None
                 except ValueError as e:
                     print(f"Error parsing sleep cycle times: {e}")
                     continue
 
                 # Get or create the common_data_id
-                common_data_id = get_or_create_common_data_id(cursor, start_timestamp, source)
-
-
-                cursor.execute("""
-                    SELECT 1 FROM sleep_data
-                    WHERE common_data_id = ? AND start_time = ? AND end_time = ?
-                """, (common_data_id, start_timestamp, end_timestamp))
-
-                if cursor.fetchone() is None:
-                # Insert into the sleep_data table
-                    try:
-                        cursor.execute("""
-                            INSERT INTO sleep_data (
-                                common_data_id, start_time, end_time, in_bed_duration_hours, sleep_duration_hours,
-                                awake_duration_hours, rem_sleep_duration_hours, deep_sleep_duration_hours,
-                                core_sleep_duration_hours, in_bed_start, in_bed_end, created_at, updated_at
-                            )
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            common_data_id,
-                            start_timestamp.strftime("%Y-%m-%d %H:%M:%S %z"),
-                            end_timestamp.strftime("%Y-%m-%d %H:%M:%S %z"),
-                            in_bed_duration,
-                            sleep_duration,
-                            awake_duration,
-                            rem_duration,
-                            deep_duration,
-                            core_duration,
-                            in_bed_start_timestamp.strftime("%Y-%m-%d %H:%M:%S %z") if in_bed_start_timestamp else None,
-                            in_bed_end_timestamp.strftime("%Y-%m-%d %H:%M:%S %z") if in_bed_end_timestamp else None,
-                            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        ))
-                        #print(f"Inserted sleep cycle: Start: {start_time}, End: {end_time}, Source: {source}")
-                    except sqlite3.IntegrityError as e:
-                        print(f"Error inserting sleep cycle data: {e}")
-
-def pull_nutrition_from_json(metric_data, metric_name, cursor, nutrition_data_grouped):
+                common_data_id = writer.common_data_id(start_timestamp, source)
+
+                # Queue the sleep_data row; the writer skips cycles that are already stored
+                writer.add_sleep({
+                    "common_data_id": common_data_id,
+                    "start_time": start_timestamp.strftime("%Y-%m-%d %H:%M:%S %z"),
+                    "end_time": end_timestamp.strftime("%Y-%m-%d %H:%M:%S %z"),
+                    "in_bed_duration_hours": in_bed_duration,
+                    "sleep_duration_hours": sleep_duration,
+                    "awake_duration_hours": awake_duration,
+                    "rem_sleep_duration_hours": rem_duration,
+                    "deep_sleep_duration_hours": deep_duration,
+                    "core_sleep_duration_hours": core_duration,
+                    "in_bed_start": in_bed_start_timestamp.strftime("%Y-%m-%d %H:%M:%S %z") if in_bed_start_timestamp else None,
+                    "in_bed_end": in_bed_end_timestamp.strftime("%Y-%m-%d %H:%M:%S %z") if in_bed_end_timestamp else None,
+                })
+
+def pull_nutrition_from_json(metric_data, metric_name, nutrition_data_grouped):
+    """
+    Pivot stage: accumulates one nutrition metric into wide rows keyed by (date, source).
+    Nothing is written here; write_nutrition_rows stores each row once after all metrics are grouped.
+    """
     for entry in metric_data:
         date = entry.get("date")
         qty = entry.get("qty")
@@ -177,6 +173,10 @@ def pull_nutrition_from_json(metric_data, metric_name, cursor, nutrition_data_gr
             }
         nutrition_data_grouped[key][metric_name] = qty
 
+def write_nutrition_rows(writer, nutrition_data_grouped):
+    """
+    Writes each grouped (date, source) nutrition row exactly once through the bulk upsert.
+    """
     for (date, source), nutrition_values in nutrition_data_grouped.items():
         calories = nutrition_values.get("calories")
         protein_g = nutrition_values.get("protein")
@@ -190,74 +190,38 @@ def pull_nutrition_from_json(metric_data, metric_name, cursor, nutrition_data_gr
         sugar_g = nutrition_values.get("sugar_g")
 
         try:
-            date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S %z")
+            date = parse_export_timestamp(date)
         except ValueError as e:
             print(f"Error parsing nutrition date '{date}': {e}")
             continue
 
-        # Check if an entry for this date and source already exists
-        cursor.execute("""
-            SELECT 1 FROM nutrition_data WHERE common_data_id = (
-                SELECT common_data_id FROM common_data WHERE date = ? AND source = ?
-            )
-        """, (date, source))
-        if cursor.fetchone():
-            continue  # Skip duplicate entry
-
         # Get or create the common_data_id
-        common_data_id = get_or_create_common_data_id(cursor, date, source)
-
-        cursor.execute("""
-            SELECT 1 FROM nutrition_data WHERE common_data_id = ?
-        """, (common_data_id,))
-        if cursor.fetchone() is None:
-            # Insert a new row
-            cursor.execute("""
-                INSERT INTO nutrition_data (
-                    common_data_id, calories, protein_g, carbohydrates_g, fat_g, water_floz, caffeine_mg,
-                    potassium_mg, fiber_g, sodium_mg, sugar_g, created_at, updated_at
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                common_data_id, calories, protein_g, carbohydrates_g, fat_g, water_floz, caffeine_mg,
-                potassium_mg, fiber_g, sodium_mg, sugar_g,
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ))
-        else:
-            # Update the existing row
-            cursor.execute("""
-                UPDATE nutrition_data
-                SET calories = COALESCE(?, calories),
-                    protein_g = COALESCE(?, protein_g),
-                    carbohydrates_g = COALESCE(?, carbohydrates_g),
-                    fat_g = COALESCE(?, fat_g),
-                    water_floz = COALESCE(?, water_floz),
-                    caffeine_mg = COALESCE(?, caffeine_mg),
-                    potassium_mg = COALESCE(?, potassium_mg),
-                    fiber_g = COALESCE(?, fiber_g),
-                    sodium_mg = COALESCE(?, sodium_mg),
-                    sugar_g = COALESCE(?, sugar_g),
-                    updated_at = ?
-                WHERE common_data_id = ?
-            """, (
-                calories, protein_g, carbohydrates_g, fat_g, water_floz, caffeine_mg,
-                potassium_mg, fiber_g, sodium_mg, sugar_g,
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"), common_data_id
-            ))
-
-def pull_markers_from_json(metric_data, metric_name, cursor, markers_data_grouped):
-    print(f"Processing metric: {metric_name}")
+        common_data_id = writer.common_data_id(date, source)
+
+        # Insert a new row, or update the existing one
+        writer.upsert_nutrition(common_data_id, {
+            "calories": calories,
+            "protein_g": protein_g,
+            "carbohydrates_g": carbohydrates_g,
+            "fat_g": fat_g,
+            "water_floz": water_floz,
+            "caffeine_mg": caffeine_mg,
+            "potassium_mg": potassium_mg,
+            "fiber_g": fiber_g,
+            "sodium_mg": sodium_mg,
+            "sugar_g": sugar_g,
+        })
+
+def pull_markers_from_json(metric_data, metric_name, markers_data_grouped):
+    """
+    Pivot stage: accumulates one health marker metric into wide rows keyed by (date, source).
+    Nothing is written here; write_marker_rows stores each row once after all metrics are grouped.
+    """
     for entry in metric_data:
         date = entry.get("date")
         source = entry.get("source", "Unknown")
         qty = entry.get("qty")  # Extract the qty field
 
-        # Debugging: Log the raw entry being processed
-        #if metric_name == "time_in_daylight_min":
-            #print(f"Raw entry for time_in_daylight: {entry}")
-            #print(f"Grouped data for time_in_daylight before database operation: {markers_data_grouped}")
-
         # Ensure qty is extracted correctly
         if metric_name == "time_in_daylight_min" and qty is None:
             print(f"Warning: Missing 'qty' for time_in_daylight in entry: {entry}")
@@ -279,7 +243,7 @@ def pull_markers_from_json(metric_data, metric_name, cursor, markers_data_groupe
 
         # Convert date to a datetime object
         try:
-            timestamp = datetime.strptime(date, "%Y-%m-%d %H:%M:%S %z")
+            timestamp = parse_export_timestamp(date)
         except ValueError as e:
             print(f"Error parsing date '{date}' for {metric_name}: {e}")
             continue
@@ -307,6 +271,10 @@ def pull_markers_from_json(metric_data, metric_name, cursor, markers_data_groupe
         else:
             markers_data_grouped[key][metric_name] = avg_val
 
+def write_marker_rows(writer, markers_data_grouped):
+    """
+    Writes each grouped (date, source) health marker row exactly once through the bulk upsert.
+    """
     for (date, source), marker_values in markers_data_grouped.items():
         # Skip entries where all marker values are None
         if all(value is None for value in marker_values.values()):
@@ -314,143 +282,181 @@ def pull_markers_from_json(metric_data, metric_name, cursor, markers_data_groupe
 
         # Convert date to a datetime object
         try:
-            timestamp = datetime.strptime(date, "%Y-%m-%d %H:%M:%S %z")
+            timestamp = parse_export_timestamp(date)
         except ValueError as e:
             print(f"Error parsing marker date '{date}': {e}")
             continue
 
         # Get or create the common_data_id
-        common_data_id = get_or_create_common_data_id(cursor, timestamp, source)
-
-        # Debugging: Print the data point before adding it to the database
-        print(f"Preparing to insert/update health marker row:")
-        print(f"  Date: {timestamp}")
-        print(f"  Source: {source}")
-        print(f"  Values: {marker_values}")
-
-        # Check if a row already exists for this common_data_id
-        cursor.execute("""
-            SELECT * FROM health_markers WHERE common_data_id = ?
-        """, (common_data_id,))
-        existing_row = cursor.fetchone()
-
-        if existing_row:
-            # Update the existing row by aggregating values
-            cursor.execute("""
-                UPDATE health_markers
-                SET time_in_daylight_min = COALESCE(?, time_in_daylight_min),
-                    vo2_max = COALESCE(?, vo2_max),
-                    heart_rate_min = COALESCE(?, heart_rate_min),
-                    heart_rate_max = COALESCE(?, heart_rate_max),
-                    heart_rate_avg = COALESCE(?, heart_rate_avg),
-                    heart_rate_variability = COALESCE(?, heart_rate_variability),
-                    resting_heart_rate = COALESCE(?, resting_heart_rate),
-                    respiratory_rate = COALESCE(?, respiratory_rate),
-                    blood_oxygen_saturation = COALESCE(?, blood_oxygen_saturation),
-                    body_mass_index = COALESCE(?, body_mass_index),
-                    body_weight_lbs = COALESCE(?, body_weight_lbs),
-                    updated_at = ?
-                WHERE common_data_id = ?
-            """, (
-                marker_values.get("time_in_daylight_min"),
-                marker_values.get("vo2_max"),
-                marker_values.get("heart_rate_min"),
-                marker_values.get("heart_rate_max"),
-                marker_values.get("heart_rate_avg"),
-                marker_values.get("heart_rate_variability"),
-                marker_values.get("resting_heart_rate"),
-                marker_values.get("respiratory_rate"),
-                marker_values.get("blood_oxygen_saturation"),
-                marker_values.get("body_mass_index"),
-                marker_values.get("body_weight_lbs"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                common_data_id
-            ))
-        else:
-            # Insert a new row
-            cursor.execute("""
-                INSERT INTO health_markers (
-                    common_data_id, time_in_daylight_min, vo2_max, heart_rate_min, heart_rate_max, heart_rate_avg,
-                    heart_rate_variability, resting_heart_rate, respiratory_rate, blood_oxygen_saturation,
-                    body_mass_index, body_weight_lbs, created_at, updated_at
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                common_data_id,
-                marker_values.get("time_in_daylight_min"),
-                marker_values.get("vo2_max"),
-                marker_values.get("heart_rate_min"),
-                marker_values.get("heart_rate_max"),
-                marker_values.get("heart_rate_avg"),
-                marker_values.get("heart_rate_variability"),
-                marker_values.get("resting_heart_rate"),
-                marker_values.get("respiratory_rate"),
-                marker_values.get("blood_oxygen_saturation"),
-                marker_values.get("body_mass_index"),
-                marker_values.get("body_weight_lbs"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ))
-
-def import_daily_data(data, conn):
+        common_data_id = writer.common_data_id(timestamp, source)
+
+        # Insert a new row, or update the existing one by aggregating values
+        writer.upsert_markers(common_data_id, marker_values)
+
+def import_metric_data(writer, metric_name, metric_units, metric_data, nutrition_data_grouped, markers_data_grouped):
+    """
+    Runs one (translated) metric's entries through the raw, sleep, nutrition and marker stages.
+    """
+    insert_raw_data(writer, metric_name, metric_units, metric_data)
+    # Handle sleep_analysis specifically
+    if metric_name == "sleep_analysis":
+        pull_sleep_from_json(metric_data, writer)
+
+    elif metric_name in NUTRITION_METRICS:
+        pull_nutrition_from_json(metric_data, metric_name, nutrition_data_grouped)
+
+    elif metric_name in MARKERS_METRICS:
+        pull_markers_from_json(metric_data, metric_name, markers_data_grouped)
+
+def merge_grouped_rows(target, grouped):
+    """
+    Merges one pivot dict into another, keeping existing values where the new one is None.
+    """
+    for key, values in grouped.items():
+        merged = target.get(key)
+        if merged is None:
+            target[key] = dict(values)
+            continue
+        for column, value in values.items():
+            if value is not None:
+                merged[column] = value
+
+def import_daily_data(data, conn, watermarks=None):
     """
     Imports one day's worth of health data into the database.
+    :param watermarks: Optional. An ImportWatermarks instance; entries at or before its marks are skipped.
     """
-    cursor = conn.cursor()
+    writer = HealthBulkWriter(conn)
 
-    nutrition_metrics = [
-        "calories", "protein", "carbohydrates_g", "fat_g", "water_floz", "caffeine_mg",
-        "potassium_mg", "fiber_g", "sodium_mg", "sugar_g"]
     nutrition_data_grouped = {}
-
-    markers_metrics = [
-        "time_in_daylight_min", "vo2_max", "heart_rate", "heart_rate_variability", "resting_heart_rate",
-        "respiratory_rate", "blood_oxygen_saturation", "body_weight_lbs", "body_mass_index"]
     markers_data_grouped = {}
 
     # Import metrics data
     for metric in data.get("metrics", []):
         metric_name = metric.get("name")
-        print(f"Found metric: {metric_name}")
-
         metric_units = metric.get("units")
         metric_data = metric.get("data", [])
         # Translate metric name using the mapping
         metric_name = METRIC_NAME_MAPPING.get(metric_name, metric_name)
-        print(f"Translated Metric Name: {metric_name}")
-        #print(f"Processing metric: {metric_name} with units: {metric_units}")
-        #print(f"Mapped Metric Name: {metric_name}, Original Name: {metric.get('name')}")
-        insert_raw_data(cursor, metric_name, metric_units, metric_data)
-        # Handle sleep_analysis specifically
-        if metric_name == "sleep_analysis":
-            pull_sleep_from_json(metric_data, cursor)
+        if watermarks is not None:
+            metric_data = watermarks.filter_new(metric_name, metric_data)
+            print(f"{len(metric_data)} new entries for {metric_name}")
+        import_metric_data(writer, metric_name, metric_units, metric_data, nutrition_data_grouped, markers_data_grouped)
+
+    # Every metric is grouped now, so each nutrition and marker row is written once
+    write_nutrition_rows(writer, nutrition_data_grouped)
+    write_marker_rows(writer, markers_data_grouped)
 
-        elif metric_name in nutrition_metrics:
-            print(f"Calling pull_nutrition_from_json for Metric: {metric_name}")
-            pull_nutrition_from_json(metric_data, metric_name, cursor, nutrition_data_grouped)
+    # Write out whatever is still queued and commit the changes
+    if watermarks is not None:
+        watermarks.save()
+    writer.flush()
+
+def _parse_metric_chunk(metric_name, metric_units, metric_data):
+    """
+    Parse worker: runs the import stages for one chunk of a metric against a RowCollector.
+    Returns the collector plus the chunk's nutrition and marker pivot rows.
+    """
+    collector = RowCollector()
+    nutrition_data_grouped = {}
+    markers_data_grouped = {}
+    import_metric_data(collector, metric_name, metric_units, metric_data, nutrition_data_grouped, markers_data_grouped)
+    return collector, nutrition_data_grouped, markers_data_grouped
+
+def metric_chunks(data, watermarks=None):
+    """
+    Splits the export into (metric name, units, entries) tasks of at most PARALLEL_CHUNK_SIZE entries.
+    :param watermarks: Optional. An ImportWatermarks instance; entries at or before its marks are dropped.
+    """
+    tasks = []
+    for metric in data.get("metrics", []):
+        metric_units = metric.get("units")
+        metric_data = metric.get("data", [])
+        metric_name = METRIC_NAME_MAPPING.get(metric.get("name"), metric.get("name"))
+        if watermarks is not None:
+            metric_data = watermarks.filter_new(metric_name, metric_data)
+        for start in range(0, len(metric_data), PARALLEL_CHUNK_SIZE):
+            tasks.append((metric_name, metric_units, metric_data[start:start + PARALLEL_CHUNK_SIZE]))
+    return tasks
+
+def parallel_workers(workers, entries):
+    """
+    Returns how many parse processes are worth using: at most the CPU count, and 1 (serial) when that
+    is fewer than PARALLEL_MIN_WORKERS or there are fewer than PARALLEL_MIN_ENTRIES entries.
+    :param workers: Requested number of processes, None for the CPU count.
+    :param entries: Number of export entries to import.
+    """
+    cpus = os.cpu_count() or 1
+    workers = min(workers or cpus, cpus)
+    if workers < PARALLEL_MIN_WORKERS or entries < PARALLEL_MIN_ENTRIES:
+        return 1
+    return workers
 
-        elif metric_name in markers_metrics:
-            pull_markers_from_json(metric_data, metric_name, cursor, markers_data_grouped)
+def import_daily_data_parallel(data, conn, workers=None, watermarks=None):
+    """
+    Imports health data with per-metric parsing spread across a process pool.
+    Workers return compact row batches; this process stays the single SQLite writer.
+    Falls back to import_daily_data when parallel_workers() says a pool would not pay off.
+    :param workers: Optional. Number of parse processes (defaults to the CPU count).
+    :param watermarks: Optional. An ImportWatermarks instance; entries at or before its marks are skipped.
+    """
+    workers = parallel_workers(workers, sum(len(metric.get("data", [])) for metric in data.get("metrics", [])))
+    if workers == 1:
+        return import_daily_data(data, conn, watermarks)
 
-    # Commit the changes
-    conn.commit()
+    writer = HealthBulkWriter(conn)
+    tasks = metric_chunks(data, watermarks)
 
-def import_historical_data(json_file_path, target_date=None):
+    nutrition_data_grouped = {}
+    markers_data_grouped = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_parse_metric_chunk, *zip(*tasks)) if tasks else []
+        for collector, nutrition_rows, marker_rows in results:
+            collector.apply(writer)
+            merge_grouped_rows(nutrition_data_grouped, nutrition_rows)
+            merge_grouped_rows(markers_data_grouped, marker_rows)
+
+    write_nutrition_rows(writer, nutrition_data_grouped)
+    write_marker_rows(writer, markers_data_grouped)
+
+    if watermarks is not None:
+        watermarks.save()
+    writer.flush()
+
+def import_historical_data(json_file_path, target_date=None, streaming=False, batch_size=STREAM_BATCH_SIZE,
+                           incremental=False, overlap=timedelta(0), workers=1, indexed=False, database_name=None):
     """
     Loops through the JSON file and imports all historical data or data for a specific date into the database.
     :param json_file_path: Path to the JSON file containing historical data.
     :param target_date: Optional. A datetime.date object to filter data for a specific day.
+    :param streaming: Optional. Walk the file incrementally in bounded batches instead of loading it whole.
+    :param batch_size: Maximum number of entries per batch in streaming mode.
+    :param incremental: Optional. Skip entries at or before each (metric, source) high-water mark.
+    :param overlap: Optional. A timedelta re-imported before each mark to pick up late-arriving edits.
+    :param workers: Optional. Parse metrics in this many processes (None for the CPU count). Ignored when streaming.
+    :param indexed: Optional. With target_date, read only that day's entries via the sidecar date index.
+    :param database_name: Optional. Database file to write to instead of DATABASE_NAME.
     """
     if not os.path.exists(json_file_path):
         print(f"JSON file not found: {json_file_path}")
         return
 
+    if indexed and target_date:
+        import_historical_data_range(json_file_path, target_date, batch_size=batch_size, database_name=database_name)
+        return
+
+    if streaming:
+        import_historical_data_streaming(json_file_path, target_date=target_date, batch_size=batch_size,
+                                         incremental=incremental, overlap=overlap, database_name=database_name)
+        return
+
     # Load the JSON file
     with open(json_file_path, "r") as file:
         health_data = json.load(file)
 
     # Filter data for the target date if provided
     if target_date:
+        target_day_key = local_day_key(target_date)
         filtered_data = {
             "metrics": [
                 {
@@ -458,7 +464,7 @@ def import_historical_data(json_file_path, target_date=None):
                     "units": metric["units"],
                     "data": [
                         entry for entry in metric["data"]
-                        if datetime.strptime(entry["date"], "%Y-%m-%d %H:%M:%S %z").date() == target_date
+                        if normalize_export_timestamp(entry["date"])[1] == target_day_key
                     ],
                 }
                 for metric in health_data["data"]["metrics"]
@@ -467,16 +473,162 @@ def import_historical_data(json_file_path, target_date=None):
         health_data["data"] = filtered_data
 
     # Connect to the database
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = connect(database_name or DATABASE_NAME)
+    # Full imports advance the marks too, so the next incremental run only reads what is newer. A single
+    # day import does not, since it says nothing about the days before it.
+    watermarks = ImportWatermarks(conn, overlap, skip_seen=incremental) if incremental or not target_date else None
 
     # Import the data
     print(f"Importing health data for {target_date if target_date else 'all dates'}...")
-    import_daily_data(health_data["data"], conn)
+    if workers == 1:
+        import_daily_data(health_data["data"], conn, watermarks)
+    else:
+        import_daily_data_parallel(health_data["data"], conn, workers, watermarks)
 
     # Close the connection
     conn.close()
     print("Data import complete.")
 
+def import_historical_data_streaming(json_file_path, target_date=None, batch_size=STREAM_BATCH_SIZE,
+                                     incremental=False, overlap=timedelta(0), database_name=None):
+    """
+    Streams the JSON file through the import stages in bounded batches, committing after each batch.
+    Memory stays flat regardless of export size. Reports rows/sec and peak RSS at the end.
+    :param json_file_path: Path to the JSON file containing historical data.
+    :param target_date: Optional. A datetime.date object to filter data for a specific day.
+    :param batch_size: Maximum number of entries handed to the import stages at once.
+    :param incremental: Optional. Skip entries at or before each (metric, source) high-water mark.
+    :param overlap: Optional. A timedelta re-imported before each mark to pick up late-arriving edits.
+    :param database_name: Optional. Database file to write to instead of DATABASE_NAME.
+    """
+    conn = connect(database_name or DATABASE_NAME)
+    # As in import_historical_data, full imports advance the marks without skipping anything
+    watermarks = ImportWatermarks(conn, overlap, skip_seen=incremental) if incremental or not target_date else None
+
+    print(f"Streaming health data for {target_date if target_date else 'all dates'}...")
+    target_day_key = local_day_key(target_date) if target_date else None
+    started = time.perf_counter()
+    rows = import_metric_batches(conn, iter_health_export(json_file_path, batch_size), target_day_key, watermarks)
+
+    conn.close()
+    report_ingest_stats("Streaming health import", rows, time.perf_counter() - started)
+    print("Data import complete.")
+
+def import_historical_data_range(json_file_path, start_date, end_date=None, batch_size=STREAM_BATCH_SIZE,
+                                 database_name=None):
+    """
+    Re-imports a single day or a date range using the export's sidecar date index.
+    Only the entries for the requested local days are read from the file; the index is built on
+    first use and rebuilt automatically whenever the export changes.
+    :param json_file_path: Path to the JSON file containing historical data.
+    :param start_date: A datetime.date object for the first day to import.
+    :param end_date: Optional. A datetime.date object for the last day to import (defaults to start_date).
+    :param batch_size: Maximum number of entries handed to the import stages at once.
+    :param database_name: Optional. Database file to write to instead of DATABASE_NAME.
+    """
+    if not os.path.exists(json_file_path):
+        print(f"JSON file not found: {json_file_path}")
+        return
+
+    conn = connect(database_name or DATABASE_NAME)
+
+    print(f"Importing health data from {start_date} to {end_date or start_date}...")
+    started = time.perf_counter()
+    rows = import_metric_batches(conn, iter_indexed_batches(json_file_path, start_date, end_date, batch_size))
+
+    conn.close()
+    report_ingest_stats("Indexed health import", rows, time.perf_counter() - started)
+    print("Data import complete.")
+
+def import_health_directory(directory, pattern=HEALTH_EXPORT_PATTERN, batch_size=STREAM_BATCH_SIZE, database_name=None):
+    """
+    Ingests every HealthAutoExport file in a directory, oldest name first.
+    Each file's size, mtime and content hash are recorded in the import_manifest table: files already
+    ingested are skipped, and a new overlapping export only has the days from the last covered day
+    onwards read (the last day is repeated because the previous export may have ended mid-day).
+    :param directory: Directory holding the exports.
+    :param pattern: Optional. Glob pattern for export file names.
+    :param batch_size: Maximum number of entries handed to the import stages at once.
+    :param database_name: Optional. Database file to write to instead of DATABASE_NAME.
+    """
+    file_paths = sorted(
+        path for path in glob.glob(os.path.join(directory, pattern))
+        if not path.endswith(INDEX_SUFFIX)  # The pattern also matches our own sidecar indexes
+    )
+    if not file_paths:
+        print(f"No health exports matching {pattern} found in {directory}.")
+        return
+
+    conn = connect(database_name or DATABASE_NAME)
+    manifest = ImportManifest(conn)
+    started = time.perf_counter()
+    rows = 0
+    for file_path in file_paths:
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        if manifest.is_ingested(file_path, stat.st_size, stat.st_mtime):
+            print(f"Skipping already ingested export: {file_path}")
+            continue
+
+        index = load_or_build_index(file_path)
+        first_day, last_day = index_day_span(index)
+        if manifest.has_hash(index["sha256"]):
+            print(f"Skipping export with already ingested contents: {file_path}")
+            manifest.record(index["sha256"], file_path, index["size"], index["mtime"], first_day, last_day)
+            continue
+
+        if first_day is not None:
+            covered_through = manifest.covered_through()
+            start_day = max(first_day, covered_through) if covered_through else first_day
+            if start_day <= last_day:
+                print(f"Importing {file_path} from {day_key_to_date(start_day)} to {day_key_to_date(last_day)}...")
+                rows += import_metric_batches(conn, iter_indexed_batches(
+                    file_path, day_key_to_date(start_day), day_key_to_date(last_day), batch_size))
+            else:
+                print(f"No new days in {file_path}.")
+        manifest.record(index["sha256"], file_path, index["size"], index["mtime"], first_day, last_day)
+
+    conn.close()
+    report_ingest_stats("Health directory import", rows, time.perf_counter() - started)
+    print("Data import complete.")
+
+def import_metric_batches(conn, batches, target_day_key=None, watermarks=None):
+    """
+    Runs (metric_name, metric_units, entries) batches through the import stages, committing after each one.
+    :param target_day_key: Optional. Only keep entries whose local day key matches.
+    :param watermarks: Optional. An ImportWatermarks instance; entries at or before its marks are skipped.
+    :return: Number of entries imported.
+    """
+    writer = HealthBulkWriter(conn)
+    rows = 0
+    for metric_name, metric_units, metric_data in batches:
+        if target_day_key is not None:
+            metric_data = [
+                entry for entry in metric_data
+                if normalize_export_timestamp(entry["date"])[1] == target_day_key
+            ]
+            if not metric_data:
+                continue
+
+        metric_name = METRIC_NAME_MAPPING.get(metric_name, metric_name)
+        if watermarks is not None:
+            metric_data = watermarks.filter_new(metric_name, metric_data)
+            if not metric_data:
+                continue
+
+        # Nutrition and marker rows are upserted with COALESCE, so each batch can pivot on its own
+        # and memory stays bounded by the batch rather than the whole history
+        nutrition_data_grouped = {}
+        markers_data_grouped = {}
+        import_metric_data(writer, metric_name, metric_units, metric_data, nutrition_data_grouped, markers_data_grouped)
+        write_nutrition_rows(writer, nutrition_data_grouped)
+        write_marker_rows(writer, markers_data_grouped)
+        if watermarks is not None:
+            watermarks.save()
+        writer.flush()
+        rows += len(metric_data)
+    return rows
+
 def insert_or_update_health_marker(session: Session, data: dict):
     """
     Inserts or updates a health marker record.
@@ -507,10 +659,13 @@ def insert_or_update_health_marker(session: Session, data: dict):
     else:
         # Insert a new record
         try:
+            utc_epoch, day_key = utc_epoch_and_day_key(data['date'])
             common_data_id = session.execute(
                 common_data.insert().values(
                     date=data['date'],
-                    source=data['source']
+                    source=data['source'],
+                    utc_epoch=utc_epoch,
+                    day_key=day_key
                 ).returning(common_data.c.common_data_id)
             ).scalar()
 
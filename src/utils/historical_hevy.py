@@ -1,160 +1,251 @@
 import requests
 import os
-import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import queue
+import threading
+from requests.adapters import HTTPAdapter
 import json
-from datetime import datetime
-from dotenv import load_dotenv
-from database.database_utils import get_or_create_common_data_id
+import time
+from datetime import datetime, timezone
+from database.connection import connect
+from database.sync_state import get_sync_state, set_sync_state, clear_sync_state
+from utils.hevy_api import HevyClient
+from utils.hevy_scheduler import HevyRequestScheduler
+from utils.hevy_cache import HevyResponseCache
+from utils.ingest_stats import report_ingest_stats
+from database.workout_writer import HevyWorkoutWriter, parse_hevy_timestamp
 
-load_dotenv()
-HEVY_API_KEY = os.getenv("HEVY_API_KEY")
-BASE_URL = os.getenv("HEVY_BASE_URL")
 DATABASE_NAME = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/hevy_metal.db"))
+# The API maximum: /v1/workouts and /v1/workouts/events both answer a pageSize above 10 with a 400
+HEVY_PAGE_SIZE = 10
+HEVY_FETCH_CONCURRENCY = 4
+# sync_state key holding the updated_at of the newest Hevy change already applied
+HEVY_SYNC_STATE_KEY = "hevy_workouts_updated_at"
+# sync_state key holding the last committed page of an unfinished sync
+HEVY_SYNC_CHECKPOINT_KEY = "hevy_workouts_checkpoint"
+# Persistent response cache for repeated runs; set HEVY_CACHE=0 to always hit the API
+HEVY_CACHE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/hevy_cache.db"))
+# Fetched pages waiting for the writer; bounds memory when the database falls behind the network
+HEVY_QUEUE_PAGES = 2 * HEVY_FETCH_CONCURRENCY
+
+def create_hevy_session(pool_size=HEVY_FETCH_CONCURRENCY):
+    """
+    Creates a requests session whose keep-alive pool can hold one connection per concurrent request,
+    so pages reuse TLS connections instead of handshaking every time.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def create_hevy_scheduler(concurrency=HEVY_FETCH_CONCURRENCY, cache=None):
+    """
+    Wraps a pooled session in a rate-limited, retrying request scheduler.
+    :param cache: Optional. Serve and revalidate responses from the on-disk cache at HEVY_CACHE_PATH.
+        Defaults to on unless the HEVY_CACHE environment variable is 0.
+    """
+    if cache is None:
+        cache = os.getenv("HEVY_CACHE", "1") != "0"
+    return HevyRequestScheduler(create_hevy_session(concurrency),
+                                cache=HevyResponseCache(HEVY_CACHE_PATH) if cache else None)
+
+def create_hevy_client(concurrency=HEVY_FETCH_CONCURRENCY, cache=None):
+    """
+    Returns a HevyClient configured from the environment / .env file on first use, sending its
+    requests through create_hevy_scheduler(concurrency, cache).
+    """
+    return HevyClient(transport=create_hevy_scheduler(concurrency, cache), validate=False)
+
+def fetch_page(client, endpoint, page, page_size=HEVY_PAGE_SIZE, params=None, max_age=None):
+    """Fetches a single page of a paginated Hevy endpoint through a HevyClient and returns the decoded JSON body."""
+    return client.get(endpoint, {"page": page, "pageSize": page_size, **(params or {})},
+                      endpoint=endpoint, max_age=max_age)
+
+def _event_time(event):
+    if event.get("type") == "deleted":
+        return parse_hevy_timestamp(event.get("deleted_at"))
+    return parse_hevy_timestamp((event.get("workout") or {}).get("updated_at"))
+
+def apply_workout_events(writer, events):
+    """
+    Applies Hevy workout events in the order they happened. Does not commit.
+    :return: (updated, deleted, latest event time or None)
+    """
+    updated = deleted = 0
+    latest = None
+    min_time = datetime.min.replace(tzinfo=timezone.utc)
+    for event in sorted(events, key=lambda event: _event_time(event) or min_time):
+        if event.get("type") == "deleted":
+            deleted += writer.delete(event.get("id"))
+        elif event.get("type") == "updated" and isinstance(event.get("workout"), dict):
+            updated += writer.store(event["workout"])
+        else:
+            print(f"Skipping unknown workout event: {event}")
+            continue
+        event_time = _event_time(event)
+        if event_time and (latest is None or event_time > latest):
+            latest = event_time
+    return updated, deleted, latest
+
+def stream_pages(client, endpoint, items_key, start_page=1, concurrency=HEVY_FETCH_CONCURRENCY,
+                 page_size=HEVY_PAGE_SIZE, params=None, max_age=None):
+    """
+    Yields (page, page_count, items) for a paginated Hevy endpoint in page order, starting at start_page.
+    A producer thread fetches up to `concurrency` pages ahead through `client` into a bounded queue, so
+    memory stays at a few pages however long the history is. Stops quietly at the first page that fails.
+    :param max_age: Optional. Seconds a cached page may be reused without revalidation.
+    """
+    pages = queue.Queue(maxsize=HEVY_QUEUE_PAGES)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up on the put if the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
-def fetch_all_hevy_workouts():
-    """Fetches all workouts from the Hevy API with pagination."""
-    if not HEVY_API_KEY:
-        print("Error: HEVY_API_KEY not found in environment variables.")
-        return []
-
-    headers = {"api-key": HEVY_API_KEY}
-    all_workouts = []
-    next_page_url = f"{BASE_URL}/workouts"
-
-    while next_page_url:
+    def produce():
         try:
-            response = requests.get(next_page_url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            workouts = data.get("workouts", [])
-            all_workouts.extend(workouts)
-
-            # Handle pagination
-            current_page = data.get("page")
-            page_count = data.get("page_count")
-            next_page_url = f"{BASE_URL}/workouts?page={current_page + 1}" if current_page < page_count else None
-
+            first_page = fetch_page(client, endpoint, start_page, page_size, params, max_age)
+            page_count = first_page.get("page_count") or 1
+            if not put((start_page, page_count, first_page.get(items_key, []))):
+                return
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                in_flight = deque()
+                next_page = start_page + 1
+                while (in_flight or next_page <= page_count) and not stop.is_set():
+                    while next_page <= page_count and len(in_flight) < concurrency:
+                        in_flight.append((next_page, executor.submit(fetch_page, client, endpoint, next_page, page_size, params, max_age)))
+                        next_page += 1
+                    page, future = in_flight.popleft()
+                    if not put((page, page_count, future.result().get(items_key, []))):
+                        break
+                for _, future in in_flight:
+                    future.cancel()
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching data from Hevy API: {e}")
-            break
-
-    return all_workouts
-
-def store_workouts_in_sqlite(workouts):
-    """Stores Hevy workout data in the SQLite database using the updated schema."""
-    
-    if not workouts:
-        print("No workouts to store in the database.")
-        return
-
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-
+            print(f"Error fetching {endpoint} from Hevy API: {e}")
+        finally:
+            put(None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is None:
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+def _store_workouts(writer, workouts):
+    """Stores a page of workouts. Does not commit. :return: (stored, latest updated_at or None)"""
+    stored = 0
+    latest = None
     for workout in workouts:
         if not isinstance(workout, dict):
             print(f"Skipping invalid workout data: {workout}")
             continue
+        stored += writer.store(workout)
+        updated_at = parse_hevy_timestamp(workout.get("updated_at"))
+        if updated_at and (latest is None or updated_at > latest):
+            latest = updated_at
+    return stored, latest
+
+def _format_hevy_timestamp(value):
+    return value.isoformat().replace("+00:00", "Z") if value else None
+
+def sync_hevy_workouts(full=False, concurrency=HEVY_FETCH_CONCURRENCY, database_name=None, client=None):
+    """
+    Brings the workouts tables up to date with Hevy.
+    With a stored watermark only the events since it are fetched and applied in place; otherwise
+    (or with full=True) the whole history is fetched.
+    Each page is committed as it arrives together with a checkpoint, so an interrupted sync resumes
+    after the last committed page. The watermark only advances once every page has been applied.
+    :param database_name: Optional. Database file to sync into instead of DATABASE_NAME.
+    :param client: Optional. HevyClient to fetch with; defaults to create_hevy_client(concurrency),
+        which is closed and has its request counters reported when the sync ends.
+    """
+    if client is None:
+        with create_hevy_client(concurrency) as client:
+            sync_hevy_workouts(full, concurrency, database_name, client)
+            client.transport.report()
+        return
+    try:
+        # Fail before touching the database when HEVY_API_KEY or HEVY_BASE_URL is missing
+        client.api_key
+        client.base_url
+    except ValueError as e:
+        print(e)
+        return
 
-        # Insert into common_data
-        common_data_id = None
-        try:
-            cursor.execute("""
-                INSERT INTO common_data (date, source)
-                VALUES (?, ?)
-            """, (workout.get("start_time"), "Hevy API"))
-            common_data_id = cursor.lastrowid
-        except sqlite3.IntegrityError:
-            print("Error inserting into common_data.")
-            continue
-
-        # Insert into workouts
-        hevy_workout_id = workout.get("id")
-        workout_name = workout.get("title")
-        workout_description = workout.get("description")
-        start_time = datetime.fromisoformat(workout.get("start_time")) if workout.get("start_time") else None
-        end_time = datetime.fromisoformat(workout.get("end_time")) if workout.get("end_time") else None
-        created_at = datetime.fromisoformat(workout.get("created_at").replace("Z", "+00:00")) if workout.get("created_at") else None
-        updated_at = datetime.fromisoformat(workout.get("updated_at").replace("Z", "+00:00")) if workout.get("updated_at") else None
-
-        #print(f"Inserting workout: {hevy_workout_id}, {workout_name}, {start_time}, {end_time}")
-
-        try:
-            cursor.execute("""
-                INSERT INTO workouts (common_data_id, hevy_workout_id, workout_name, workout_description, start_time, end_time, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (common_data_id, hevy_workout_id, workout_name, workout_description, start_time, end_time, created_at, updated_at))
-        except sqlite3.IntegrityError as e:
-            print(f"Error inserting workout {hevy_workout_id}: {e}")
-            continue
-        except sqlite3.OperationalError as e:
-            print(f"Operational error inserting workout {hevy_workout_id}: {e}")
-            continue
-
-        # Insert exercises and workout_exercises
-        for exercise_data in workout.get("exercises", []):
-            hevy_exercise_template_id = exercise_data.get("exercise_template_id")
-            exercise_name = exercise_data.get("title")
-            exercise_index = exercise_data.get("index")
-            exercise_notes = exercise_data.get("notes")
-            superset_id = exercise_data.get("superset_id")
-
-            # Insert into exercises
-            exercise_id = None
-            try:
-                cursor.execute("""
-                    INSERT OR IGNORE INTO exercises (hevy_exercise_template_id, exercise_name)
-                    VALUES (?, ?)
-                """, (hevy_exercise_template_id, exercise_name))
-                cursor.execute("SELECT exercise_id FROM exercises WHERE hevy_exercise_template_id = ?", (hevy_exercise_template_id,))
-                exercise_id = cursor.fetchone()[0]
-            except sqlite3.IntegrityError:
-                print(f"Error inserting exercise {exercise_name}.")
-                continue
-
-            # Insert into workout_exercises
-            try:
-                cursor.execute("""
-                    INSERT INTO workout_exercises (workout_id, exercise_id, exercise_index, exercise_notes, superset_id)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (hevy_workout_id, exercise_id, exercise_index, exercise_notes, superset_id))
-            except sqlite3.IntegrityError:
-                print(f"Error inserting workout_exercise for workout {hevy_workout_id}.")
-                continue
+    conn = connect(database_name or DATABASE_NAME)
+    cursor = conn.cursor()
+    writer = HevyWorkoutWriter(cursor)
+    write_seconds = 0.0
+    since = None if full else get_sync_state(cursor, HEVY_SYNC_STATE_KEY)
+    endpoint, items_key = ("workouts/events", "events") if since else ("workouts", "workouts")
+
+    # Only resume a checkpoint left by the same kind of sync against the same watermark
+    checkpoint = json.loads(get_sync_state(cursor, HEVY_SYNC_CHECKPOINT_KEY) or "{}")
+    if checkpoint.get("endpoint") != endpoint or checkpoint.get("since") != since:
+        checkpoint = {"endpoint": endpoint, "since": since, "page": 0, "latest": None}
+    elif checkpoint["page"]:
+        print(f"Resuming Hevy sync after page {checkpoint['page']}.")
+    latest = parse_hevy_timestamp(checkpoint["latest"])
+
+    updated = deleted = 0
+    complete = False
+    # The events feed changes without its parameters changing, so never serve it unrevalidated
+    for page, page_count, items in stream_pages(client, endpoint, items_key, checkpoint["page"] + 1, concurrency,
+                                                params={"since": since} if since else None,
+                                                max_age=0 if since else None):
+        started = time.perf_counter()
+        if since:
+            page_updated, page_deleted, page_latest = apply_workout_events(writer, items)
+            deleted += page_deleted
+        else:
+            page_updated, page_latest = _store_workouts(writer, items)
+        updated += page_updated
+        if page_latest and (latest is None or page_latest > latest):
+            latest = page_latest
+
+        checkpoint["page"] = page
+        checkpoint["latest"] = _format_hevy_timestamp(latest)
+        complete = page >= page_count
+        if complete:
+            clear_sync_state(cursor, HEVY_SYNC_CHECKPOINT_KEY)
+            if latest:
+                set_sync_state(cursor, HEVY_SYNC_STATE_KEY, _format_hevy_timestamp(latest))
+        else:
+            set_sync_state(cursor, HEVY_SYNC_CHECKPOINT_KEY, json.dumps(checkpoint))
+        writer.refresh_rollups()
+        conn.commit()
+        write_seconds += time.perf_counter() - started
 
-            # Insert sets
-            for set_data in exercise_data.get("sets", []):
-                set_index = set_data.get("index")
-                set_type = set_data.get("type")
-                weight_kg = set_data.get("weight_kg")
-                reps = set_data.get("reps")
-                duration_seconds = set_data.get("duration_seconds")
-                rpe = set_data.get("rpe")
-                custom_metric = set_data.get("custom_metric")
-
-                try:
-                    cursor.execute("""
-                        INSERT INTO sets (exercise_id, set_index, set_type, weight_kg, reps, duration_seconds, rpe, custom_metric)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (exercise_id, set_index, set_type, weight_kg, reps, duration_seconds, rpe, custom_metric))
-                except sqlite3.IntegrityError:
-                    print(f"Error inserting set for exercise {exercise_name}.")
-                    continue
-
-    conn.commit()
     conn.close()
-    print(f"Successfully stored {len(workouts)} workouts in {DATABASE_NAME}.")
-
-
-def main():
-    # Fetch all workouts from Hevy API
-    workouts = fetch_all_hevy_workouts()
-    if not workouts:
-        print("No workout data found.")
-        return
-
-    # Store the fetched workouts in SQLite database
-    store_workouts_in_sqlite(workouts)
-    print(f"Stored {len(workouts)} workouts in the database.")
+    report_ingest_stats("Hevy workout writes", writer.rows, write_seconds)
+    if since:
+        print(f"Applied {updated} updated and {deleted} deleted workouts since {since}.")
+    else:
+        print(f"Stored {updated} workouts from a full sync.")
+    if not complete:
+        print(f"Hevy sync stopped after page {checkpoint['page']}; the next sync resumes from there.")
+
+def main(incremental=False, database_name=None):
+    """
+    Fetches workouts from the Hevy API and stores them in the SQLite database.
+    :param incremental: Optional. Only apply the changes since the last sync instead of the whole history.
+    :param database_name: Optional. Database file to sync into instead of DATABASE_NAME.
+    """
+    sync_hevy_workouts(full=not incremental, database_name=database_name)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,33 @@
+import sys
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB, or None if the platform can't report it."""
+    # On Linux ru_maxrss starts out at the parent's peak in a child process, VmHWM is this process's own
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def report_ingest_stats(label, rows, elapsed_seconds):
+    """Prints rows/sec and peak RSS for a finished import."""
+    rate = rows / elapsed_seconds if elapsed_seconds > 0 else float("inf")
+    peak = peak_rss_mb()
+    peak_text = f"{peak:.1f} MB" if peak is not None else "unavailable"
+    print(f"{label}: {rows} rows in {elapsed_seconds:.2f}s ({rate:,.0f} rows/sec), peak RSS {peak_text}")
@@ -1,73 +1,174 @@
 import os
 import sys
-from sqlalchemy import create_engine, MetaData, NullPool, text
+from sqlalchemy import MetaData, NullPool, text
 import json
 import time
+from datetime import timedelta
 
 # Remove dynamic sys.path modification
 # Assume the script is run with the correct working directory or PYTHONPATH
 
 from utils.historical_hevy import main as populate_hevy_data
-from utils.historical_health import import_historical_data
+from utils.historical_health import import_historical_data, import_health_directory
 from utils.historical_diet import import_diet_cycles_from_csv, import_diet_weeks_from_csv
 from src.database.schema import metadata
+from src.database.connection import create_sqlite_engine, connect
+from src.database.migrations import migrate
 
 DATABASE_NAME = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/hevy_metal.db"))
 HEALTH_JSON_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/HealthAutoExport-2023-06-17-2025-04-26.json"))
 DIET_CYCLES_CSV_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/diet_cycles.csv"))
 DIET_WEEKS_CSV_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/diet_weeks.csv"))
 
-def initialize():
-    """Initialize the database by clearing the existing one."""
-    # Check if the database file exists
-    if os.path.exists(DATABASE_NAME):
-        print(f"Clearing existing database: {DATABASE_NAME}")
-        # Create an engine
-        engine = create_engine(f"sqlite:///{DATABASE_NAME}", poolclass=NullPool)
-        with engine.connect() as connection:
-            # Drop all tables
+# Window re-imported before each health high-water mark so late edits to recent days are picked up
+INCREMENTAL_OVERLAP = timedelta(days=2)
+
+# Shadow builds are written next to the live database, then copied into it by swap_in_shadow
+SHADOW_SUFFIX = ".shadow"
+# A shadow build is rejected if any table ends up with fewer rows than this share of the live one
+SHADOW_MIN_ROW_RATIO = 0.9
+# Bookkeeping tables whose row counts legitimately differ between a fresh build and the live database
+SHADOW_UNCHECKED_TABLES = {"sync_state", "schema_version", "import_watermarks", "import_manifest"}
+
+def initialize(reset=False, database_name=DATABASE_NAME):
+    """
+    Bring the database schema up to date in place by applying any pending migrations.
+    Existing data is kept, so the dashboard can keep reading while a refresh runs.
+    :param reset: Optional. Drop every table first and rebuild from scratch.
+    :param database_name: Optional. Database file to initialize instead of DATABASE_NAME.
+    """
+    engine = create_sqlite_engine(database_name, "bulk", poolclass=NullPool)
+    if reset and os.path.exists(database_name):
+        print(f"Clearing existing database: {database_name}")
+        with engine.begin() as connection:
             metadata.drop_all(bind=connection)
-            # Recreate all tables
-            metadata.create_all(bind=connection)
-        engine.dispose()  # Dispose of the engine after clearing
-        print("Database cleared and schema recreated.")
-    else:
-        print(f"Database file does not exist. Creating a new database: {DATABASE_NAME}")
-        # Create an engine
-        engine = create_engine(f"sqlite:///{DATABASE_NAME}", poolclass=NullPool)
-        with engine.connect() as connection:
-            # Create all tables based on the schema
-            metadata.create_all(bind=connection)
-        engine.dispose()  # Dispose of the engine after creation
-        print("Database schema creation complete.")
-
-def refresh_database():
+    elif not os.path.exists(database_name):
+        print(f"Database file does not exist. Creating a new database: {database_name}")
+    version = migrate(engine)
+    engine.dispose()
+    print(f"Database schema is at version {version}.")
+
+def refresh_database(incremental=False, overlap=INCREMENTAL_OVERLAP, health_dir=None, database_name=DATABASE_NAME):
+    """
+    Populate the database from the Hevy API, the health export and the diet CSVs.
+    :param incremental: Optional. Only import Hevy changes and health entries newer than the stored high-water marks.
+    :param overlap: Optional. How far before each mark to re-import in incremental mode.
+    :param health_dir: Optional. Ingest every new export in this directory instead of HEALTH_JSON_FILE.
+    :param database_name: Optional. Database file to populate instead of DATABASE_NAME.
+    """
     print("Populating database with Hevy workout data...")
-    populate_hevy_data()
+    populate_hevy_data(incremental=incremental, database_name=database_name)
 
     # Step 5: Populate the database with historical health data
-    if os.path.exists(HEALTH_JSON_FILE):
+    if health_dir:
+        print(f"Populating database with health exports from {health_dir}...")
+        import_health_directory(health_dir, database_name=database_name)
+    elif os.path.exists(HEALTH_JSON_FILE):
         print("Populating database with historical health data...")
-        import_historical_data(HEALTH_JSON_FILE)
+        import_historical_data(HEALTH_JSON_FILE, incremental=incremental, overlap=overlap, database_name=database_name)
     else:
         print(f"Health JSON file not found: {HEALTH_JSON_FILE}. Skipping health data import.")
 
     # Step 6: Populate the database with diet cycle data
     if os.path.exists(DIET_CYCLES_CSV_FILE):
         print("Populating database with diet cycle data...")
-        import_diet_cycles_from_csv(DIET_CYCLES_CSV_FILE)
+        import_diet_cycles_from_csv(DIET_CYCLES_CSV_FILE, database_name=database_name)
     else:
         print(f"Diet cycles CSV file not found: {DIET_CYCLES_CSV_FILE}. Skipping diet cycle data import.")
 
     # Step 7: Populate the diet_weeks table
     if os.path.exists(DIET_WEEKS_CSV_FILE):
         print("Populating database with diet cycle data...")
-        import_diet_weeks_from_csv(DIET_WEEKS_CSV_FILE)
+        import_diet_weeks_from_csv(DIET_WEEKS_CSV_FILE, database_name=database_name)
     else:
         print(f"Diet weeks CSV file not found: {DIET_WEEKS_CSV_FILE}. Skipping diet weeks data import.")
 
     print("Database refresh complete.")
 
+def _remove_database_files(database_name):
+    for path in (database_name, f"{database_name}-wal", f"{database_name}-shm", f"{database_name}-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def table_row_counts(database_name):
+    """Returns table name -> row count for every schema.py table that holds data rather than bookkeeping."""
+    conn = connect(database_name, "read")
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    counts = {
+        table.name: conn.execute(f"SELECT COUNT(*) FROM {table.name}").fetchone()[0]
+        for table in metadata.sorted_tables
+        if table.name in existing and table.name not in SHADOW_UNCHECKED_TABLES
+    }
+    conn.close()
+    return counts
+
+def verify_shadow(shadow_name, database_name=DATABASE_NAME, min_row_ratio=SHADOW_MIN_ROW_RATIO):
+    """
+    Checks a shadow build before it replaces the live database: SQLite's integrity check must pass,
+    and no table may shrink below min_row_ratio of its live row count.
+    :return: A list of problems, empty if the shadow may be swapped in.
+    """
+    conn = connect(shadow_name, "read")
+    integrity = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    conn.close()
+    problems = [] if integrity == ["ok"] else [f"integrity check: {message}" for message in integrity]
+
+    shadow_counts = table_row_counts(shadow_name)
+    live_counts = table_row_counts(database_name) if os.path.exists(database_name) else {}
+    for table, live_count in live_counts.items():
+        shadow_count = shadow_counts.get(table, 0)
+        if shadow_count < live_count * min_row_ratio:
+            problems.append(f"{table}: {shadow_count} rows, the live database has {live_count}")
+    return problems
+
+def swap_in_shadow(shadow_name, database_name=DATABASE_NAME):
+    """
+    Replaces the live database's contents with a finished shadow build, then deletes the shadow.
+    The pages are copied with SQLite's online backup API as one write transaction on the live file,
+    so connections the dashboard already has open stay valid: a read that started before the copy
+    finishes on the old data and the next one sees the new data. Renaming the shadow over the live
+    file instead would leave those connections on the old file while sharing the new -wal and -shm.
+    """
+    shadow = connect(shadow_name, "read")
+    live = connect(database_name)
+    try:
+        shadow.backup(live)
+        # Fold what it can of the copy into the main file without waiting on readers still on the old data;
+        # automatic checkpoints finish the rest once they move on
+        live.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    finally:
+        live.close()
+        shadow.close()
+    _remove_database_files(shadow_name)
+
+def shadow_refresh(health_dir=None, database_name=DATABASE_NAME, min_row_ratio=SHADOW_MIN_ROW_RATIO):
+    """
+    Rebuilds the database from scratch into a shadow file next to it, verifies it and swaps it in.
+    The live database is never modified until the swap, so the dashboard keeps serving the previous
+    data for the whole import. A shadow that fails verification is left in place for inspection.
+    :param health_dir: Optional. Ingest every export in this directory instead of HEALTH_JSON_FILE.
+    :param min_row_ratio: Optional. Share of each table's live row count the shadow must reach.
+    :return: True if the shadow build was swapped in.
+    """
+    shadow_name = database_name + SHADOW_SUFFIX
+    _remove_database_files(shadow_name)
+    started = time.perf_counter()
+
+    print(f"Building shadow database: {shadow_name}")
+    initialize(database_name=shadow_name)
+    refresh_database(health_dir=health_dir, database_name=shadow_name)
+
+    problems = verify_shadow(shadow_name, database_name, min_row_ratio)
+    if problems:
+        print(f"Shadow database failed verification and was not swapped in ({shadow_name}):")
+        for problem in problems:
+            print(f"  {problem}")
+        return False
+
+    swap_in_shadow(shadow_name, database_name)
+    print(f"Swapped the shadow build into {database_name} after {time.perf_counter() - started:.1f}s.")
+    return True
+
 if __name__ == "__main__":
     # Initialize the database
     initialize()
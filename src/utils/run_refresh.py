@@ -1,13 +1,37 @@
 import os
 import sys
+import argparse
 
 # Add the src directory to sys.path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-from utils.refresh_database import initialize, refresh_database
+from utils.refresh_database import initialize, refresh_database, shadow_refresh
+from src.database.analytics import sync_parquet_mirror
 
 if __name__ == "__main__":
-    initialize()
-    refresh_database()
+    parser = argparse.ArgumentParser(description="Refresh the Hevy Metal database in place, fully or incrementally.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only import Hevy changes and health entries newer than the last run.")
+    parser.add_argument("--health-dir",
+                        help="Ingest every new HealthAutoExport file in this directory, skipping ones already ingested.")
+    parser.add_argument("--reset", action="store_true",
+                        help="Drop every table and rebuild from scratch instead of migrating the existing database.")
+    parser.add_argument("--shadow", action="store_true",
+                        help="Rebuild from scratch into a separate file and swap it in once it passes checks, "
+                             "so the dashboard keeps serving the old data meanwhile.")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Afterwards rewrite the Parquet mirror read by the DuckDB analytics backend "
+                             "(HEVY_ANALYTICS=parquet). Requires duckdb.")
+    args = parser.parse_args()
+
+    if args.shadow:
+        if not shadow_refresh(health_dir=args.health_dir):
+            sys.exit(1)
+    else:
+        initialize(reset=args.reset)
+        refresh_database(incremental=args.incremental, health_dir=args.health_dir)
+    if args.parquet:
+        rows = sync_parquet_mirror()
+        print(f"Wrote the Parquet mirror: {sum(rows.values())} rows in {len(rows)} tables.")
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import pandas as pd
+
+# Timestamp format used throughout HealthAutoExport files, e.g. "2023-06-17 00:00:00 -0400"
+EXPORT_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+
+# Daily metrics share the same midnight timestamps, so a modest cache covers years of history
+TIMESTAMP_CACHE_SIZE = 1 << 16
+
+_offsets = {}
+
+
+def _fixed_offset(minutes):
+    tz = _offsets.get(minutes)
+    if tz is None:
+        tz = _offsets[minutes] = timezone(timedelta(minutes=minutes))
+    return tz
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_export_timestamp(value):
+    """
+    Parses an export timestamp into an aware datetime. Equivalent to
+    datetime.strptime(value, EXPORT_TIMESTAMP_FORMAT), but slices the fixed-width fields directly
+    and memoizes repeated strings. Anything off the fast path falls back to strptime.
+    """
+    if (isinstance(value, str) and len(value) == 25 and value[4] == "-" and value[7] == "-"
+            and value[10] == " " and value[13] == ":" and value[16] == ":" and value[19] == " "
+            and value[20] in "+-"):
+        try:
+            offset = int(value[21:23]) * 60 + int(value[23:25])
+            return datetime(
+                int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]),
+                tzinfo=_fixed_offset(-offset if value[20] == "-" else offset),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(value, EXPORT_TIMESTAMP_FORMAT)
+
+
+def local_day_key(timestamp):
+    """Returns the integer YYYYMMDD key of the timestamp's own (local) calendar day."""
+    return timestamp.year * 10000 + timestamp.month * 100 + timestamp.day
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def normalize_export_timestamp(value):
+    """
+    Returns (canonical UTC datetime, local day key) for an export timestamp string.
+    """
+    timestamp = parse_export_timestamp(value)
+    return timestamp.astimezone(timezone.utc), local_day_key(timestamp)
+
+
+def normalize_export_timestamps(values):
+    """
+    Vectorized normalize_export_timestamp for a whole column.
+    :param values: Iterable or pandas Series of export timestamp strings.
+    :return: DataFrame with a tz-aware UTC 'utc' column and an integer 'day_key' column.
+    """
+    values = pd.Series(values, dtype="object")
+    utc = pd.to_datetime(values, format=EXPORT_TIMESTAMP_FORMAT, utc=True)
+    # The local calendar day is literally the first ten characters of the string
+    day_key = pd.to_numeric(values.str.slice(0, 10).str.replace("-", "", regex=False))
+    return pd.DataFrame({"utc": utc, "day_key": day_key}, index=values.index)
+
+
+def utc_epoch_and_day_key(value):
+    """
+    Returns (UTC epoch seconds, local YYYYMMDD day key) for the canonical common_data columns.
+    Aware datetimes keep the calendar day of their own offset. Naive datetimes and dates carry no
+    offset and are taken as this machine's local time.
+    :param value: A datetime, a date, or a stored common_data.date string in ISO or export format.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            value = parse_export_timestamp(value)
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return int(value.timestamp()), local_day_key(value)
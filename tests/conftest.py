@@ -0,0 +1,35 @@
+import os
+import sys
+import json
+import pytest
+
+# Same layout the scripts run with: src.* imports from the project root, utils.* / database.* from src
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (project_root, os.path.join(project_root, "src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from sqlalchemy import NullPool
+from src.database.connection import create_sqlite_engine
+from src.database.migrations import migrate
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# Four days of every metric from the bundled export, including a night that crosses midnight
+HEALTH_EXPORT_FIXTURE = os.path.join(FIXTURES_DIR, "health_export_small.json")
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Path of an empty database migrated to the current schema."""
+    database_path = str(tmp_path / "test.db")
+    engine = create_sqlite_engine(database_path, "bulk", poolclass=NullPool)
+    migrate(engine)
+    engine.dispose()
+    return database_path
+
+
+@pytest.fixture
+def health_export():
+    """The fixture export's "data" object."""
+    with open(HEALTH_EXPORT_FIXTURE, "r") as file:
+        return json.load(file)["data"]
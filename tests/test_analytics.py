@@ -0,0 +1,57 @@
+import os
+import time
+import pytest
+from src.database.analytics import ANALYTICS_TABLES, parquet_mirror_is_current, run_analytics_query, sync_parquet_mirror
+from src.database.connection import connect
+
+COUNT_SQL = {dialect: "SELECT COUNT(*) AS rows FROM common_data" for dialect in ("sqlite", "duckdb")}
+
+
+def add_common_data(database_name, day):
+    conn = connect(database_name)
+    conn.execute("INSERT INTO common_data (date, source, day_key) VALUES (?, 'test', ?)",
+                 (f"2024-06-{day:02d} 00:00:00", 20240600 + day))
+    conn.commit()
+    conn.close()
+
+
+def count_rows(database, parquet_dir, backend):
+    return run_analytics_query(COUNT_SQL, backend=backend, database_name=database, parquet_dir=str(parquet_dir))["rows"][0]
+
+
+def test_mirror_is_current_only_when_newer_than_every_write(database, tmp_path):
+    parquet_dir = tmp_path / "parquet"
+    parquet_dir.mkdir()
+    assert not parquet_mirror_is_current(database, str(parquet_dir))
+
+    paths = [parquet_dir / f"{table}.parquet" for table in ANALYTICS_TABLES]
+    for path in paths:
+        path.touch()
+        os.utime(path, (time.time() - 60, time.time() - 60))
+    add_common_data(database, 1)
+    assert not parquet_mirror_is_current(database, str(parquet_dir))
+
+    for path in paths:
+        os.utime(path, (time.time() + 60, time.time() + 60))
+    assert parquet_mirror_is_current(database, str(parquet_dir))
+
+    paths[0].unlink()
+    assert not parquet_mirror_is_current(database, str(parquet_dir))
+
+
+def test_missing_mirror_falls_back_to_sqlite(database, tmp_path):
+    pytest.importorskip("duckdb")
+    add_common_data(database, 1)
+    assert count_rows(database, tmp_path / "parquet", "parquet") == 1
+
+
+def test_stale_mirror_falls_back_to_sqlite(database, tmp_path):
+    pytest.importorskip("duckdb")
+    parquet_dir = tmp_path / "parquet"
+    add_common_data(database, 1)
+    sync_parquet_mirror(database, str(parquet_dir))
+    assert parquet_mirror_is_current(database, str(parquet_dir))
+    assert count_rows(database, parquet_dir, "parquet") == 1
+
+    add_common_data(database, 2)
+    assert count_rows(database, parquet_dir, "parquet") == 2
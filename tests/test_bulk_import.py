@@ -0,0 +1,75 @@
+import os
+import json
+from src.database.bulk_writer import HealthBulkWriter
+from src.database.connection import connect
+from src.utils.historical_health import import_daily_data
+
+# Rows the original row-by-row SQL import wrote for health_export_small.json, before the bulk writer and pivot stage
+EXPECTED_ROWS_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "health_export_small_expected.json")
+
+NUTRITION_SELECT = """
+    SELECT common_data.date, common_data.source, calories, protein_g, carbohydrates_g, fat_g, water_floz,
+           caffeine_mg, potassium_mg, fiber_g, sodium_mg, sugar_g
+    FROM nutrition_data JOIN common_data ON nutrition_data.common_data_id = common_data.common_data_id
+    ORDER BY common_data.date, common_data.source
+"""
+
+MARKERS_SELECT = """
+    SELECT common_data.date, common_data.source, time_in_daylight_min, vo2_max, heart_rate_min, heart_rate_max,
+           heart_rate_avg, heart_rate_variability, resting_heart_rate, respiratory_rate, blood_oxygen_saturation,
+           body_mass_index, body_weight_lbs
+    FROM health_markers JOIN common_data ON health_markers.common_data_id = common_data.common_data_id
+    ORDER BY common_data.date, common_data.source
+"""
+
+
+def table_rows(database_path):
+    conn = connect(database_path, "read")
+    rows = {
+        "nutrition_data": conn.execute(NUTRITION_SELECT).fetchall(),
+        "health_markers": conn.execute(MARKERS_SELECT).fetchall(),
+        "common_data": conn.execute("SELECT date, source FROM common_data ORDER BY 1, 2").fetchall(),
+        "sleep_data": conn.execute(
+            "SELECT start_time, end_time, sleep_duration_hours FROM sleep_data ORDER BY 1").fetchall(),
+        "data": conn.execute("SELECT metric_id, qty FROM data ORDER BY data_id").fetchall(),
+    }
+    conn.close()
+    return rows
+
+
+def test_import_matches_row_by_row_rows(database, health_export):
+    conn = connect(database)
+    import_daily_data(health_export, conn)
+    conn.close()
+
+    with open(EXPECTED_ROWS_FIXTURE, "r") as file:
+        expected = {table: [tuple(row) for row in rows] for table, rows in json.load(file).items()}
+    imported = table_rows(database)
+    assert expected["nutrition_data"], "fixture should produce nutrition rows"
+    assert expected["health_markers"], "fixture should produce marker rows"
+    for table in expected:
+        assert len(imported[table]) == len(expected[table]), table
+        assert imported[table] == expected[table], table
+
+
+def test_pivot_writes_each_row_once(database, health_export, monkeypatch):
+    calls = {"nutrition": [], "markers": []}
+    upsert_nutrition, upsert_markers = HealthBulkWriter.upsert_nutrition, HealthBulkWriter.upsert_markers
+
+    def count_nutrition(self, common_data_id, values):
+        calls["nutrition"].append(common_data_id)
+        return upsert_nutrition(self, common_data_id, values)
+
+    def count_markers(self, common_data_id, values):
+        calls["markers"].append(common_data_id)
+        return upsert_markers(self, common_data_id, values)
+
+    monkeypatch.setattr(HealthBulkWriter, "upsert_nutrition", count_nutrition)
+    monkeypatch.setattr(HealthBulkWriter, "upsert_markers", count_markers)
+    conn = connect(database)
+    import_daily_data(health_export, conn)
+    conn.close()
+
+    rows = table_rows(database)
+    assert len(calls["nutrition"]) == len(set(calls["nutrition"])) == len(rows["nutrition_data"])
+    assert len(calls["markers"]) == len(set(calls["markers"])) == len(rows["health_markers"])
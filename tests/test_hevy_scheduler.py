@@ -0,0 +1,44 @@
+import pytest
+import requests
+from utils.hevy_scheduler import HEVY_REQUEST_TIMEOUT, HevyRequestScheduler
+
+URL = "https://api.example.test/v1/workouts"
+
+
+class TimingOutSession:
+    """Session stub whose first `timeouts` requests time out; later ones get an empty 200."""
+
+    def __init__(self, timeouts):
+        self.timeouts = timeouts
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(kwargs)
+        if len(self.calls) <= self.timeouts:
+            raise requests.exceptions.Timeout(f"{url} timed out")
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    def close(self):
+        pass
+
+
+def test_timed_out_requests_are_retried_with_the_default_timeout():
+    session = TimingOutSession(timeouts=2)
+    scheduler = HevyRequestScheduler(session, backoff_base=0)
+    assert scheduler.get(URL, endpoint="workouts").status_code == 200
+
+    assert [call["timeout"] for call in session.calls] == [HEVY_REQUEST_TIMEOUT] * 3
+    assert scheduler._stats["workouts"]["retries"] == 2
+    assert scheduler._stats["workouts"]["failures"] == 0
+
+
+def test_timeouts_past_the_retry_limit_are_raised():
+    session = TimingOutSession(timeouts=3)
+    scheduler = HevyRequestScheduler(session, backoff_base=0, max_retries=2, timeout=1.5)
+    with pytest.raises(requests.exceptions.Timeout):
+        scheduler.get(URL, endpoint="workouts")
+
+    assert [call["timeout"] for call in session.calls] == [1.5] * 3
+    assert scheduler._stats["workouts"]["failures"] == 1
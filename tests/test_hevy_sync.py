@@ -0,0 +1,138 @@
+import time
+import json
+import pytest
+import requests
+from urllib.parse import urlparse
+from src.database.connection import connect
+from utils.fake_hevy_server import FAKE_HEVY_MAX_PAGE_SIZE, FakeHevyServer
+from utils.hevy_api import HevyClient
+from utils.hevy_cache import HevyResponseCache
+from utils.hevy_scheduler import HevyRequestScheduler
+import utils.historical_hevy as historical_hevy
+
+WORKOUTS = 25
+EXERCISES = 3
+SETS = 2
+# Pages of HEVY_PAGE_SIZE workouts a full sync of WORKOUTS has to fetch
+FULL_SYNC_PAGES = -(-WORKOUTS // historical_hevy.HEVY_PAGE_SIZE)
+# Seconds the slow server takes per response, plus up to as much again at random
+LATENCY = 0.2
+
+
+def client_for(server, tmp_path):
+    """A HevyClient for `server`, with a response cache that revalidates every request."""
+    # ttl=0 makes every cached page stale, so each request is sent with If-None-Match
+    cache = HevyResponseCache(str(tmp_path / "hevy_cache.db"), ttl=0)
+    return HevyClient("test", server.base_url, HevyRequestScheduler(cache=cache), validate=False)
+
+
+@pytest.fixture
+def hevy_server(database):
+    """A fake Hevy API."""
+    with FakeHevyServer(WORKOUTS, EXERCISES, SETS) as server:
+        yield server
+
+
+@pytest.fixture
+def hevy_client(hevy_server, tmp_path):
+    with client_for(hevy_server, tmp_path) as client:
+        yield client
+
+
+def sync(server, client, database, full):
+    """Runs one sync and returns the requests it sent."""
+    requests_before = server.requests
+    historical_hevy.sync_hevy_workouts(full=full, database_name=database, client=client)
+    return server.requests - requests_before
+
+
+def row_counts(database):
+    conn = connect(database, "read")
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("workouts", "workout_exercises", "sets")}
+    finally:
+        conn.close()
+
+
+def test_full_sync_stores_every_workout(hevy_server, hevy_client, database):
+    assert sync(hevy_server, hevy_client, database, full=True) == FULL_SYNC_PAGES
+    assert hevy_server.not_modified == 0
+    assert row_counts(database) == {
+        "workouts": WORKOUTS, "workout_exercises": WORKOUTS * EXERCISES, "sets": WORKOUTS * EXERCISES * SETS}
+
+
+def test_unchanged_pages_are_revalidated_with_etags(hevy_server, hevy_client, database):
+    sync(hevy_server, hevy_client, database, full=True)
+    expected = row_counts(database)
+
+    # Every page is still cached, so the second sync gets nothing but 304s and stores the same rows
+    assert sync(hevy_server, hevy_client, database, full=True) == FULL_SYNC_PAGES
+    assert hevy_server.not_modified == FULL_SYNC_PAGES
+    assert row_counts(database) == expected
+
+
+def test_incremental_sync_applies_events(hevy_server, hevy_client, database):
+    sync(hevy_server, hevy_client, database, full=True)
+    hevy_server.mutate(updates=3, deletes=1, inserts=2)
+
+    # Six events fit on one page of the events feed
+    assert sync(hevy_server, hevy_client, database, full=False) == 1
+    assert hevy_server.not_modified == 0
+    workouts = WORKOUTS - 1 + 2
+    assert row_counts(database) == {
+        "workouts": workouts, "workout_exercises": workouts * EXERCISES, "sets": workouts * EXERCISES * SETS}
+
+    # Nothing changed since, so the next incremental sync only asks for the (empty) events page
+    assert sync(hevy_server, hevy_client, database, full=False) == 1
+    assert row_counts(database)["workouts"] == workouts
+
+
+def test_page_size_is_the_api_maximum(hevy_server):
+    assert historical_hevy.HEVY_PAGE_SIZE == FAKE_HEVY_MAX_PAGE_SIZE
+    response = requests.get(f"{hevy_server.base_url}/workouts", headers={"api-key": "test"},
+                            params={"page": 1, "pageSize": historical_hevy.HEVY_PAGE_SIZE + 1})
+    assert response.status_code == 400
+
+
+def test_slow_pages_are_fetched_concurrently_and_yielded_in_order(tmp_path):
+    workouts = 12 * historical_hevy.HEVY_PAGE_SIZE
+    with FakeHevyServer(workouts, 1, 1, latency=LATENCY, jitter=LATENCY) as server, \
+            client_for(server, tmp_path) as client:
+        started = time.perf_counter()
+        pages = list(historical_hevy.stream_pages(client, "workouts", "workouts", concurrency=4))
+        elapsed = time.perf_counter() - started
+
+    # Jitter makes later pages finish first, but they still come out in page order and newest first
+    assert [page for page, _, _ in pages] == list(range(1, 13))
+    ids = [workout["id"] for _, _, items in pages for workout in items]
+    assert ids == sorted(ids, reverse=True) and len(ids) == workouts
+    # Fetched one at a time, the 12 pages would take at least 12 * LATENCY
+    assert server.max_in_flight > 1
+    assert elapsed < 12 * LATENCY
+
+
+class RecordingTransport:
+    """In-memory transport serving one page of two workouts, recording every request it is sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.sent.append((urlparse(url).path, params, headers))
+        workouts = [{"id": f"memory-{day}", "title": f"Workout {day}", "start_time": f"2024-06-0{day}T07:00:00+00:00",
+                     "updated_at": f"2024-06-0{day}T08:00:00.000Z", "exercises": []} for day in (1, 2)]
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"page": 1, "page_count": 1, "workouts": workouts}).encode()
+        return response
+
+
+def test_sync_fetches_through_the_injected_client(database):
+    transport = RecordingTransport()
+    client = HevyClient("injected-key", "https://hevy.test/v1", transport, validate=False)
+    historical_hevy.sync_hevy_workouts(full=True, database_name=database, client=client)
+
+    assert transport.sent == [("/v1/workouts", {"page": 1, "pageSize": historical_hevy.HEVY_PAGE_SIZE},
+                               {"api-key": "injected-key"})]
+    assert row_counts(database)["workouts"] == 2
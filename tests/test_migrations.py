@@ -0,0 +1,36 @@
+from sqlalchemy import NullPool
+from src.database.connection import connect, create_sqlite_engine
+from src.database.migrations import LEGACY_BACKUP_SUFFIX, MIGRATIONS, migrate
+from src.database.schema import metadata
+
+
+def test_rekeying_sets_keeps_a_copy_of_the_old_rows(tmp_path):
+    database_path = str(tmp_path / "legacy.db")
+    engine = create_sqlite_engine(database_path, "bulk", poolclass=NullPool)
+    # A database from before workout_exercise_id: workout_exercises keyed by the Hevy workout id
+    metadata.create_all(engine, tables=[table for table in metadata.sorted_tables
+                                        if table.name not in ("workout_exercises", "sets")])
+    conn = connect(database_path)
+    conn.executescript("""
+        CREATE TABLE workout_exercises (id INTEGER PRIMARY KEY, workout_id TEXT, exercise_id INTEGER);
+        CREATE TABLE sets (id INTEGER PRIMARY KEY, workout_id TEXT, exercise_id INTEGER, weight_kg REAL, reps INTEGER);
+        INSERT INTO workout_exercises (workout_id, exercise_id) VALUES ('hevy-1', 1), ('hevy-1', 2);
+        INSERT INTO sets (workout_id, exercise_id, weight_kg, reps) VALUES ('hevy-1', 1, 100.0, 5);
+        INSERT INTO sync_state (name, value) VALUES ('hevy_workouts_updated_at', '2024-06-01T00:00:00Z');
+    """)
+    conn.commit()
+    conn.close()
+
+    assert migrate(engine) == MIGRATIONS[-1][0]
+    engine.dispose()
+
+    conn = connect(database_path, "read")
+    try:
+        backup = conn.execute(f"SELECT workout_id, exercise_id FROM workout_exercises{LEGACY_BACKUP_SUFFIX}").fetchall()
+        assert backup == [("hevy-1", 1), ("hevy-1", 2)]
+        assert conn.execute(f"SELECT weight_kg, reps FROM sets{LEGACY_BACKUP_SUFFIX}").fetchall() == [(100.0, 5)]
+        assert conn.execute("SELECT COUNT(*) FROM workout_exercises").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM sets").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM sync_state WHERE name LIKE 'hevy_workouts_%'").fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,101 @@
+import datetime
+import pytest
+from sqlalchemy import NullPool, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import Select
+from src.database import analytics
+from src.database.connection import connect, create_sqlite_engine
+from src.database.queries import health_markers_queries, hevy_sql_queries, nutrition_queries, sleep_queries
+
+START = datetime.date(2024, 1, 1)
+END = datetime.date(2024, 2, 1)
+
+# (query function, arguments, indexes its plan has to use) for the queries run on every dashboard render
+HOT_QUERIES = [
+    (hevy_sql_queries.query_get_all_workouts, (START, END),
+     {"ix_common_data_day_key", "ix_workouts_common_data_id"}),
+    (hevy_sql_queries.query_get_exercises_in_workout, (1,),
+     {"ix_workout_exercises_workout_id_exercise_index"}),
+    (hevy_sql_queries.query_get_sets_for_exercise_in_workout, (1, "Squat"),
+     {"ix_workout_exercises_workout_id_exercise_index", "ix_sets_workout_exercise_id_set_index"}),
+    (hevy_sql_queries.query_get_workout_detail, (1,),
+     {"ix_workout_exercises_workout_id_exercise_index", "ix_sets_workout_exercise_id_set_index"}),
+    (hevy_sql_queries.query_get_daily_training, (START, END), set()),
+    (hevy_sql_queries.query_get_all_unique_exercise_names, (START, END),
+     {"ix_common_data_day_key", "ix_workouts_common_data_id", "ix_workout_exercises_workout_id_exercise_index"}),
+    (hevy_sql_queries.query_get_exercise_counts, (START, END),
+     {"ix_common_data_day_key", "ix_workouts_common_data_id", "ix_workout_exercises_workout_id_exercise_index"}),
+    (sleep_queries.query_get_sleep_data, (START, END), {"ix_common_data_day_key", "ix_sleep_data_common_data_id"}),
+    (sleep_queries.query_get_daily_sleep, (START, END), set()),
+    (nutrition_queries.query_get_nutrition_data, (START, END),
+     {"ix_common_data_day_key", "ix_nutrition_data_common_data_id"}),
+    (nutrition_queries.query_get_daily_nutrition, (START, END), set()),
+    (health_markers_queries.query_get_health_markers, (START, END),
+     {"ix_common_data_day_key", "ix_health_markers_common_data_id"}),
+    (health_markers_queries.query_get_aggregated_health_markers, (START, END), set()),
+    (health_markers_queries.query_get_body_weight_over_time, (START, END),
+     {"ix_common_data_day_key", "ix_health_markers_common_data_id"}),
+]
+
+
+@pytest.fixture
+def read_engine(database, monkeypatch):
+    """Engine on the test database that the query modules run on."""
+    engine = create_sqlite_engine(database, "read", poolclass=NullPool)
+    for module in (hevy_sql_queries, sleep_queries, nutrition_queries, health_markers_queries):
+        monkeypatch.setattr(module, "SessionLocal", sessionmaker(bind=engine))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def analytics_statements(database, monkeypatch):
+    """SQL run on the SQLite analytics backend, which opens its own sqlite3 connections, on the test database."""
+    statements = []
+
+    def traced_connect(database_name, profile="bulk"):
+        conn = connect(database, profile)
+        # sqlite3 traces statements with their parameters already bound in
+        conn.set_trace_callback(lambda statement: statements.append((statement, ())))
+        return conn
+
+    monkeypatch.setattr(analytics, "connect", traced_connect)
+    monkeypatch.setattr(analytics, "ANALYTICS_BACKEND", "sqlite")
+    return statements
+
+
+def executed_statements(engine, analytics_statements, query_function, args):
+    """Runs a query function and returns the (SQL, parameters) it sent to SQLite."""
+    statements = analytics_statements
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        result = query_function(*args)
+        # Some functions hand back the statement for the caller to run
+        if isinstance(result, Select):
+            with engine.connect() as conn:
+                conn.execute(result).fetchall()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements
+
+
+@pytest.mark.parametrize("query_function, args, indexes", HOT_QUERIES, ids=[query[0].__name__ for query in HOT_QUERIES])
+def test_hot_queries_use_indexes(read_engine, analytics_statements, database, query_function, args, indexes):
+    statements = executed_statements(read_engine, analytics_statements, query_function, args)
+    assert statements
+
+    conn = connect(database, "read")
+    try:
+        plan = [detail for statement, parameters in statements
+                for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    finally:
+        conn.close()
+
+    # Scans of a covering index are full scans too, since they still read the whole index
+    assert not [detail for detail in plan if detail.startswith("SCAN ")], plan
+    used = {index for index in indexes if any(f" INDEX {index} " in detail for detail in plan)}
+    assert used == indexes, plan
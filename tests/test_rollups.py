@@ -0,0 +1,47 @@
+import pytest
+from src.database.connection import connect
+from src.database.rollups import DAY_WHERE, ROLLUP_DAY_WHERE, ROLLUP_QUERIES, rebuild_daily_rollups
+from src.utils.historical_health import import_daily_data
+
+DAILY_SLEEP_SELECT = "SELECT day_key, sessions, in_bed_duration_hours FROM daily_sleep ORDER BY day_key"
+
+
+@pytest.fixture
+def imported(database, health_export):
+    """Connection to a database holding the fixture export."""
+    conn = connect(database)
+    import_daily_data(health_export, conn)
+    yield conn
+    conn.close()
+
+
+def test_daily_sleep_counts_each_night_on_its_wake_day(imported):
+    # The night of 2024-06-03 22:24 to 2024-06-04 05:47 starts on the same day as the night that ended
+    # that morning, and has to land on 2024-06-04 instead of doubling up 2024-06-03
+    assert imported.execute(DAILY_SLEEP_SELECT).fetchall() == [
+        (20240601, 1, pytest.approx(7.466666666666666)),
+        (20240602, 1, pytest.approx(7.558333333333333)),
+        (20240603, 1, pytest.approx(7.491666666666666)),
+        (20240604, 1, pytest.approx(7.175000000000001)),
+    ]
+
+
+def test_refreshed_rollups_match_a_rebuild(imported):
+    tables = {table: imported.execute(f"SELECT * FROM {table} ORDER BY day_key").fetchall() for table in ROLLUP_QUERIES}
+    rebuild_daily_rollups(imported.cursor())
+    for table, rows in tables.items():
+        assert imported.execute(f"SELECT * FROM {table} ORDER BY day_key").fetchall() == rows, table
+
+
+@pytest.mark.parametrize("table, index", [
+    ("daily_health", "ix_common_data_day_key"),
+    ("daily_nutrition", "ix_common_data_day_key"),
+    ("daily_sleep", "ix_sleep_data_wake_day_key"),
+])
+def test_day_refresh_searches_an_index(imported, table, index):
+    where = ROLLUP_DAY_WHERE.get(table, DAY_WHERE)
+    plan = [row[3] for row in imported.execute(
+        f"EXPLAIN QUERY PLAN {ROLLUP_QUERIES[table].format(where=where)}", (20240604,))]
+    # The outer GROUP BY reads the per-source subquery, which is fine; no source table may be scanned
+    assert not [detail for detail in plan if detail.startswith("SCAN ") and not detail.startswith("SCAN (")], plan
+    assert any(f" INDEX {index} " in detail for detail in plan), plan
@@ -0,0 +1,53 @@
+import os
+from sqlalchemy import NullPool, text
+from sqlalchemy.orm import sessionmaker
+from src.database.connection import connect, create_sqlite_engine
+from src.database.migrations import migrate
+from src.utils.refresh_database import SHADOW_SUFFIX, swap_in_shadow
+
+
+def add_common_data(database_name, days):
+    conn = connect(database_name)
+    conn.executemany("INSERT INTO common_data (date, source, day_key) VALUES (?, 'test', ?)",
+                     [(f"2024-06-{day:02d} 00:00:00", 20240600 + day) for day in days])
+    conn.commit()
+    conn.close()
+
+
+def count_common_data(conn):
+    return conn.execute("SELECT COUNT(*) FROM common_data").fetchone()[0]
+
+
+def test_swap_keeps_open_readers_consistent(database):
+    add_common_data(database, range(1, 4))
+    shadow_name = database + SHADOW_SUFFIX
+    engine = create_sqlite_engine(shadow_name, "bulk", poolclass=NullPool)
+    migrate(engine)
+    engine.dispose()
+    add_common_data(shadow_name, range(1, 11))
+
+    # A reader in the middle of a transaction, and a pooled connection idle between dashboard queries
+    reader = connect(database, "read")
+    reader.execute("BEGIN")
+    assert count_common_data(reader) == 3
+    engine = create_sqlite_engine(database, "read")
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as session:
+        assert session.execute(text("SELECT COUNT(*) FROM common_data")).scalar() == 3
+
+    swap_in_shadow(shadow_name, database)
+    assert not os.path.exists(shadow_name)
+
+    # The open transaction finishes on the old data, and every later read sees the new data
+    assert count_common_data(reader) == 3
+    reader.execute("COMMIT")
+    assert count_common_data(reader) == 10
+    with SessionLocal() as session:
+        assert session.execute(text("SELECT COUNT(*) FROM common_data")).scalar() == 10
+    reader.close()
+    engine.dispose()
+
+    conn = connect(database, "read")
+    assert conn.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
+    assert count_common_data(conn) == 10
+    conn.close()